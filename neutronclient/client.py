@@ -15,12 +15,15 @@
 #
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
-try:
-    import json
-except ImportError:
-    import simplejson as json
+import collections
+import httplib
 import logging
 import os
+import re
+import select
+import socket
+import threading
+import time
 import urlparse
 # Python 2.5 compat fix
 if not hasattr(urlparse, 'parse_qsl'):
@@ -29,6 +32,9 @@ if not hasattr(urlparse, 'parse_qsl'):
 
 import httplib2
 
+from neutronclient.common import _
+from neutronclient.common import cache
+from neutronclient.common import codec
 from neutronclient.common import exceptions
 from neutronclient.common import utils
 
@@ -41,6 +47,110 @@ if os.environ.get('NEUTRONCLIENT_DEBUG'):
     _logger.addHandler(ch)
 
 
+# A UUID, or a hexadecimal ID such as the ones of tenants, optionally
+# followed by the format extension
+_ID_SEGMENT = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                         r'[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{32})(?=\.|$)',
+                         re.IGNORECASE)
+
+# The _RequestTimer of the request being sent by each thread, if timed
+_timers = threading.local()
+
+
+def path_template(url):
+    """Returns the path of url with the IDs replaced by {id}, without the
+    query string, so that requests on different resources are grouped.
+    """
+    path = urlparse.urlsplit(url)[2]
+    return '/'.join(_ID_SEGMENT.sub('{id}', segment)
+                    for segment in path.split('/'))
+
+
+class RequestEvent(object):
+    """The measurements of an HTTP request, given to request hooks.
+
+    Times are in seconds from the start of the request.
+
+    :ivar method: HTTP method
+    :ivar path: path template of the request, see path_template()
+    :ivar status: HTTP status of the response, None if none was received
+    :ivar bytes_sent: length of the request body
+    :ivar bytes_received: length of the response body, for streamed bodies
+                          the Content-Length if any, else None
+    :ivar connect_time: time spent opening a connection, None if a kept
+                        alive connection was reused
+    :ivar first_byte_time: time until the first byte of the response was
+                           received, None if unknown
+    :ivar total_time: time until the response was received, its body
+                      excepted for streamed bodies
+    :ivar retries: number of earlier attempts of the API call
+    :ivar auth_refreshes: number of tokens fetched after the server
+                          rejected the one of an earlier attempt
+    :ivar error: exception raised by the connection, if any
+    """
+
+    def __init__(self, method, path, status=None, bytes_sent=0,
+                 bytes_received=None, connect_time=None,
+                 first_byte_time=None, total_time=None, retries=0,
+                 auth_refreshes=0, error=None):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.connect_time = connect_time
+        self.first_byte_time = first_byte_time
+        self.total_time = total_time
+        self.retries = retries
+        self.auth_refreshes = auth_refreshes
+        self.error = error
+
+    def __repr__(self):
+        return ('<RequestEvent %s %s %s in %.3fs>' %
+                (self.method, self.path, self.status, self.total_time or 0))
+
+
+class _RequestTimer(object):
+
+    def __init__(self):
+        self.start = time.time()
+        self.connect_time = None
+        self.first_byte_time = None
+
+    def elapsed(self):
+        return time.time() - self.start
+
+
+def _timed(connection_class):
+    """Returns a subclass of connection_class recording the times of
+    connect() and of the first response in the timer of the thread.
+    """
+
+    class TimedConnection(connection_class):
+
+        def connect(self):
+            timer = getattr(_timers, 'current', None)
+            start = time.time()
+            connection_class.connect(self)
+            if timer is not None:
+                timer.connect_time = ((timer.connect_time or 0) +
+                                      time.time() - start)
+
+        def getresponse(self, *args, **kwargs):
+            response = connection_class.getresponse(self, *args, **kwargs)
+            timer = getattr(_timers, 'current', None)
+            if timer is not None and timer.first_byte_time is None:
+                timer.first_byte_time = timer.elapsed()
+            return response
+
+    TimedConnection.__name__ = 'Timed' + connection_class.__name__
+    return TimedConnection
+
+
+_TimedHTTPConnection = _timed(httplib2.HTTPConnectionWithTimeout)
+_TimedHTTPSConnection = _timed(httplib2.HTTPSConnectionWithTimeout)
+
+
 class ServiceCatalog(object):
     """Helper methods for dealing with a Keystone Service Catalog."""
 
@@ -89,17 +199,176 @@ class ServiceCatalog(object):
             return matching_endpoints[0][endpoint_type]
 
 
+def _connection_dropped(conn):
+    """Returns True if the peer closed an idle keep-alive connection.
+
+    An idle connection has no pending response, so a readable socket means
+    the server either closed it or sent something we did not ask for; in
+    both cases the connection can not be reused.
+    """
+    sock = getattr(conn, 'sock', None)
+    if sock is None:
+        # Not connected yet (or already closed), httplib will reconnect
+        return False
+    try:
+        return bool(select.select([sock], [], [], 0.0)[0])
+    except (select.error, socket.error, ValueError):
+        return True
+
+
+class ConnectionPool(object):
+    """A bounded, thread-safe pool of keep-alive httplib2.Http objects.
+
+    httplib2.Http keeps one persistent connection per (scheme, authority)
+    and must not be used by two threads at once.  The pool hands each
+    thread its own Http object for the duration of a request, creating at
+    most max_size of them, so established TCP/TLS sessions are reused by
+    whichever thread needs one next.
+
+    :param factory: callable returning a new httplib2.Http object
+    :param max_size: maximum number of Http objects handed out at once
+    :param idle_timeout: seconds after which idle connections are closed
+                         instead of being reused (None disables)
+    :param timeout: seconds to wait for a free object when the pool is
+                    exhausted (None waits forever)
+    """
+
+    def __init__(self, factory, max_size=10, idle_timeout=60, timeout=None):
+        if max_size < 1:
+            raise ValueError(_("Connection pool size must be at least 1"))
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = collections.deque()
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def _check(self, http, last_used):
+        """Close connections which are stale or were dropped by the peer."""
+        connections = getattr(http, 'connections', {})
+        expired = (self.idle_timeout is not None and
+                   time.time() - last_used > self.idle_timeout)
+        for key, conn in connections.items():
+            if expired or _connection_dropped(conn):
+                _logger.debug("Discarding idle connection to %s", key)
+                conn.close()
+                del connections[key]
+
+    def get(self):
+        """Check out an Http object, blocking while the pool is exhausted."""
+        deadline = self.timeout is not None and time.time() + self.timeout
+        with self._cond:
+            while not self._idle and self._created >= self.max_size:
+                if deadline:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise exceptions.ConnectionFailed(
+                            reason=_("Timed out waiting for a free "
+                                     "connection from the pool"))
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            if self._idle:
+                # LIFO: the most recently used object has the warmest
+                # connections, the least recently used ones may expire.
+                http, last_used = self._idle.pop()
+                self._check(http, last_used)
+                return http
+            self._created += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def put(self, http, discard_connections=False):
+        """Return a checked out Http object to the pool.
+
+        :param discard_connections: close its connections first, e.g. after
+                                    a request failed half way through
+        """
+        if discard_connections:
+            self._close_connections(http)
+        with self._cond:
+            self._idle.append((http, time.time()))
+            self._cond.notify()
+
+    def close(self):
+        """Close the connections of every idle object in the pool."""
+        with self._cond:
+            for http, _last_used in self._idle:
+                self._close_connections(http)
+
+    @staticmethod
+    def _close_connections(http):
+        connections = getattr(http, 'connections', {})
+        for conn in connections.values():
+            conn.close()
+        connections.clear()
+
+
+class StreamedBody(object):
+    """Body of a response, read from the socket a chunk at a time.
+
+    The connection is handed back to the pool once the body was read
+    entirely; close() must be called if iterating stops before that.
+    """
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __iter__(self):
+        while self._release:
+            data = self._response.read(self.CHUNK_SIZE)
+            if not data:
+                self._finish(complete=True)
+                return
+            yield data
+
+    def _finish(self, complete):
+        release, self._release = self._release, None
+        if release:
+            release(complete)
+
+    def close(self):
+        """Hands the connection back to the pool, closing it if the body
+        was not read entirely.
+        """
+        self._finish(complete=False)
+
+
 class HTTPClient(httplib2.Http):
-    """Handles the REST calls and responses, include authn."""
+    """Handles the REST calls and responses, include authn.
+
+    Requests are sent through a ConnectionPool of keep-alive connections,
+    so a single instance can be shared by several threads.  Given a
+    cache.ResponseCache, the responses to GET requests are cached per
+    token and invalidated by the writes of this client.
+
+    The callables added with add_request_hook() are called with a
+    RequestEvent after each request sent, in the thread which sent it.
+    Requests are only timed while there are hooks.
+    """
 
     USER_AGENT = 'python-neutronclient'
+    # Seconds before expiry from which a token is renewed before use
+    TOKEN_REFRESH_MARGIN = 60
 
     def __init__(self, username=None, tenant_name=None, tenant_id=None,
                  password=None, auth_url=None,
                  token=None, region_name=None, timeout=None,
                  endpoint_url=None, insecure=False,
                  endpoint_type='publicURL',
-                 auth_strategy='keystone', **kwargs):
+                 auth_strategy='keystone',
+                 connection_pool_size=10, connection_idle_timeout=60,
+                 token_cache=None, response_cache=None, request_hooks=None,
+                 **kwargs):
         super(HTTPClient, self).__init__(timeout=timeout)
         self.username = username
         self.tenant_name = tenant_name
@@ -109,13 +378,158 @@ class HTTPClient(httplib2.Http):
         self.endpoint_type = endpoint_type
         self.region_name = region_name
         self.auth_token = token
+        self.auth_token_expires = None
+        self.token_cache = token_cache
+        self.response_cache = response_cache
+        self.request_hooks = list(request_hooks or [])
         self.content_type = 'application/json'
         self.endpoint_url = endpoint_url
         self.auth_strategy = auth_strategy
         # httplib2 overrides
         self.disable_ssl_certificate_validation = insecure
+        self.connection_pool = ConnectionPool(
+            self._create_connection, max_size=connection_pool_size,
+            idle_timeout=connection_idle_timeout)
+        self._auth_lock = threading.Lock()
+
+    def _create_connection(self):
+        return httplib2.Http(timeout=self.timeout)
+
+    def add_request_hook(self, hook):
+        """Calls hook(event) with a RequestEvent after each request."""
+        # Copied on write so that requests being sent need no lock
+        self.request_hooks = self.request_hooks + [hook]
+
+    def remove_request_hook(self, hook):
+        self.request_hooks = [h for h in self.request_hooks if h != hook]
+
+    def _new_connection(self, scheme, authority):
+        if scheme == 'https':
+            return _TimedHTTPSConnection(
+                authority, timeout=self.timeout,
+                disable_ssl_certificate_validation=(
+                    self.disable_ssl_certificate_validation))
+        return _TimedHTTPConnection(authority, timeout=self.timeout)
+
+    def _add_timed_connection(self, http, uri):
+        """Adds a timed connection to uri to http unless it has one,
+        httplib2 then using it instead of opening its own.
+        """
+        scheme, authority = httplib2.urlnorm(uri)[:2]
+        conn_key = scheme + ":" + authority
+        if conn_key not in http.connections:
+            http.connections[conn_key] = self._new_connection(scheme,
+                                                              authority)
+
+    def _start_timer(self):
+        """Times the request sent next by this thread, if there are
+        hooks to report it to.
+        """
+        if not self.request_hooks:
+            return None
+        timer = _timers.current = _RequestTimer()
+        return timer
+
+    def _report(self, timer, args, kargs, kwargs, resp=None, body=None,
+                error=None):
+        """Gives the RequestEvent of a request timed by timer to the
+        hooks.
+        """
+        total_time = timer.elapsed()
+        _timers.current = None
+        if isinstance(body, StreamedBody):
+            bytes_received = resp.get('content-length')
+            if bytes_received is not None:
+                bytes_received = int(bytes_received)
+        elif body is not None:
+            bytes_received = len(body)
+        else:
+            bytes_received = None
+        event = RequestEvent(
+            args[1], path_template(args[0]),
+            status=resp.status if resp is not None else None,
+            bytes_sent=len(kargs.get('body') or ''),
+            bytes_received=bytes_received,
+            connect_time=timer.connect_time,
+            first_byte_time=timer.first_byte_time,
+            total_time=total_time,
+            retries=kwargs.get('retries', 0),
+            auth_refreshes=kwargs.get('auth_refreshes', 0),
+            error=error)
+        for hook in self.request_hooks:
+            try:
+                hook(event)
+            except Exception:
+                _logger.exception("Request hook %r failed", hook)
+
+    def request(self, *args, **kwargs):
+        """Send a request using a keep-alive connection from the pool."""
+        # The pooled objects are shared between threads, settings for a
+        # single request are passed as arguments instead of set on the client
+        follow_all_redirects = kwargs.pop('follow_all_redirects',
+                                          self.follow_all_redirects)
+        http = self.connection_pool.get()
+        http.follow_all_redirects = follow_all_redirects
+        http.disable_ssl_certificate_validation = (
+            self.disable_ssl_certificate_validation)
+        try:
+            if self.request_hooks:
+                self._add_timed_connection(http, args[0])
+            result = http.request(*args, **kwargs)
+        except Exception:
+            self.connection_pool.put(http, discard_connections=True)
+            raise
+        self.connection_pool.put(http)
+        return result
 
-    def _cs_request(self, *args, **kwargs):
+    def stream(self, uri, method, headers=None):
+        """Send a request whose successful response body is not read yet.
+
+        Returns (resp, body), where body is a StreamedBody for 2xx
+        responses and the complete body otherwise.  Redirects are not
+        followed.
+        """
+        http = self.connection_pool.get()
+        scheme, authority, request_uri, defrag_uri = httplib2.urlnorm(uri)
+        conn_key = scheme + ":" + authority
+        for attempt in (1, 2):
+            conn = http.connections.get(conn_key)
+            if conn is None:
+                conn = self._new_connection(scheme, authority)
+                http.connections[conn_key] = conn
+            try:
+                conn.request(method, request_uri, None, headers or {})
+                response = conn.getresponse()
+                break
+            except (socket.error, httplib.HTTPException):
+                # The server may have closed a kept-alive connection,
+                # retry once on a new one
+                conn.close()
+                del http.connections[conn_key]
+                if attempt == 2:
+                    self.connection_pool.put(http)
+                    raise
+            except Exception:
+                self.connection_pool.put(http, discard_connections=True)
+                raise
+
+        def release(complete):
+            if not complete:
+                conn.close()
+            self.connection_pool.put(http, discard_connections=not complete)
+
+        resp = httplib2.Response(response)
+        if 200 <= resp.status < 300:
+            return resp, StreamedBody(response, release)
+        try:
+            body = response.read()
+        except Exception:
+            release(False)
+            raise
+        release(True)
+        return resp, body
+
+    def _prepare_request(self, *args, **kwargs):
         kargs = {}
         kargs.setdefault('headers', kwargs.get('headers', {}))
         kargs['headers']['User-Agent'] = self.USER_AGENT
@@ -132,13 +546,24 @@ class HTTPClient(httplib2.Http):
         args = utils.safe_encode_list(args)
         kargs = utils.safe_encode_dict(kargs)
         utils.http_log_req(_logger, args, kargs)
+        return args, kargs
+
+    def _cs_request(self, *args, **kwargs):
+        args, kargs = self._prepare_request(*args, **kwargs)
+        if 'follow_all_redirects' in kwargs:
+            kargs['follow_all_redirects'] = kwargs['follow_all_redirects']
+        timer = self._start_timer()
         try:
             resp, body = self.request(*args, **kargs)
         except Exception as e:
+            if timer:
+                self._report(timer, args, kargs, kwargs, error=e)
             # Wrap the low-level connection error (socket timeout, redirect
             # limit, decompression error, etc) into our custom high-level
             # connection exception (it is excepted in the upper layers of code)
             raise exceptions.ConnectionFailed(reason=e)
+        if timer:
+            self._report(timer, args, kargs, kwargs, resp, body)
         utils.http_log_resp(_logger, resp, body)
         status_code = self.get_status_code(resp)
         if status_code == 401:
@@ -148,12 +573,42 @@ class HTTPClient(httplib2.Http):
         return resp, body
 
     def authenticate_and_fetch_endpoint_url(self):
-        if not self.auth_token:
+        if not self.auth_token or self._token_expires_soon():
             self.authenticate()
         elif not self.endpoint_url:
             self.endpoint_url = self._get_endpoint_url()
 
     def do_request(self, url, method, **kwargs):
+        if self.response_cache is None:
+            return self._do_request(url, method, **kwargs)
+        if method != 'GET':
+            try:
+                return self._do_request(url, method, **kwargs)
+            finally:
+                # Even a failed write may have changed resources
+                self.response_cache.invalidate(url)
+        return self._cached_get(url, **kwargs)
+
+    def _cached_get(self, url, **kwargs):
+        self.authenticate_and_fetch_endpoint_url()
+        key = (self.auth_token,
+               kwargs.get('content_type', self.content_type), url)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            if cached.fresh():
+                _logger.debug("Using cached response for %s", url)
+                return cached.resp, cached.body
+            kwargs['headers'] = dict(kwargs.get('headers') or {},
+                                     **cached.validators())
+        resp, body = self._do_request(url, 'GET', **kwargs)
+        if cached is not None and self.get_status_code(resp) == 304:
+            _logger.debug("Cached response for %s not modified", url)
+            cached = self.response_cache.revalidated(key, cached, resp)
+            return cached.resp, cached.body
+        self.response_cache.set(key, resp, body)
+        return resp, body
+
+    def _do_request(self, url, method, **kwargs):
         self.authenticate_and_fetch_endpoint_url()
         # Perform the request once. If we get a 401 back then it
         # might be because the auth token expired, so try to
@@ -165,13 +620,77 @@ class HTTPClient(httplib2.Http):
                                           **kwargs)
             return resp, body
         except exceptions.Unauthorized:
-            self.authenticate()
+            self._reauthenticate(kwargs['headers']['X-Auth-Token'])
             kwargs.setdefault('headers', {})
             kwargs['headers']['X-Auth-Token'] = self.auth_token
+            kwargs['auth_refreshes'] = kwargs.get('auth_refreshes', 0) + 1
             resp, body = self._cs_request(
                 self.endpoint_url + url, method, **kwargs)
             return resp, body
 
+    def stream_request(self, url, method, **kwargs):
+        """Like do_request(), but the body of a successful response is
+        returned as a StreamedBody.
+        """
+        self.authenticate_and_fetch_endpoint_url()
+        kwargs.setdefault('headers', {})
+        kwargs['headers']['X-Auth-Token'] = self.auth_token
+        try:
+            return self._cs_stream(self.endpoint_url + url, method, **kwargs)
+        except exceptions.Unauthorized:
+            self._reauthenticate(kwargs['headers']['X-Auth-Token'])
+            kwargs['headers']['X-Auth-Token'] = self.auth_token
+            kwargs['auth_refreshes'] = kwargs.get('auth_refreshes', 0) + 1
+            return self._cs_stream(self.endpoint_url + url, method, **kwargs)
+
+    def _cs_stream(self, *args, **kwargs):
+        args, kargs = self._prepare_request(*args, **kwargs)
+        if 'follow_all_redirects' in kwargs:
+            kargs['follow_all_redirects'] = kwargs['follow_all_redirects']
+        timer = self._start_timer()
+        try:
+            resp, body = self.stream(args[0], args[1],
+                                     headers=kargs['headers'])
+        except Exception as e:
+            if timer:
+                self._report(timer, args, kargs, kwargs, error=e)
+            raise exceptions.ConnectionFailed(reason=e)
+        if timer:
+            self._report(timer, args, kargs, kwargs, resp, body)
+        status_code = self.get_status_code(resp)
+        if isinstance(body, StreamedBody):
+            utils.http_log_resp(_logger, resp, '<streamed>')
+        else:
+            utils.http_log_resp(_logger, resp, body)
+        if status_code == 401:
+            raise exceptions.Unauthorized(message=body)
+        elif status_code == 403:
+            raise exceptions.Forbidden(message=body)
+        return resp, body
+
+    def _token_expires_soon(self):
+        """Whether a token obtained by authenticate() should be renewed.
+
+        Tokens given by the user have no known expiry and are only renewed
+        when the server rejects them.
+        """
+        return (self.auth_token_expires is not None and
+                cache.token_expires_soon(self.auth_token_expires,
+                                         self._refresh_margin()))
+
+    def _refresh_margin(self):
+        if self.token_cache:
+            return self.token_cache.refresh_margin
+        return self.TOKEN_REFRESH_MARGIN
+
+    def _reauthenticate(self, rejected_token):
+        """Fetch a new token unless another thread already replaced it."""
+        with self._auth_lock:
+            if self.auth_token == rejected_token:
+                if self.token_cache:
+                    self.token_cache.delete(self._token_cache_key())
+                self.authenticate()
+
     def _extract_service_catalog(self, body):
         """Set the client's service catalog from the response data."""
         self.service_catalog = ServiceCatalog(body)
@@ -182,13 +701,43 @@ class HTTPClient(httplib2.Http):
             self.auth_user_id = sc.get('user_id')
         except KeyError:
             raise exceptions.Unauthorized()
+        # Only renew proactively when our clock agrees the token is still
+        # valid for a while, otherwise clock skew or short-lived tokens
+        # would cause authentication loops
+        self.auth_token_expires = None
+        if not cache.token_expires_soon(sc['expires'],
+                                        self._refresh_margin()):
+            self.auth_token_expires = sc['expires']
         self.endpoint_url = self.service_catalog.url_for(
             attr='region', filter_value=self.region_name,
             endpoint_type=self.endpoint_type)
 
+    def _token_cache_key(self):
+        return self.token_cache.make_key(
+            self.auth_url, self.username, self.password, self.tenant_id,
+            self.tenant_name, self.region_name, self.endpoint_type)
+
     def authenticate(self):
         if self.auth_strategy != 'keystone':
             raise exceptions.Unauthorized(message='unknown auth strategy')
+        if not self.token_cache:
+            return self._authenticate()
+        key = self._token_cache_key()
+        body = self.token_cache.get(key)
+        if body is None:
+            # Another process may be authenticating with the same
+            # credentials, wait for it and reuse its token
+            with self.token_cache.lock(key):
+                body = self.token_cache.get(key)
+                if body is None:
+                    body = self._authenticate()
+                    self.token_cache.set(key, body)
+                    return body
+        _logger.debug("Using cached token for %s", self.username)
+        self._extract_service_catalog(body)
+        return body
+
+    def _authenticate(self):
         if self.tenant_id:
             body = {'auth': {'passwordCredentials':
                              {'username': self.username,
@@ -203,25 +752,22 @@ class HTTPClient(httplib2.Http):
         token_url = self.auth_url + "/tokens"
 
         # Make sure we follow redirects when trying to reach Keystone
-        tmp_follow_all_redirects = self.follow_all_redirects
-        self.follow_all_redirects = True
-        try:
-            resp, body = self._cs_request(token_url, "POST",
-                                          body=json.dumps(body),
-                                          content_type="application/json")
-        finally:
-            self.follow_all_redirects = tmp_follow_all_redirects
+        resp, body = self._cs_request(token_url, "POST",
+                                      body=codec.dumps(body),
+                                      content_type="application/json",
+                                      follow_all_redirects=True)
         status_code = self.get_status_code(resp)
         if status_code != 200:
             raise exceptions.Unauthorized(message=body)
         if body:
             try:
-                body = json.loads(body)
+                body = codec.loads(body)
             except ValueError:
                 pass
         else:
             body = None
         self._extract_service_catalog(body)
+        return body
 
     def _get_endpoint_url(self):
         url = self.auth_url + '/tokens/%s/endpoints' % self.auth_token
@@ -233,7 +779,7 @@ class HTTPClient(httplib2.Http):
             self.authenticate()
             return self.endpoint_url
 
-        body = json.loads(body)
+        body = codec.loads(body)
         for endpoint in body.get('endpoints', []):
             if (endpoint['type'] == 'network' and
                 endpoint.get('region') == self.region_name):
@@ -0,0 +1,356 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Caches shared by the neutron client library and CLI."""
+
+import contextlib
+import copy
+import datetime
+import email.utils
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from neutronclient.common import utils
+from neutronclient.openstack.common import strutils
+from neutronclient.openstack.common import timeutils
+
+
+_logger = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """Thread-safe in-memory cache bounded in size and entry lifetime.
+
+    :param max_size: maximum number of entries, the least recently used
+                     ones being evicted first; 0 disables the cache
+    :param ttl: seconds during which an entry is handed out after it was
+                stored, None for no limit
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> [value, expiry time, last use]
+        self._entries = {}
+        self._uses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._entries[key]
+                return default
+            self._uses += 1
+            entry[2] = self._uses
+            return entry[0]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        expires = self.ttl is not None and time.time() + self.ttl or None
+        with self._lock:
+            if key not in self._entries and len(self) >= self.max_size:
+                lru = min(self._entries.iteritems(),
+                          key=lambda item: item[1][2])[0]
+                del self._entries[lru]
+            self._uses += 1
+            self._entries[key] = [value, expires, self._uses]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, predicate):
+        """Removes the entries for which predicate(key, value) is true."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if predicate(key, entry[0]):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def parse_cache_control(value):
+    """Returns the directives of a Cache-Control header as a dict.
+
+    Directives without a value, such as no-store, are mapped to None.
+    """
+    directives = {}
+    for directive in (value or '').split(','):
+        name, sep, arg = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = sep and arg.strip('"') or None
+    return directives
+
+
+def _http_date(value):
+    parsed = value and email.utils.parsedate_tz(value)
+    return parsed and email.utils.mktime_tz(parsed)
+
+
+class CachedResponse(object):
+    """A response to a GET request held by a ResponseCache."""
+
+    def __init__(self, resp, body, expires):
+        self.resp = resp
+        self.body = body
+        self.expires = expires
+
+    def fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        """Returns the headers making a request conditional on the
+        response having changed since it was cached.
+        """
+        headers = {}
+        if self.resp.get('etag'):
+            headers['If-None-Match'] = self.resp['etag']
+        if self.resp.get('last-modified'):
+            headers['If-Modified-Since'] = self.resp['last-modified']
+        return headers
+
+
+class ResponseCache(object):
+    """Thread-safe in-memory cache of the responses to GET requests.
+
+    Responses are fresh for the time given by their Cache-Control max-age
+    or Expires headers, or ttl seconds when the server gives neither, and
+    are handed out without a request while they are.  Stale responses
+    with an ETag or Last-Modified header are revalidated with a
+    conditional request, the server answering 304 Not Modified without a
+    body if they did not change.  Responses marked no-store are not
+    cached, and the ones marked no-cache are always revalidated.
+
+    Keys are tuples whose last item is the path of the request, the other
+    items telling apart the responses the server may give to different
+    clients (e.g. their token).
+
+    :param max_size: maximum number of responses, the least recently
+                     used ones being evicted first
+    :param ttl: seconds during which a response without caching headers
+                is fresh
+    """
+
+    def __init__(self, max_size=1000, ttl=0):
+        self.ttl = ttl
+        self._responses = LRUCache(max_size)
+
+    def __len__(self):
+        return len(self._responses)
+
+    def get(self, key):
+        """Returns the CachedResponse stored for key, fresh or not."""
+        return self._responses.get(key)
+
+    def _freshness(self, resp):
+        """Returns the seconds resp is fresh for, or None if it must not
+        be cached.
+        """
+        directives = parse_cache_control(resp.get('cache-control'))
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0
+        try:
+            return int(directives['max-age'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        if 'expires' in resp:
+            # Relative to the clock of the server; an invalid date means
+            # already expired
+            expires = _http_date(resp['expires'])
+            date = _http_date(resp.get('date')) or time.time()
+            return expires and expires - date or 0
+        return self.ttl
+
+    def set(self, key, resp, body):
+        """Caches the response to a GET request, if it may be."""
+        freshness = self._freshness(resp)
+        if freshness is None or resp.status != 200:
+            return
+        cached = CachedResponse(resp, body, time.time() + freshness)
+        if cached.fresh() or cached.validators():
+            self._responses.set(key, cached)
+        else:
+            self._responses.delete(key)
+
+    def revalidated(self, key, cached, resp):
+        """Refreshes cached, the server having answered resp (304 Not
+        Modified) to its validators, and returns it.
+        """
+        freshness = self._freshness(resp)
+        if freshness is None:
+            self._responses.delete(key)
+            return cached
+        # The cached response may be in use by other threads
+        cached_resp = copy.copy(cached.resp)
+        for header in ('etag', 'last-modified', 'cache-control',
+                       'expires', 'date'):
+            if header in resp:
+                cached_resp[header] = resp[header]
+        refreshed = CachedResponse(cached_resp, cached.body,
+                                   time.time() + freshness)
+        self._responses.set(key, refreshed)
+        return refreshed
+
+    def invalidate(self, path):
+        """Removes the responses which may be changed by a write to path.
+
+        Resources refer to each other (e.g. creating a port changes the
+        ports of its network, deleting a router interface the routers of
+        the floating IPs), so any write clears the whole cache.
+        """
+        self.clear()
+
+    def clear(self):
+        self._responses.clear()
+
+
+def token_expires_soon(expires, margin=0):
+    """Returns True if the ISO 8601 time expires is less than margin
+    seconds away (or can not be parsed).
+    """
+    try:
+        expires = timeutils.normalize_time(timeutils.parse_isotime(expires))
+    except (ValueError, AttributeError):
+        return True
+    return expires - timeutils.utcnow() < datetime.timedelta(seconds=margin)
+
+
+class TokenCache(object):
+    """On-disk cache of Keystone token responses.
+
+    Each entry holds the full response of a Keystone /tokens request, so
+    both the token and the service catalog can be reused by later
+    processes.  Entries are stored one per file, named after a hash of the
+    credentials they were obtained with, and replaced atomically.  A lock
+    file per entry lets concurrent processes wait for the one already
+    talking to Keystone instead of authenticating too.
+
+    :param path: directory holding the cache entries
+    :param refresh_margin: seconds before expiry from which a cached token
+                           is no longer handed out
+    """
+
+    DEFAULT_PATH = os.path.join('~', '.neutronclient', 'tokens')
+
+    def __init__(self, path=None, refresh_margin=300):
+        self.path = os.path.expanduser(path or self.DEFAULT_PATH)
+        self.refresh_margin = refresh_margin
+
+    @staticmethod
+    def make_key(auth_url, username, password, tenant_id, tenant_name,
+                 region_name, endpoint_type):
+        """Returns the cache key for a set of credentials.
+
+        The password is part of the hashed key, so that a token is never
+        handed out to someone presenting different credentials.
+        """
+        parts = [auth_url, username, password, tenant_id, tenant_name,
+                 region_name, endpoint_type]
+        material = '\0'.join(strutils.safe_encode(p or '') for p in parts)
+        return hashlib.sha1(material).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def _ensure_dir(self):
+        try:
+            os.makedirs(self.path, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def get(self, key):
+        """Returns the cached token response, or None if there is no entry
+        or its token is about to expire.
+        """
+        try:
+            with open(self._entry_path(key)) as f:
+                body = utils.loads(f.read())
+            expires = body['access']['token']['expires']
+        except (IOError, ValueError, KeyError, TypeError):
+            return None
+        if token_expires_soon(expires, self.refresh_margin):
+            return None
+        return body
+
+    def set(self, key, body):
+        """Stores a token response, atomically replacing any old entry."""
+        try:
+            self._ensure_dir()
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(utils.dumps(body))
+                os.rename(tmp_path, self._entry_path(key))
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except (IOError, OSError) as e:
+            # The cache is an optimization, never fail authentication
+            _logger.debug("Unable to store token in cache: %s", e)
+
+    def delete(self, key):
+        """Removes an entry, e.g. because its token was rejected."""
+        try:
+            os.unlink(self._entry_path(key))
+        except OSError:
+            pass
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Exclusive inter-process lock on an entry.
+
+        Does nothing where file locking is not available.
+        """
+        lock_file = None
+        if fcntl is not None:
+            try:
+                self._ensure_dir()
+                lock_file = open(self._entry_path(key) + '.lock', 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except (IOError, OSError) as e:
+                _logger.debug("Unable to lock token cache: %s", e)
+                if lock_file:
+                    lock_file.close()
+                lock_file = None
+        try:
+            yield
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
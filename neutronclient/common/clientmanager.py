@@ -21,6 +21,7 @@
 import logging
 
 from neutronclient import client
+from neutronclient.common import profiler
 from neutronclient.neutron import client as neutron_client
 
 
@@ -33,13 +34,16 @@ class ClientCache(object):
 
     def __init__(self, factory):
         self.factory = factory
-        self._handle = None
 
     def __get__(self, instance, owner):
-        # Tell the ClientManager to login to keystone
-        if self._handle is None:
-            self._handle = self.factory(instance)
-        return self._handle
+        # Handles are cached by ClientManager, which may be authenticated
+        # differently
+        handles = instance.__dict__.setdefault('_client_handles', {})
+        if self not in handles:
+            # Tell the ClientManager to login to keystone
+            with profiler.phase('authentication'):
+                handles[self] = self.factory(instance)
+        return handles[self]
 
 
 class ClientManager(object):
@@ -55,7 +59,11 @@ class ClientManager(object):
                  region_name=None,
                  api_version=None,
                  auth_strategy=None,
-                 insecure=False
+                 insecure=False,
+                 token_cache=None,
+                 trust_ids=False,
+                 request_hooks=None,
+                 resource_id_cache_size=0
                  ):
         self._token = token
         self._url = url
@@ -70,6 +78,10 @@ class ClientManager(object):
         self._service_catalog = None
         self._auth_strategy = auth_strategy
         self._insecure = insecure
+        self._token_cache = token_cache
+        self._trust_ids = trust_ids
+        self._request_hooks = request_hooks
+        self._resource_id_cache_size = resource_id_cache_size
         return
 
     def initialize(self):
@@ -81,7 +93,9 @@ class ClientManager(object):
                                            region_name=self._region_name,
                                            auth_url=self._auth_url,
                                            endpoint_type=self._endpoint_type,
-                                           insecure=self._insecure)
+                                           insecure=self._insecure,
+                                           token_cache=self._token_cache,
+                                           request_hooks=self._request_hooks)
             httpclient.authenticate()
             # Populate other password flow attributes
             self._token = httpclient.auth_token
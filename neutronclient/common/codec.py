@@ -0,0 +1,220 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""JSON encoding and decoding with the fastest library available.
+
+The backend is selected at import time, the first one importable in
+BACKENDS being used.  Set the NEUTRONCLIENT_JSON_BACKEND environment
+variable to the name of a backend to force its use.
+"""
+
+import json
+import logging
+import os
+
+
+_logger = logging.getLogger(__name__)
+
+
+class Backend(object):
+    """A JSON library.
+
+    :param name: name of the library
+    :param loads: function decoding a JSON document
+    :param dumps: function encoding a value, accepting the indent and
+                  default arguments of json.dumps() and raising TypeError
+                  for values it can not encode
+    """
+
+    def __init__(self, name, loads, dumps, raw_decode=None):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+        self.raw_decode = raw_decode or json.JSONDecoder().raw_decode
+
+    def __repr__(self):
+        return '<Backend %s>' % self.name
+
+
+def _json_backend(module):
+    return Backend(module.__name__, module.loads, module.dumps,
+                   module.JSONDecoder().raw_decode)
+
+
+def _ujson_backend(module):
+    # ujson encodes some objects it does not support instead of raising
+    # TypeError, so it is only used to decode; it has no raw_decode() to
+    # decode documents incrementally either.
+    return Backend(module.__name__, module.loads, json.dumps)
+
+
+# Fastest first: on large list responses simplejson decodes faster than
+# ujson, which returns unicode for all strings, and both are much faster
+# than json (see tests/benchmark/json_codec.py)
+BACKENDS = [('simplejson', _json_backend),
+            ('ujson', _ujson_backend),
+            ('json', _json_backend)]
+
+
+def load_backend(name):
+    """Returns the Backend named name, or None if it is not installed."""
+    for backend_name, factory in BACKENDS:
+        if backend_name == name:
+            try:
+                return factory(__import__(name))
+            except ImportError:
+                return None
+    raise ValueError("Unknown JSON backend %s" % name)
+
+
+def available_backends():
+    backends = [load_backend(name) for name, factory in BACKENDS]
+    return [backend for backend in backends if backend is not None]
+
+
+def _select_backend():
+    name = os.environ.get('NEUTRONCLIENT_JSON_BACKEND')
+    if name:
+        try:
+            backend = load_backend(name)
+        except ValueError:
+            backend = None
+        if backend is not None:
+            return backend
+        _logger.warning("JSON backend %s is not available", name)
+    return available_backends()[0]
+
+
+backend = _select_backend()
+
+
+def set_backend(new_backend):
+    """Replaces the backend, e.g. for benchmarks."""
+    global backend
+    backend = new_backend
+
+
+def dumps(value, indent=None, default=None):
+    """Encodes value in JSON.
+
+    Plain dicts, lists and strings are encoded by the backend directly,
+    default(obj) being only called for the objects it can not encode.
+    """
+    return backend.dumps(value, indent=indent, default=default)
+
+
+def loads(s):
+    return backend.loads(s)
+
+
+class _Reader(object):
+    """Reads JSON values one at a time from an iterable of chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self, size=0):
+        """Reads chunks until more than size bytes are unconsumed.
+
+        Returns False if the document ended first.
+        """
+        parts = [self.buf[self.pos:]]
+        length = len(parts[0])
+        while length <= size or length == len(parts[0]):
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        self.buf = ''.join(parts)
+        self.pos = 0
+        return length > size
+
+    def peek(self):
+        """Returns the next non blank character, '' at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self.more():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("Expected %s at byte %d of the buffer, got %r" %
+                             (' or '.join(chars), self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = backend.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the
+                # next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            # Double the buffer before decoding again so that large values
+            # are decoded in linear time
+            self.more(2 * (len(self.buf) - self.pos))
+
+
+def iterparse(chunks, collection, extra=None):
+    """Yields the items of a {collection: [...]} JSON document.
+
+    The document is read from chunks, an iterable of strings, as the items
+    are consumed, so that large lists are not held in memory at once.  The
+    other members of the document, such as the pagination links, are
+    stored in the extra dict as they are read.
+    """
+    if extra is None:
+        extra = {}
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == collection:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            extra[key] = reader.value()
+        if reader.expect(',}') == '}':
+            break
+    if reader.peek():
+        raise ValueError("Extra data after the document")
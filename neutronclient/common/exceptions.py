@@ -136,6 +136,11 @@ class ConnectionFailed(NeutronClientException):
     message = _("Connection to neutron failed: %(reason)s")
 
 
+class WaitTimeout(NeutronClientException):
+    message = _("Timed out waiting for %(resource)s %(ids)s to be "
+                "%(status)s")
+
+
 class BadInputError(Exception):
     """Error resulting from a client sending bad input to a server."""
     pass
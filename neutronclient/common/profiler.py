@@ -0,0 +1,191 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Time spent by a command in each of its phases, for neutron --profile.
+
+The phases of the CLI are marked with:
+
+    with profiler.phase('name lookups'):
+        ...
+
+which only costs a function call while no profiler is started.  The time
+spent in a phase nested in another one is only counted in the inner one.
+Iterators consumed in another phase, such as lists retrieved page by
+page, are timed with profiler.iterate().
+"""
+
+import contextlib
+import cProfile
+import threading
+import time
+
+
+# The started Profiler, if any
+_profiler = None
+
+
+class _NoPhase(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name):
+    """Returns a context manager timing the phase name of the command."""
+    profiler = _profiler
+    if profiler is None:
+        return _NO_PHASE
+    return profiler.phase(name)
+
+
+def iterate(name, iterable):
+    """Returns an iterator over iterable, timing the phase name while
+    each of its items is retrieved.
+
+    For generators consumed in another phase, e.g. resources requested
+    page by page while they are formatted.
+    """
+    if _profiler is None:
+        return iterable
+    return _iterate(name, iter(iterable))
+
+
+def _iterate(name, iterator):
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def start(profile_file=None):
+    """Starts and returns a new Profiler."""
+    global _profiler
+    _profiler = Profiler(profile_file)
+    _profiler.start()
+    return _profiler
+
+
+def stop():
+    """Stops the started Profiler and returns it, None if there was none."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+class Profiler(object):
+    """Times the phases and the HTTP requests of a command.
+
+    The phases of concurrent threads are timed separately, their times
+    adding up.
+
+    :param profile_file: file to dump the cProfile statistics of the
+                         thread starting the profiler to, if any
+    """
+
+    PHASES = ('imports', 'authentication', 'name lookups', 'API calls',
+              'extend_list', 'formatting')
+
+    def __init__(self, profile_file=None):
+        self.profile_file = profile_file
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        # (method, path template): [count, seconds]
+        self.requests = {}
+        self.elapsed = None
+        self._start = None
+        self._profile = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._start = time.time()
+        if self.profile_file:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_file)
+        self.elapsed = time.time() - self._start
+
+    def _add(self, name, seconds):
+        with self._lock:
+            self.times[name] = self.times.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        # The phases being timed in this thread, innermost last, with the
+        # time they were entered or resumed at
+        stack = self._local.__dict__.setdefault('stack', [])
+        now = time.time()
+        if stack:
+            self._add(stack[-1][0], now - stack[-1][1])
+        stack.append([name, now])
+        try:
+            yield
+        finally:
+            name, started = stack.pop()
+            now = time.time()
+            self._add(name, now - started)
+            if stack:
+                stack[-1][1] = now
+
+    def add_request(self, event):
+        """Request hook of the HTTP clients, see HTTPClient."""
+        with self._lock:
+            stats = self.requests.setdefault((event.method, event.path),
+                                             [0, 0.0])
+            stats[0] += 1
+            stats[1] += event.total_time
+
+    def report(self, stream):
+        """Writes the times of the phases and of the requests to stream."""
+        elapsed = self.elapsed
+        if elapsed is None:
+            elapsed = time.time() - self._start
+        names = list(self.PHASES)
+        names.extend(sorted(name for name in self.times
+                            if name not in self.PHASES))
+        rows = [(name, self.times[name]) for name in names]
+        rows.append(('other', max(0.0, elapsed - sum(self.times.values()))))
+        rows.append(('total', elapsed))
+        stream.write('\nPhase            Seconds       %\n')
+        for name, seconds in rows:
+            stream.write('%-15s %8.3f  %5.1f%%\n' %
+                         (name, seconds, 100.0 * seconds / (elapsed or 1)))
+        count = sum(stats[0] for stats in self.requests.values())
+        seconds = sum(stats[1] for stats in self.requests.values())
+        stream.write('\n%d HTTP requests in %.3f seconds\n' %
+                     (count, seconds))
+        for (method, path), stats in sorted(self.requests.items(),
+                                            key=lambda item: -item[1][1]):
+            stream.write('%5d %8.3f  %s %s\n' %
+                         (stats[0], stats[1], method, path))
+        if self.profile_file:
+            stream.write('\nProfile statistics written to %s\n' %
+                         self.profile_file)
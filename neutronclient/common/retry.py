@@ -0,0 +1,143 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Policies deciding whether and when failed API requests are retried."""
+
+import email.utils
+import logging
+import random
+import time
+import uuid
+
+from neutronclient.common import exceptions
+
+
+_logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value):
+    """Returns the seconds to wait given by a Retry-After header, either
+    a number of seconds or an HTTP date, or None if it can not be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if not parsed:
+        return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
+
+
+class RetryPolicy(object):
+    """Retries failed requests with exponential backoff and jitter.
+
+    A request is retried when the connection to the server failed or the
+    server answered one of retry_statuses, until max_attempts attempts
+    were made or the next one would start more than max_elapsed seconds
+    after the first one.  The n-th retry waits interval * backoff ** (n-1)
+    seconds, up to max_interval, or a random time between half and all of
+    that with jitter, so that clients failing together do not retry
+    together.  The Retry-After header of a response is honored instead,
+    up to max_interval.
+
+    Only idempotent methods are retried, unless idempotency_header is set:
+    POST requests are then sent with that header set to a key unique to
+    the call and retried too.  The server, or a proxy in front of it, must
+    honor the header for retries not to create resources twice.
+
+    :param max_attempts: maximum number of attempts, 1 to never retry
+    :param interval: seconds before the first retry
+    :param backoff: factor applied to the interval after each retry
+    :param max_interval: maximum seconds between two attempts
+    :param max_elapsed: maximum seconds between the first attempt and the
+                        start of the last one, None for no limit
+    :param retry_statuses: HTTP statuses of the responses retried
+    :param idempotency_header: header carrying the idempotency key of
+                               POST requests, None to never retry them
+    :param jitter: whether the delays are randomized
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+    def __init__(self, max_attempts=4, interval=0.5, backoff=2,
+                 max_interval=30, max_elapsed=None,
+                 retry_statuses=(429, 502, 503, 504),
+                 idempotency_header=None, jitter=True):
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.max_elapsed = max_elapsed
+        self.retry_statuses = retry_statuses
+        self.idempotency_header = idempotency_header
+        self.jitter = jitter
+
+    def headers(self, method):
+        """Returns the headers to send with every attempt of a call."""
+        if method == 'POST' and self.idempotency_header:
+            return {self.idempotency_header: str(uuid.uuid4())}
+        return {}
+
+    def retryable(self, method, exc):
+        """Whether a request which failed with exc may be sent again."""
+        if (method not in self.IDEMPOTENT_METHODS and
+                not (method == 'POST' and self.idempotency_header)):
+            return False
+        if isinstance(exc, exceptions.ConnectionFailed):
+            return True
+        return (isinstance(exc, exceptions.NeutronClientException) and
+                exc.status_code in self.retry_statuses)
+
+    def delay(self, retry, exc):
+        """Returns the seconds to wait before the retry-th retry."""
+        retry_after = parse_retry_after(getattr(exc, 'retry_after', None))
+        if retry_after is not None:
+            return min(retry_after, self.max_interval)
+        delay = min(self.interval * self.backoff ** (retry - 1),
+                    self.max_interval)
+        if self.jitter:
+            delay = random.uniform(delay / 2.0, delay)
+        return delay
+
+    def call(self, method, request):
+        """Calls request(headers) until it succeeds or may not be retried.
+
+        headers are the ones to add to the request.  The exception of the
+        last attempt is raised.
+        """
+        headers = self.headers(method)
+        start = time.time()
+        attempt = 1
+        while True:
+            try:
+                return request(headers)
+            except exceptions.NeutronClientException as e:
+                if (attempt >= self.max_attempts or
+                        not self.retryable(method, e)):
+                    raise
+                delay = self.delay(attempt, e)
+                if (self.max_elapsed is not None and
+                        time.time() + delay - start > self.max_elapsed):
+                    raise
+                _logger.debug("Retrying %(method)s request in %(delay).2f "
+                              "seconds after: %(error)s",
+                              {'method': method, 'delay': delay, 'error': e})
+                time.sleep(delay)
+                attempt += 1
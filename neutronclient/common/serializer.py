@@ -21,16 +21,58 @@
 
 import logging
 
-from xml.etree import ElementTree as etree
+try:
+    from xml.etree import cElementTree as etree
+except ImportError:
+    from xml.etree import ElementTree as etree
 from xml.parsers import expat
 
+from neutronclient.common import codec
 from neutronclient.common import constants
 from neutronclient.common import exceptions as exception
 from neutronclient.openstack.common.gettextutils import _
-from neutronclient.openstack.common import jsonutils
 
 LOG = logging.getLogger(__name__)
 
+_XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+_TYPES = ((bool, constants.TYPE_BOOL),
+          (int, constants.TYPE_INT),
+          (long, constants.TYPE_LONG),
+          (float, constants.TYPE_FLOAT))
+
+_CONVERTERS = {constants.TYPE_BOOL: lambda x: x.lower() == 'true',
+               constants.TYPE_INT: int,
+               constants.TYPE_LONG: long,
+               constants.TYPE_FLOAT: float}
+
+
+def _escape_text(text):
+    # As ElementTree does, but faster on the common strings which do not
+    # need escaping
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _escape_attr(text):
+    text = _escape_text(text)
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '\n' in text:
+        text = text.replace('\n', '&#10;')
+    return text
+
+
+def _text(data):
+    if isinstance(data, str):
+        return unicode(data, 'utf-8')
+    return unicode(data)
+
 
 class ActionDispatcher(object):
     """Maps method name to local methods through action name."""
@@ -61,7 +103,7 @@ class JSONDictSerializer(DictSerializer):
     def default(self, data):
         def sanitizer(obj):
             return unicode(obj)
-        return jsonutils.dumps(data, default=sanitizer)
+        return codec.dumps(data, default=sanitizer)
 
 
 class XMLDictSerializer(DictSerializer):
@@ -103,13 +145,15 @@ class XMLDictSerializer(DictSerializer):
                 root_key = (len(data) == 1 and
                             data.keys()[0] or constants.VIRTUAL_ROOT_KEY)
                 root_value = data.get(root_key, data)
-            doc = etree.Element("_temp_root")
             used_prefixes = []
-            self._to_xml_node(doc, self.metadata, root_key,
-                              root_value, used_prefixes)
+            attrs, content = self._to_xml_content(
+                self.metadata, root_key, root_value, used_prefixes)
             if links:
-                self._create_link_nodes(list(doc)[0], links)
-            return self.to_xml_string(list(doc)[0], used_prefixes, has_atom)
+                self._create_link_nodes(content, links)
+            self._add_xmlns(attrs, used_prefixes, has_atom)
+            out = [_XML_DECLARATION]
+            self._write_node(out, root_key, attrs, content)
+            return u''.join(out).encode('utf-8')
         except AttributeError as e:
             LOG.exception(str(e))
             return ''
@@ -120,37 +164,50 @@ class XMLDictSerializer(DictSerializer):
         # like originally intended
         return self.default(data)
 
-    def to_xml_string(self, node, used_prefixes, has_atom=False):
-        self._add_xmlns(node, used_prefixes, has_atom)
-        return etree.tostring(node, encoding='UTF-8')
-
     #NOTE (ameade): the has_atom should be removed after all of the
     # xml serializers and view builders have been updated to the current
     # spec that required all responses include the xmlns:atom, the has_atom
     # flag is to prevent current tests from breaking
-    def _add_xmlns(self, node, used_prefixes, has_atom=False):
-        node.set('xmlns', self.xmlns)
-        node.set(constants.TYPE_XMLNS, self.xmlns)
+    def _add_xmlns(self, attrs, used_prefixes, has_atom=False):
+        attrs['xmlns'] = self.xmlns
+        attrs[constants.TYPE_XMLNS] = self.xmlns
         if has_atom:
-            node.set(constants.ATOM_XMLNS, constants.ATOM_NAMESPACE)
-        node.set(constants.XSI_NIL_ATTR, constants.XSI_NAMESPACE)
+            attrs[constants.ATOM_XMLNS] = constants.ATOM_NAMESPACE
+        attrs[constants.XSI_NIL_ATTR] = constants.XSI_NAMESPACE
         ext_ns = self.metadata.get(constants.EXT_NS, {})
         for prefix in used_prefixes:
             if prefix in ext_ns:
-                node.set('xmlns:' + prefix, ext_ns[prefix])
+                attrs['xmlns:' + prefix] = ext_ns[prefix]
 
-    def _to_xml_node(self, parent, metadata, nodename, data, used_prefixes):
-        """Recursive method to convert data members to XML nodes."""
-        result = etree.SubElement(parent, nodename)
+    def _write_node(self, out, nodename, attrs, content):
+        """Appends the XML of a node to the out list of strings.
+
+        The XML is the one ElementTree would write, with the attributes
+        sorted, but written directly rather than building elements first.
+        """
+        out.append(u'<' + nodename)
+        for name, value in sorted(attrs.iteritems()):
+            out.append(u' %s="%s"' % (name, _escape_attr(value)))
+        if content:
+            out.append(u'>')
+            out.extend(content)
+            out.append(u'</%s>' % nodename)
+        else:
+            out.append(u' />')
+
+    def _to_xml_content(self, metadata, nodename, data, used_prefixes):
+        """Returns the attributes and the list of XML strings of the
+        content of the node converted from data.
+        """
         if ":" in nodename:
             used_prefixes.append(nodename.split(":", 1)[0])
+        attrs = {}
+        content = []
         #TODO(bcwaldon): accomplish this without a type-check
         if isinstance(data, list):
             if not data:
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_LIST)
-                return result
+                attrs[constants.TYPE_ATTR] = constants.TYPE_LIST
+                return attrs, content
             singular = metadata.get('plurals', {}).get(nodename, None)
             if singular is None:
                 if nodename.endswith('s'):
@@ -158,55 +215,67 @@ class XMLDictSerializer(DictSerializer):
                 else:
                     singular = 'item'
             for item in data:
-                self._to_xml_node(result, metadata, singular, item,
+                self._to_xml_node(content, metadata, singular, item,
                                   used_prefixes)
         #TODO(bcwaldon): accomplish this without a type-check
         elif isinstance(data, dict):
             if not data:
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_DICT)
-                return result
-            attrs = metadata.get('attributes', {}).get(nodename, {})
-            for k, v in data.items():
-                if k in attrs:
-                    result.set(k, str(v))
+                attrs[constants.TYPE_ATTR] = constants.TYPE_DICT
+                return attrs, content
+            node_attrs = metadata.get('attributes', {}).get(nodename, {})
+            for k, v in data.iteritems():
+                if k in node_attrs:
+                    attrs[k] = _text(str(v))
                 else:
-                    self._to_xml_node(result, metadata, k, v,
+                    self._to_xml_node(content, metadata, k, v,
                                       used_prefixes)
         elif data is None:
-            result.set(constants.XSI_ATTR, 'true')
+            attrs[constants.XSI_ATTR] = 'true'
         else:
-            if isinstance(data, bool):
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_BOOL)
-            elif isinstance(data, int):
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_INT)
-            elif isinstance(data, long):
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_LONG)
-            elif isinstance(data, float):
-                result.set(
-                    constants.TYPE_ATTR,
-                    constants.TYPE_FLOAT)
-            LOG.debug(_("Data %(data)s type is %(type)s"),
-                      {'data': data,
-                       'type': type(data)})
-            if isinstance(data, str):
-                result.text = unicode(data, 'utf-8')
-            else:
-                result.text = unicode(data)
-        return result
+            for data_type, type_name in _TYPES:
+                if isinstance(data, data_type):
+                    attrs[constants.TYPE_ATTR] = type_name
+                    break
+            text = _text(data)
+            if text:
+                content.append(_escape_text(text))
+        return attrs, content
+
+    def _to_xml_node(self, out, metadata, nodename, data, used_prefixes):
+        """Recursive method to convert data members to XML nodes."""
+        attrs, content = self._to_xml_content(metadata, nodename, data,
+                                              used_prefixes)
+        self._write_node(out, nodename, attrs, content)
 
-    def _create_link_nodes(self, xml_doc, links):
+    def _create_link_nodes(self, content, links):
         for link in links:
-            link_node = etree.SubElement(xml_doc, 'atom:link')
-            link_node.set('rel', link['rel'])
-            link_node.set('href', link['href'])
+            self._write_node(content, 'atom:link',
+                             {'rel': _text(link['rel']),
+                              'href': _text(link['href'])}, [])
+
+
+class _ChunkFile(object):
+    """Read-only file object over an iterable of strings."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+
+    def read(self, size=-1):
+        parts = [self._buf]
+        length = len(self._buf)
+        while size < 0 or length < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        data = ''.join(parts)
+        if size < 0:
+            size = length
+        self._buf = data[size:]
+        return data[:size]
 
 
 class TextDeserializer(ActionDispatcher):
@@ -223,7 +292,7 @@ class JSONDeserializer(TextDeserializer):
 
     def _from_json(self, datastring):
         try:
-            return jsonutils.loads(datastring)
+            return codec.loads(datastring)
         except ValueError:
             msg = _("Cannot understand JSON")
             raise exception.MalformedRequestBody(reason=msg)
@@ -246,6 +315,10 @@ class XMLDeserializer(TextDeserializer):
         if not xmlns:
             xmlns = constants.XML_NS_V20
         self.xmlns = xmlns
+        self._nil_attr = '{%s}nil' % constants.XSI_NAMESPACE
+        # The type attribute is only recognized in the namespace of the
+        # metadata
+        self._type_attr = '{%s}type' % self.metadata.get('xmlns')
 
     def _get_key(self, tag):
         tags = tag.split("}", 1)
@@ -280,77 +353,110 @@ class XMLDeserializer(TextDeserializer):
         plurals = set(self.metadata.get('plurals', {}))
         try:
             node = etree.fromstring(datastring)
-            root_tag = self._get_key(node.tag)
-            links = self._get_links(root_tag, node)
-            result = self._from_xml_node(node, plurals)
-            # There is no case where root_tag = constants.VIRTUAL_ROOT_KEY
-            # and links is not None because of the way data are serialized
-            if root_tag == constants.VIRTUAL_ROOT_KEY:
-                return result
-            return dict({root_tag: result}, **links)
-        except Exception as e:
-            parseError = False
-            # Python2.7
-            if (hasattr(etree, 'ParseError') and
-                isinstance(e, getattr(etree, 'ParseError'))):
-                parseError = True
-            # Python2.6
-            elif isinstance(e, expat.ExpatError):
-                parseError = True
-            if parseError:
-                msg = _("Cannot understand XML")
-                raise exception.MalformedRequestBody(reason=msg)
-            else:
-                raise
+        except (expat.ExpatError, SyntaxError):
+            # ElementTree raises ExpatError on Python 2.6, cElementTree
+            # SyntaxError, both ParseError (a SyntaxError) on Python 2.7
+            msg = _("Cannot understand XML")
+            raise exception.MalformedRequestBody(reason=msg)
+        root_tag = self._get_key(node.tag)
+        links = self._get_links(root_tag, node)
+        result = self._from_xml_node(node, plurals)
+        # There is no case where root_tag = constants.VIRTUAL_ROOT_KEY
+        # and links is not None because of the way data are serialized
+        if root_tag == constants.VIRTUAL_ROOT_KEY:
+            return result
+        return dict({root_tag: result}, **links)
 
-    def _from_xml_node(self, node, listnames):
-        """Convert a minidom node to a simple Python type.
+    def _from_xml_node(self, node, listnames, keys=None):
+        """Convert an ElementTree node to a simple Python type.
 
         :param listnames: list of XML node names whose subnodes should
                           be considered list items.
-
+        :param keys: dict caching the keys of the tags and attributes of
+                     the document, as given by _get_key().
         """
-        attrNil = node.get(str(etree.QName(constants.XSI_NAMESPACE, "nil")))
-        attrType = node.get(str(etree.QName(
-            self.metadata.get('xmlns'), "type")))
+        if keys is None:
+            keys = {}
+        attrNil = node.get(self._nil_attr)
+        attrType = node.get(self._type_attr)
         if (attrNil and attrNil.lower() == 'true'):
             return None
-        elif not len(node) and not node.text:
-            if (attrType and attrType == constants.TYPE_DICT):
-                return {}
-            elif (attrType and attrType == constants.TYPE_LIST):
-                return []
-            else:
-                return ''
-        elif (len(node) == 0 and node.text):
-            converters = {constants.TYPE_BOOL:
-                          lambda x: x.lower() == 'true',
-                          constants.TYPE_INT:
-                          lambda x: int(x),
-                          constants.TYPE_LONG:
-                          lambda x: long(x),
-                          constants.TYPE_FLOAT:
-                          lambda x: float(x)}
-            if attrType and attrType in converters:
-                return converters[attrType](node.text)
-            else:
-                return node.text
-        elif self._get_key(node.tag) in listnames:
-            return [self._from_xml_node(n, listnames) for n in node]
-        else:
-            result = dict()
-            for attr in node.keys():
-                if (attr == 'xmlns' or
-                    attr.startswith('xmlns:') or
-                    attr == constants.XSI_ATTR or
-                    attr == constants.TYPE_ATTR):
+        children = list(node)
+        text = node.text
+        if not children:
+            if not text:
+                if attrType == constants.TYPE_DICT:
+                    return {}
+                elif attrType == constants.TYPE_LIST:
+                    return []
+                else:
+                    return ''
+            if attrType in _CONVERTERS:
+                return _CONVERTERS[attrType](text)
+            return text
+        try:
+            key = keys[node.tag]
+        except KeyError:
+            key = keys[node.tag] = self._get_key(node.tag)
+        if key in listnames:
+            return [self._from_xml_node(n, listnames, keys)
+                    for n in children]
+        result = dict()
+        for attr, value in node.items():
+            if (attr == 'xmlns' or
+                attr.startswith('xmlns:') or
+                attr == constants.XSI_ATTR or
+                attr == constants.TYPE_ATTR):
+                continue
+            result[self._get_key(attr)] = value
+        for child in children:
+            try:
+                child_key = keys[child.tag]
+            except KeyError:
+                child_key = keys[child.tag] = self._get_key(child.tag)
+            result[child_key] = self._from_xml_node(child, listnames, keys)
+        return result
+
+    def iterparse(self, chunks, collection, extra=None):
+        """Yields the items of a <collection> XML document.
+
+        The document is parsed from chunks, an iterable of strings, as the
+        items are consumed, and each item is dropped from the tree once it
+        was converted, so that large lists are not held in memory at once.
+        The atom links of the document, such as the pagination links, are
+        stored in the extra dict under the '<collection>_links' key, as
+        _from_xml() returns them.
+        """
+        if extra is None:
+            extra = {}
+        plurals = set(self.metadata.get('plurals', {}))
+        keys = {}
+        links = []
+        depth = 0
+        root = None
+        try:
+            for event, elem in etree.iterparse(_ChunkFile(chunks),
+                                               ('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if root is None:
+                        root = elem
                     continue
-                result[self._get_key(attr)] = node.get(attr)
-            children = list(node)
-            for child in children:
-                result[self._get_key(child.tag)] = self._from_xml_node(
-                    child, listnames)
-            return result
+                depth -= 1
+                if depth != 1:
+                    continue
+                if elem.tag == constants.ATOM_LINK_NOTATION:
+                    links.append({'rel': elem.get('rel'),
+                                  'href': elem.get('href')})
+                else:
+                    yield self._from_xml_node(elem, plurals, keys)
+                # The item is complete, drop it and its predecessors
+                root.clear()
+        except (expat.ExpatError, SyntaxError):
+            msg = _("Cannot understand XML")
+            raise exception.MalformedRequestBody(reason=msg)
+        if links:
+            extra['%s_links' % collection] = links
 
     def default(self, datastring):
         return {'body': self._from_xml(datastring)}
@@ -373,15 +479,19 @@ class Serializer(object):
         """
         self.metadata = metadata or {}
         self.default_xmlns = default_xmlns
-
-    def _get_serialize_handler(self, content_type):
-        handlers = {
+        # Handlers are stateless, so they are created once and reused
+        self._serialize_handlers = {
             'application/json': JSONDictSerializer(),
             'application/xml': XMLDictSerializer(self.metadata),
         }
+        self._deserialize_handlers = {
+            'application/json': JSONDeserializer(),
+            'application/xml': XMLDeserializer(self.metadata),
+        }
 
+    def _get_serialize_handler(self, content_type):
         try:
-            return handlers[content_type]
+            return self._serialize_handlers[content_type]
         except Exception:
             raise exception.InvalidContentType(content_type=content_type)
 
@@ -399,12 +509,7 @@ class Serializer(object):
             datastring)
 
     def get_deserialize_handler(self, content_type):
-        handlers = {
-            'application/json': JSONDeserializer(),
-            'application/xml': XMLDeserializer(self.metadata),
-        }
-
         try:
-            return handlers[content_type]
+            return self._deserialize_handlers[content_type]
         except Exception:
             raise exception.InvalidContentType(content_type=content_type)
@@ -21,11 +21,11 @@
 """Utilities and helper functions."""
 
 import datetime
-import json
 import logging
 import os
 import sys
 
+from neutronclient.common import codec
 from neutronclient.common import exceptions
 from neutronclient.openstack.common import strutils
 
@@ -65,14 +65,14 @@ def to_primitive(value):
 
 def dumps(value, indent=None):
     try:
-        return json.dumps(value, indent=indent)
+        return codec.dumps(value, indent=indent)
     except TypeError:
         pass
-    return json.dumps(to_primitive(value))
+    return codec.dumps(to_primitive(value))
 
 
 def loads(s):
-    return json.loads(s)
+    return codec.loads(s)
 
 
 def import_class(import_str):
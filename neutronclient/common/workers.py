@@ -0,0 +1,212 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""A small thread pool used to keep several API requests in flight."""
+
+import logging
+import Queue
+import sys
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+# Waiting on a queue or an event without a timeout can not be
+# interrupted by Ctrl-C
+_FOREVER = 2 ** 31
+_END = object()
+
+
+class Future(object):
+    """The pending result of a call submitted to a WorkerPool."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self):
+        """Waits for the call to complete and returns its result.
+
+        If the call raised an exception, it is raised again here.
+        """
+        self._done.wait(_FOREVER)
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self):
+        """Waits for the call to complete and returns what it raised."""
+        self._done.wait(_FOREVER)
+        return self._exc_info and self._exc_info[1]
+
+    def add_done_callback(self, fn):
+        """Calls fn(future) once the call completed (immediately if it
+        already did), in the thread which completed it.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, result=None, exc_info=None):
+        with self._lock:
+            self._result = result
+            self._exc_info = exc_info
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                _logger.exception("Future callback failed")
+
+
+class WorkerPool(object):
+    """Runs calls on at most max_workers daemon threads.
+
+    Threads are started on demand by the first max_workers submissions,
+    so a pool which is never used costs nothing.
+    """
+
+    def __init__(self, max_workers=10):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) and returns its Future."""
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to a pool shut down")
+            self._queue.put((future, fn, args, kwargs))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                self._threads.append(thread)
+                thread.start()
+        return future
+
+    def map(self, fn, *iterables):
+        """Like the map() built-in, but calls run concurrently.
+
+        Returns the list of results in order, or raises the exception of
+        the first failed call once all calls completed.
+        """
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        wait(futures)
+        return [f.result() for f in futures]
+
+    def shutdown(self, wait=True):
+        """Stops the threads once the calls already submitted completed."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+            for thread in threads:
+                self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            try:
+                future._finish(result=fn(*args, **kwargs))
+            except Exception:
+                future._finish(exc_info=sys.exc_info())
+
+
+def wait(futures):
+    """Waits until all the given futures completed."""
+    for future in futures:
+        future._done.wait(_FOREVER)
+
+
+def read_ahead(iterable, depth=1):
+    """Yields the items of iterable, produced by a background thread.
+
+    The thread stays up to depth items ahead of the consumer, so that
+    producing the next items (e.g. fetching the next pages of a list)
+    overlaps with processing the current one.  Exceptions raised by the
+    iterable are raised again to the consumer.
+
+    Callers which stop iterating early must close() the generator: this
+    stops the thread once it produced its current item, and closes the
+    iterable if it has a close() method.  Otherwise the thread keeps
+    waiting to queue its items until the generator is garbage collected.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+    items = Queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    break
+            else:
+                put((_END, None))
+        except Exception:
+            put((None, sys.exc_info()))
+        finally:
+            if stop.is_set() and hasattr(iterable, 'close'):
+                iterable.close()
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, exc_info = items.get(timeout=_FOREVER)
+            if exc_info:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            if item is _END:
+                return
+            yield item
+    finally:
+        stop.set()
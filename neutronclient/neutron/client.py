@@ -45,7 +45,12 @@ def make_client(instance):
                                 endpoint_url=url,
                                 token=instance._token,
                                 auth_strategy=instance._auth_strategy,
-                                insecure=instance._insecure)
+                                insecure=instance._insecure,
+                                token_cache=instance._token_cache,
+                                trust_ids=instance._trust_ids,
+                                resource_id_cache_size=(
+                                    instance._resource_id_cache_size),
+                                request_hooks=instance._request_hooks)
         return client
     else:
         raise exceptions.UnsupportedVersion("API version %s is not supported" %
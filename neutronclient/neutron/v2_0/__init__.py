@@ -16,6 +16,7 @@
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
 import argparse
+import itertools
 import logging
 import re
 
@@ -25,7 +26,9 @@ from cliff import show
 
 from neutronclient.common import command
 from neutronclient.common import exceptions
+from neutronclient.common import profiler
 from neutronclient.common import utils
+from neutronclient.common import workers
 from neutronclient.openstack.common.gettextutils import _
 
 HEX_ELEM = '[0-9A-Fa-f]'
@@ -35,9 +38,21 @@ UUID_PATTERN = '-'.join([HEX_ELEM + '{8}', HEX_ELEM + '{4}',
 
 
 def find_resourceid_by_name_or_id(client, resource, name_or_id):
-    obj_lister = getattr(client, "list_%ss" % resource)
     # perform search by id only if we are passing a valid UUID
-    match = re.match(UUID_PATTERN, name_or_id)
+    match = re.match(UUID_PATTERN + '$', name_or_id)
+    if match and client.trust_ids:
+        return name_or_id
+    _id = client.resource_id_cache.get((resource, name_or_id))
+    if _id is None:
+        with profiler.phase('name lookups'):
+            _id = _find_resourceid_by_name_or_id(client, resource,
+                                                 name_or_id, match)
+        client.resource_id_cache.set((resource, name_or_id), _id)
+    return _id
+
+
+def _find_resourceid_by_name_or_id(client, resource, name_or_id, match):
+    obj_lister = getattr(client, "list_%ss" % resource)
     collection = resource + "s"
     if match:
         data = obj_lister(id=name_or_id, fields='id')
@@ -52,22 +67,87 @@ def _find_resourceid_by_name(client, resource, name):
     collection = resource + "s"
     info = data[collection]
     if len(info) > 1:
-        msg = (_("Multiple %(resource)s matches found for name '%(name)s',"
-               " use an ID to be more specific.") %
-               {'resource': resource, 'name': name})
-        raise exceptions.NeutronClientException(
-            message=msg)
+        raise _multiple_matches_error(resource, name)
     elif len(info) == 0:
-        not_found_message = (_("Unable to find %(resource)s with name "
-                               "'%(name)s'") %
-                             {'resource': resource, 'name': name})
-        # 404 is used to simulate server side behavior
-        raise exceptions.NeutronClientException(
-            message=not_found_message, status_code=404)
+        raise _not_found_error(resource, name)
     else:
         return info[0]['id']
 
 
+def _multiple_matches_error(resource, name):
+    msg = (_("Multiple %(resource)s matches found for name '%(name)s',"
+           " use an ID to be more specific.") %
+           {'resource': resource, 'name': name})
+    return exceptions.NeutronClientException(message=msg)
+
+
+def _not_found_error(resource, name):
+    not_found_message = (_("Unable to find %(resource)s with name "
+                           "'%(name)s'") %
+                         {'resource': resource, 'name': name})
+    # 404 is used to simulate server side behavior
+    return exceptions.NeutronClientException(
+        message=not_found_message, status_code=404)
+
+
+def find_resourceids_by_names_or_ids(client, resource, names_or_ids):
+    """Resolve many names or IDs of resources at once.
+
+    Unlike find_resourceid_by_name_or_id(), the given IDs are listed with
+    as few requests as the length of their URIs allows, and so are the
+    names and the IDs which were not found.  Returns a dict mapping each
+    of names_or_ids to the ID of its resource, or to the
+    NeutronClientException raised by find_resourceid_by_name_or_id() for
+    it.
+    """
+    collection = resource + "s"
+    refs = []
+    for ref in names_or_ids:
+        if ref not in refs:
+            refs.append(ref)
+    results = {}
+    for ref in refs:
+        if re.match(UUID_PATTERN + '$', ref) and client.trust_ids:
+            results[ref] = ref
+        else:
+            _id = client.resource_id_cache.get((resource, ref))
+            if _id is not None:
+                results[ref] = _id
+    uuids = [ref for ref in refs
+             if ref not in results and re.match(UUID_PATTERN + '$', ref)]
+    if uuids:
+        with profiler.phase('name lookups'):
+            data = client.list_in_chunks(collection, 'id', uuids,
+                                         fields='id')
+        # The server may return the IDs in another case than given
+        refs_by_id = {}
+        for ref in uuids:
+            refs_by_id.setdefault(ref.lower(), []).append(ref)
+        for info in data[collection]:
+            for ref in refs_by_id.get(info['id'].lower(), []):
+                results[ref] = info['id']
+    names = [ref for ref in refs if ref not in results]
+    if names:
+        with profiler.phase('name lookups'):
+            data = client.list_in_chunks(collection, 'name', names,
+                                         fields=['id', 'name'])
+        matches = {}
+        for info in data[collection]:
+            matches.setdefault(info['name'], []).append(info['id'])
+        for name in names:
+            ids = matches.get(name, [])
+            if len(ids) > 1:
+                results[name] = _multiple_matches_error(resource, name)
+            elif len(ids) == 0:
+                results[name] = _not_found_error(resource, name)
+            else:
+                results[name] = ids[0]
+    for ref in refs:
+        if not isinstance(results[ref], Exception):
+            client.resource_id_cache.set((resource, ref), results[ref])
+    return results
+
+
 def add_show_list_common_argument(parser):
     parser.add_argument(
         '-D', '--show-details',
@@ -295,6 +375,11 @@ class NeutronCommand(command.OpenStackCommand):
 
         return parser
 
+    def produce_output(self, parsed_args, column_names, data):
+        with profiler.phase('formatting'):
+            return super(NeutronCommand, self).produce_output(
+                parsed_args, column_names, data)
+
     def format_output_data(self, data):
         # Modify data to make it more readable
         if self.resource in data:
@@ -325,6 +410,10 @@ class CreateCommand(NeutronCommand, show.ShowOne):
     api = 'network'
     resource = None
     log = None
+    # Whether the resource has a status --wait can wait for
+    has_status = False
+    # Statuses in which the resource is ready, for --wait
+    wait_statuses = ('ACTIVE',)
 
     def get_parser(self, prog_name):
         parser = super(CreateCommand, self).get_parser(prog_name)
@@ -334,9 +423,36 @@ class CreateCommand(NeutronCommand, show.ShowOne):
         parser.add_argument(
             '--tenant_id',
             help=argparse.SUPPRESS)
+        if self.has_status:
+            parser.add_argument(
+                '--wait', action='store_true',
+                help=_('wait until the %(resource)s is %(statuses)s') %
+                {'resource': self.resource,
+                 'statuses': ' or '.join(self.wait_statuses)})
+            parser.add_argument(
+                '--wait-timeout', metavar='SECONDS', type=int, default=300,
+                help=_('maximum time to wait, 300 seconds by default'))
         self.add_known_arguments(parser)
         return parser
 
+    def wait_ready(self, neutron_client, info, timeout):
+        """Waits until the created resource described by info is in one of
+        wait_statuses and updates its status.
+        """
+        status = neutron_client.wait_for_status(
+            self.resource, [info['id']], target=self.wait_statuses,
+            timeout=timeout)[info['id']]
+        if status is None:
+            raise exceptions.CommandError(
+                _("%(resource)s %(id)s was deleted") %
+                {'resource': self.resource, 'id': info['id']})
+        info['status'] = status
+        if status not in self.wait_statuses:
+            raise exceptions.CommandError(
+                _("%(resource)s %(id)s is %(status)s") %
+                {'resource': self.resource, 'id': info['id'],
+                 'status': status})
+
     def get_data(self, parsed_args):
         self.log.debug('get_data(%s)' % parsed_args)
         neutron_client = self.get_client()
@@ -349,6 +465,9 @@ class CreateCommand(NeutronCommand, show.ShowOne):
         obj_creator = getattr(neutron_client,
                               "create_%s" % self.resource)
         data = obj_creator(body)
+        if self.has_status and parsed_args.wait:
+            self.wait_ready(neutron_client, data[self.resource],
+                            parsed_args.wait_timeout)
         self.format_output_data(data)
         # {u'network': {u'id': u'e9424a76-6db4-4c93-97b6-ec311cd51f19'}}
         info = self.resource in data and data[self.resource] or None
@@ -359,6 +478,112 @@ class CreateCommand(NeutronCommand, show.ShowOne):
         return zip(*sorted(info.iteritems()))
 
 
+class BulkCreateCommand(NeutronCommand, lister.Lister):
+    """Create many resources described in a file
+
+    """
+
+    api = 'network'
+    resource = None
+    log = None
+    list_columns = ['id', 'name', 'error']
+
+    def get_parser(self, prog_name):
+        parser = super(BulkCreateCommand, self).get_parser(prog_name)
+        parser.add_argument(
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('the owner tenant ID of the resources which do not '
+                   'specify one'))
+        parser.add_argument(
+            '--chunk-size', metavar='SIZE', type=int,
+            help=_('maximum number of resources created per request'))
+        parser.add_argument(
+            '--parallel', metavar='N', type=int, default=1,
+            help=_('number of requests sent concurrently'))
+        parser.add_argument(
+            'file', metavar='FILE',
+            help=_('JSON or YAML file holding either a list of %(resource)s '
+                   'definitions or a {"%(resource)ss": [...]} body')
+            % {'resource': self.resource})
+        return parser
+
+    def load_resources(self, path):
+        collection = self.resource + "s"
+        try:
+            with open(path) as f:
+                content = f.read()
+        except IOError as e:
+            raise exceptions.CommandError(
+                _("Unable to read %(path)s: %(error)s") %
+                {'path': path, 'error': e})
+        try:
+            data = utils.loads(content)
+        except ValueError:
+            try:
+                # Only imported when needed, it is slow to import
+                import yaml
+            except ImportError:
+                raise exceptions.CommandError(
+                    _("%s is not valid JSON, and PyYAML is not installed "
+                      "to read YAML") % path)
+            try:
+                data = yaml.safe_load(content)
+            except yaml.YAMLError as e:
+                raise exceptions.CommandError(
+                    _("%(path)s is neither valid JSON nor YAML: %(error)s")
+                    % {'path': path, 'error': e})
+        if isinstance(data, dict):
+            data = data.get(collection)
+        if (not isinstance(data, list) or
+                not all(isinstance(r, dict) for r in data)):
+            raise exceptions.CommandError(
+                _("%(path)s must hold a list of %(resource)s definitions")
+                % {'path': path, 'resource': self.resource})
+        return data
+
+    def get_data(self, parsed_args):
+        self.log.debug('get_data(%s)' % parsed_args)
+        neutron_client = self.get_client()
+        neutron_client.format = parsed_args.request_format
+        resources = self.load_resources(parsed_args.file)
+        if parsed_args.tenant_id:
+            for resource in resources:
+                resource.setdefault('tenant_id', parsed_args.tenant_id)
+        obj_creator = getattr(neutron_client,
+                              "bulk_create_%ss" % self.resource)
+        results = obj_creator(resources, chunk_size=parsed_args.chunk_size,
+                              max_workers=parsed_args.parallel)
+        rows = []
+        failed = 0
+        for resource, (created, error) in zip(resources, results):
+            if error is not None:
+                failed += 1
+                rows.append(('', resource.get('name', ''), error))
+            else:
+                rows.append((created.get('id', ''), created.get('name', ''),
+                             ''))
+        # Not written to stdout, which only holds the list of the
+        # resources in the format asked for
+        self.log.info(_('Created %(created)d of %(total)d %(resource)ss'),
+                      {'created': len(rows) - failed, 'total': len(rows),
+                       'resource': self.resource})
+        self.failed_count = failed
+        self.total_count = len(rows)
+        return (self.list_columns, rows)
+
+    def run(self, parsed_args):
+        self.failed_count = 0
+        result = super(BulkCreateCommand, self).run(parsed_args)
+        if self.failed_count:
+            # Makes the command exit with an error status
+            raise exceptions.NeutronClientException(
+                message=_('Failed to create %(failed)d of %(total)d '
+                          '%(resource)ss') %
+                {'failed': self.failed_count, 'total': self.total_count,
+                 'resource': self.resource})
+        return result
+
+
 class UpdateCommand(NeutronCommand):
     """Update resource's information
     """
@@ -403,7 +628,7 @@ class UpdateCommand(NeutronCommand):
 
 
 class DeleteCommand(NeutronCommand):
-    """Delete a given resource
+    """Delete given resources
 
     """
 
@@ -411,34 +636,138 @@ class DeleteCommand(NeutronCommand):
     resource = None
     log = None
     allow_names = True
+    max_workers = 10
 
     def get_parser(self, prog_name):
         parser = super(DeleteCommand, self).get_parser(prog_name)
         if self.allow_names:
-            help_str = 'ID or name of %s to delete'
+            help_str = 'ID(s) or name(s) of %s to delete'
         else:
-            help_str = 'ID of %s to delete'
+            help_str = 'ID(s) of %s to delete'
         parser.add_argument(
-            'id', metavar=self.resource.upper(),
+            '--tenant-id', metavar='TENANT_ID',
+            help=_('delete all the %ss of the given tenant (can be combined '
+                   'with filters given after --), with --all') %
+            self.resource)
+        parser.add_argument(
+            '--all', action='store_true',
+            help=_('confirm the deletion of all the %ss matching --tenant-id '
+                   'and the filters, which are only listed otherwise') %
+            self.resource)
+        parser.add_argument(
+            '--parallel', metavar='N', type=int, default=self.max_workers,
+            help=_('number of DELETE requests sent concurrently when '
+                   'deleting several resources (default: %d)')
+            % self.max_workers)
+        parser.add_argument(
+            'id', metavar=self.resource.upper(), nargs='*',
             help=help_str % self.resource)
         return parser
 
+    def _find_ids(self, neutron_client, parsed_args):
+        """Returns the list of (ref, ID or exception) pairs to delete."""
+        filters = parse_args_to_dict(self.values_specs)
+        if parsed_args.tenant_id:
+            filters['tenant_id'] = parsed_args.tenant_id
+        if parsed_args.id and filters:
+            raise exceptions.CommandError(
+                _("Specify either %(resource)ss or filters, not both") %
+                {'resource': self.resource})
+        if filters:
+            return self._find_filtered_ids(neutron_client, filters,
+                                           parsed_args)
+        if not parsed_args.id:
+            raise exceptions.CommandError(
+                _("Specify the %(resource)ss to delete, or filters") %
+                {'resource': self.resource})
+        if not self.allow_names:
+            return [(_id, _id) for _id in parsed_args.id]
+        ids = find_resourceids_by_names_or_ids(neutron_client, self.resource,
+                                               parsed_args.id)
+        return [(ref, ids[ref]) for ref in parsed_args.id]
+
+    def _find_filtered_ids(self, neutron_client, filters, parsed_args):
+        obj_lister = getattr(neutron_client, "list_%ss" % self.resource)
+        # The server ignores the filters on unknown attributes, which would
+        # then match every resource: the attributes filtered on are
+        # requested as well, to check they exist
+        keys = sorted(filters)
+        data = obj_lister(fields=['id'] + keys, **filters)
+        resources = data[self.resource + "s"]
+        unknown = sorted(set(key for r in resources for key in keys
+                             if key not in r))
+        if unknown:
+            raise exceptions.CommandError(
+                _("Unknown %(resource)s attributes: %(keys)s") %
+                {'resource': self.resource, 'keys': ', '.join(unknown)})
+        if not parsed_args.all:
+            for r in resources:
+                print >>self.app.stdout, (
+                    _('Matching %(resource)s: %(id)s') %
+                    {'resource': self.resource, 'id': r['id']})
+            raise exceptions.CommandError(
+                _("%(count)d %(resource)ss match, use --all to delete "
+                  "them") % {'count': len(resources),
+                             'resource': self.resource})
+        return [(r['id'], r['id']) for r in resources]
+
     def run(self, parsed_args):
         self.log.debug('run(%s)' % parsed_args)
         neutron_client = self.get_client()
         neutron_client.format = parsed_args.request_format
         obj_deleter = getattr(neutron_client,
                               "delete_%s" % self.resource)
-        if self.allow_names:
-            _id = find_resourceid_by_name_or_id(neutron_client, self.resource,
-                                                parsed_args.id)
+        if (len(parsed_args.id) == 1 and not parsed_args.tenant_id and
+                not self.values_specs):
+            if self.allow_names:
+                _id = find_resourceid_by_name_or_id(
+                    neutron_client, self.resource, parsed_args.id[0])
+            else:
+                _id = parsed_args.id[0]
+            obj_deleter(_id)
+            print >>self.app.stdout, (_('Deleted %(resource)s: %(id)s')
+                                      % {'id': parsed_args.id[0],
+                                         'resource': self.resource})
+            return
+        self._delete_many(obj_deleter,
+                          self._find_ids(neutron_client, parsed_args),
+                          parsed_args.parallel)
+
+    def _delete_many(self, obj_deleter, targets, max_workers):
+        def _delete(_id):
+            if isinstance(_id, Exception):
+                return _id
+            try:
+                obj_deleter(_id)
+            except exceptions.NeutronClientException as e:
+                return e
+
+        ids = [_id for ref, _id in targets]
+        if max_workers > 1 and len(ids) > 1:
+            with workers.WorkerPool(min(max_workers, len(ids))) as pool:
+                errors = pool.map(_delete, ids)
         else:
-            _id = parsed_args.id
-        obj_deleter(_id)
-        print >>self.app.stdout, (_('Deleted %(resource)s: %(id)s')
-                                  % {'id': parsed_args.id,
-                                     'resource': self.resource})
-        return
+            errors = [_delete(_id) for _id in ids]
+        failed = 0
+        for (ref, _id), error in zip(targets, errors):
+            if error is None:
+                print >>self.app.stdout, (_('Deleted %(resource)s: %(id)s')
+                                          % {'id': ref,
+                                             'resource': self.resource})
+            else:
+                failed += 1
+                print >>self.app.stdout, (
+                    _('Unable to delete %(resource)s: %(id)s (%(error)s)')
+                    % {'id': ref, 'resource': self.resource,
+                       'error': error})
+        print >>self.app.stdout, (
+            _('Deleted %(deleted)d of %(total)d %(resource)ss') %
+            {'deleted': len(targets) - failed, 'total': len(targets),
+             'resource': self.resource})
+        if failed:
+            raise exceptions.NeutronClientException(
+                message=_('Failed to delete %(failed)d %(resource)ss') %
+                {'failed': failed, 'resource': self.resource})
 
 
 class ListCommand(NeutronCommand, lister.Lister):
@@ -454,6 +783,12 @@ class ListCommand(NeutronCommand, lister.Lister):
     unknown_parts_flag = True
     pagination_support = False
     sorting_support = False
+    # Maximum number of concurrent requests sent by extend_list()
+    max_workers = 4
+    _related_futures = None
+    # Whether retrieve_list() returns the resources page by page, as
+    # they are retrieved, for fetch_related()
+    _by_page = False
 
     def get_parser(self, prog_name):
         parser = super(ListCommand, self).get_parser(prog_name)
@@ -464,16 +799,47 @@ class ListCommand(NeutronCommand, lister.Lister):
             add_sorting_argument(parser)
         return parser
 
+    def list_fields(self, parsed_args):
+        """Returns the fields to request, an empty list for all of them.
+
+        Unless fields are given with -F, only the fields of the columns
+        which will be displayed are requested: those selected with -c or
+        else list_columns.
+        """
+        if parsed_args.fields:
+            return parsed_args.fields
+        if parsed_args.show_details:
+            return []
+        columns = getattr(parsed_args, 'columns', None) or self.list_columns
+        fields = []
+        for column in columns:
+            if column not in fields:
+                fields.append(column)
+        return fields
+
     def args2search_opts(self, parsed_args):
         search_opts = {}
-        fields = parsed_args.fields
-        if parsed_args.fields:
+        fields = self.list_fields(parsed_args)
+        if fields:
             search_opts.update({'fields': fields})
         if parsed_args.show_details:
             search_opts.update({'verbose': 'True'})
         return search_opts
 
     def call_server(self, neutron_client, search_opts, parsed_args):
+        """Request the resources from Neutron server.
+
+        Returns either the response body or an iterable of resources, or
+        an iterable of the response bodies of each page if they are
+        retrieved by page.
+        """
+        if self._by_page:
+            obj_lister = getattr(neutron_client,
+                                 "list_%ss" % self.resource)
+            return obj_lister(retrieve_all=False, **search_opts)
+        obj_iter = getattr(neutron_client, "iter_%ss" % self.resource, None)
+        if obj_iter is not None:
+            return obj_iter(**search_opts)
         obj_lister = getattr(neutron_client,
                              "list_%ss" % self.resource)
         data = obj_lister(**search_opts)
@@ -506,7 +872,15 @@ class ListCommand(NeutronCommand, lister.Lister):
                 search_opts.update({'sort_dir': dirs})
         data = self.call_server(neutron_client, search_opts, parsed_args)
         collection = self.resource + "s"
-        return data.get(collection, [])
+        if isinstance(data, dict):
+            if self._by_page:
+                return [data.get(collection, [])]
+            return data.get(collection, [])
+        if self._by_page:
+            return (page.get(collection, []) for page in data)
+        # Resources are fetched page by page while being consumed, i.e.
+        # formatted
+        return profiler.iterate('API calls', data)
 
     def extend_list(self, data, parsed_args):
         """Update a retrieved list.
@@ -517,8 +891,60 @@ class ListCommand(NeutronCommand, lister.Lister):
         """
         pass
 
+    def fetch_related(self, data, parsed_args):
+        """Fetch the resources extend_list() needs for data.
+
+        When this method is overridden, it is called for each page of
+        resources as soon as it is retrieved, on a worker thread, while
+        the next pages are retrieved.  extend_list() gets the merged dicts
+        returned for all the pages with get_related().
+        """
+        return {}
+
+    def get_related(self, data, parsed_args):
+        """Return the resources fetched by fetch_related() for data.
+
+        They are fetched now if they were not while data was retrieved,
+        e.g. when extend_list() is called directly.
+        """
+        futures, self._related_futures = self._related_futures, None
+        if futures is None:
+            return self.fetch_related(data, parsed_args)
+        related = {}
+        for future in futures:
+            related.update(future.result())
+        return related
+
+    def _overrides(self, name):
+        for klass in type(self).__mro__:
+            if klass is ListCommand:
+                return False
+            if name in klass.__dict__:
+                return True
+        return False
+
+    def _extends_list(self):
+        return self._overrides('extend_list')
+
+    def _retrieve_related(self, pages, parsed_args, pool):
+        # Start fetching the related resources of each page while the
+        # next ones are retrieved
+        resources = []
+        futures = []
+        for page in pages:
+            resources.extend(page)
+            futures.append(pool.submit(self.fetch_related, page,
+                                       parsed_args))
+        self._related_futures = futures
+        return resources
+
     def setup_columns(self, info, parsed_args):
-        _columns = len(info) > 0 and sorted(info[0].keys()) or []
+        # info may be a generator, only its first item is needed up front
+        info = iter(info)
+        first = next(info, None)
+        if first is not None:
+            info = itertools.chain([first], info)
+        _columns = first and sorted(first.keys()) or []
         if not _columns:
             # clean the parsed_args.columns so that cliff will not break
             parsed_args.columns = []
@@ -535,8 +961,22 @@ class ListCommand(NeutronCommand, lister.Lister):
 
     def get_data(self, parsed_args):
         self.log.debug('get_data(%s)' % parsed_args)
+        # The related resources of each page the server returns are
+        # fetched as soon as it is retrieved
+        self._by_page = (self._extends_list() and
+                         self._overrides('fetch_related'))
         data = self.retrieve_list(parsed_args)
-        self.extend_list(data, parsed_args)
+        if self._extends_list():
+            # extend_list() works on the whole list of resources
+            if self._by_page:
+                with workers.WorkerPool(self.max_workers) as pool:
+                    data = self._retrieve_related(data, parsed_args, pool)
+                    with profiler.phase('extend_list'):
+                        self.extend_list(data, parsed_args)
+            else:
+                data = list(data)
+                with profiler.phase('extend_list'):
+                    self.extend_list(data, parsed_args)
         return self.setup_columns(data, parsed_args)
 
 
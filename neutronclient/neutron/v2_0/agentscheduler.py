@@ -116,7 +116,8 @@ class ListDhcpAgentsHostingNetwork(neutronV20.ListCommand):
 
     def extend_list(self, data, parsed_args):
         for agent in data:
-            agent['alive'] = ":-)" if agent['alive'] else 'xxx'
+            if 'alive' in agent:
+                agent['alive'] = ":-)" if agent['alive'] else 'xxx'
 
     def call_server(self, neutron_client, search_opts, parsed_args):
         _id = neutronV20.find_resourceid_by_name_or_id(neutron_client,
@@ -223,7 +224,8 @@ class ListL3AgentsHostingRouter(neutronV20.ListCommand):
 
     def extend_list(self, data, parsed_args):
         for agent in data:
-            agent['alive'] = ":-)" if agent['alive'] else 'xxx'
+            if 'alive' in agent:
+                agent['alive'] = ":-)" if agent['alive'] else 'xxx'
 
     def call_server(self, neutron_client, search_opts, parsed_args):
         _id = neutronV20.find_resourceid_by_name_or_id(neutron_client,
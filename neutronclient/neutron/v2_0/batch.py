@@ -0,0 +1,337 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import logging
+import os
+import re
+import shlex
+import SocketServer
+import stat
+import StringIO
+import threading
+
+from neutronclient.common import command
+from neutronclient.common import exceptions
+from neutronclient.common import utils
+from neutronclient.common import workers
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient.openstack.common.gettextutils import _
+from neutronclient import shell
+
+
+def _parser_error(message):
+    raise exceptions.CommandError(message)
+
+
+def _commands(lines):
+    """Yields the lines which are neither blank nor comments, stripped."""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+class CommandApp(object):
+    """The application as seen by a command of a batch.
+
+    Everything is the application's but the output of the command, which
+    is captured.
+    """
+
+    def __init__(self, app):
+        self._app = app
+        self.stdout = StringIO.StringIO()
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+
+class Batch(command.OpenStackCommand):
+    """Run commands read from a file, stdin or a UNIX socket.
+
+    Each line is a command with its arguments, as given to neutron.  The
+    commands share the authentication and connections of the client.  The
+    result of each command is printed as a line of JSON with the command,
+    its exit status, its output and its error message.
+
+    With --parallel, the commands of FILE run concurrently, except that a
+    command mentioning a name created by a previous command runs after
+    it, and a command updating or deleting that name runs after all the
+    previous commands mentioning it.  A command is not run if one it
+    follows failed.  The results are still printed
+    in the order of the commands.  The commands must all use the same
+    --request-format, as they share the client.
+    """
+
+    api = 'network'
+    log = logging.getLogger(__name__ + '.Batch')
+
+    def get_parser(self, prog_name):
+        parser = super(Batch, self).get_parser(prog_name)
+        parser.add_argument(
+            'file', metavar='FILE', nargs='?', default='-',
+            help=_('File to read the commands from, - for stdin'))
+        parser.add_argument(
+            '--socket', metavar='PATH',
+            help=_('Serve the commands sent on the UNIX socket PATH '
+                   'instead of reading FILE, until interrupted'))
+        parser.add_argument(
+            '--parallel', metavar='N', type=int, default=1,
+            help=_('Run up to N commands of FILE at once'))
+        return parser
+
+    def get_command(self, argv, app):
+        """Returns the command of argv, its parser and its arguments."""
+        cmd_factory, cmd_name, sub_argv = (
+            self.app.command_manager.find_command(argv))
+        if cmd_name == 'batch':
+            raise exceptions.CommandError(
+                _("batch can not be run in a batch"))
+        cmd = cmd_factory(app, self.app_args)
+        cmd_parser = cmd.get_parser(cmd_name)
+        # Do not exit on invalid arguments
+        cmd_parser.error = _parser_error
+        return cmd, cmd_parser, sub_argv
+
+    def run_line(self, line):
+        """Run the command of a line and returns its result."""
+        result = {'command': line, 'status': 0, 'output': '', 'error': None}
+        app = CommandApp(self.app)
+        try:
+            cmd, cmd_parser, sub_argv = self.get_command(shlex.split(line),
+                                                         app)
+            result['status'] = shell.run_command(cmd, cmd_parser, sub_argv)
+        except SystemExit as e:
+            # e.g. --help
+            result['status'] = e.code or 0
+        except Exception as e:
+            self.log.debug('%s failed', line, exc_info=True)
+            result['status'] = 1
+            result['error'] = unicode(e)
+        result['output'] = app.stdout.getvalue()
+        return result
+
+    def request_format(self, argv):
+        """Returns the --request-format of argv, if its command has one."""
+        try:
+            cmd, cmd_parser, sub_argv = self.get_command(argv, self.app)
+            return getattr(cmd_parser.parse_known_args(sub_argv)[0],
+                           'request_format', None)
+        except Exception:
+            # The command fails when run
+            pass
+
+    def written_names(self, argv):
+        """Returns the names argv creates and those it updates or deletes."""
+        if '-h' in argv or '--help' in argv:
+            return [], []
+        try:
+            cmd, cmd_parser, sub_argv = self.get_command(argv, self.app)
+            parsed_args = cmd_parser.parse_known_args(sub_argv)[0]
+            if isinstance(cmd, neutronV20.CreateCommand):
+                name = getattr(parsed_args, 'name', None)
+                return name and [name] or [], []
+            if isinstance(cmd, neutronV20.UpdateCommand):
+                return [], [parsed_args.id]
+            if isinstance(cmd, neutronV20.DeleteCommand):
+                return [], parsed_args.id
+        except Exception:
+            # The command fails when run
+            pass
+        return [], []
+
+    def plan(self, lines):
+        """Returns the indexes of the lines each line must run after.
+
+        For the names created by lines, a line mentioning a name runs
+        after the line which created it, or which last updated or deleted
+        it.  A line updating or deleting a name also runs after all the
+        lines which mentioned it since.  Words of options such as
+        --fixed-ip subnet_id=NAME,ip_address=IP are searched too.
+        """
+        # By name, the line which last created, updated or deleted it and
+        # the lines which mentioned it since
+        last_write = {}
+        reads = {}
+        deps = []
+        for index, line in enumerate(lines):
+            try:
+                argv = shlex.split(line)
+            except ValueError:
+                argv = []
+            created, changed = self.written_names(argv)
+            words = set(created)
+            for arg in argv:
+                words.update(re.split('[=,]', arg))
+            line_deps = set()
+            for word in words:
+                if word in last_write:
+                    line_deps.add(last_write[word])
+                    if word in created or word in changed:
+                        line_deps.update(reads[word])
+                if word in created or (word in changed and
+                                       word in last_write):
+                    last_write[word] = index
+                    reads[word] = []
+                elif word in last_write:
+                    reads[word].append(index)
+            deps.append(sorted(line_deps))
+        return deps
+
+    def run_graph(self, lines, output, max_workers):
+        """Run the commands of lines concurrently as allowed by plan().
+
+        Writes their results to output in order and returns the number of
+        commands run and of those which failed.
+        """
+        # The commands set the format of the client they share
+        formats = set()
+        for line in lines:
+            try:
+                formats.add(self.request_format(shlex.split(line)))
+            except ValueError:
+                pass
+        formats.discard(None)
+        if len(formats) > 1:
+            raise exceptions.CommandError(
+                _("The commands run with --parallel must all use the same "
+                  "--request-format"))
+        deps = self.plan(lines)
+        dependents = [[] for line in lines]
+        for index, line_deps in enumerate(deps):
+            for dep in line_deps:
+                dependents[dep].append(index)
+        waiting = [len(line_deps) for line_deps in deps]
+        results = [None] * len(lines)
+        done = [threading.Event() for line in lines]
+        lock = threading.Lock()
+
+        def finish(index, result):
+            # Iterative, as long chains of commands may be skipped
+            finished = [(index, result)]
+            while finished:
+                index, result = finished.pop()
+                results[index] = result
+                ready = []
+                with lock:
+                    for dependent in dependents[index]:
+                        waiting[dependent] -= 1
+                        if not waiting[dependent]:
+                            ready.append(dependent)
+                done[index].set()
+                for dependent in ready:
+                    failed = [lines[dep] for dep in deps[dependent]
+                              if results[dep]['status']]
+                    if failed:
+                        finished.append((dependent, {
+                            'command': lines[dependent], 'status': 1,
+                            'output': '',
+                            'error': _("Not run as %s failed") % failed[0]}))
+                    else:
+                        pool.submit(run, dependent)
+
+        def run(index):
+            finish(index, self.run_line(lines[index]))
+
+        with workers.WorkerPool(max_workers) as pool:
+            for index in range(len(lines)):
+                if not deps[index]:
+                    pool.submit(run, index)
+            return self.write_results(self._wait_results(results, done),
+                                      output)
+
+    def _wait_results(self, results, done):
+        for index, result_done in enumerate(done):
+            # Without a timeout, the wait could not be interrupted
+            result_done.wait(workers._FOREVER)
+            yield results[index]
+
+    def write_results(self, results, output):
+        """Writes results to output as they come.
+
+        Returns the number of results and of failed commands.
+        """
+        total = failed = 0
+        for result in results:
+            total += 1
+            if result['status']:
+                failed += 1
+            output.write(utils.dumps(result) + '\n')
+            output.flush()
+        return total, failed
+
+    def run_lines(self, lines, output):
+        """Run the commands of lines, writing their results to output.
+
+        Returns the number of commands run and of those which failed.
+        """
+        return self.write_results(
+            (self.run_line(line) for line in _commands(lines)), output)
+
+    def serve(self, path):
+        batch = self
+
+        class Handler(SocketServer.StreamRequestHandler):
+            def handle(self):
+                batch.run_lines(iter(self.rfile.readline, ''), self.wfile)
+
+        # Replace the socket of a previous server
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except OSError:
+            pass
+        server = SocketServer.UnixStreamServer(path, Handler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(path)
+
+    def take_action(self, parsed_args):
+        if parsed_args.socket:
+            self.serve(parsed_args.socket)
+            return
+        if parsed_args.file == '-':
+            stream = self.app.stdin
+        else:
+            try:
+                stream = open(parsed_args.file)
+            except IOError as e:
+                raise exceptions.CommandError(
+                    _("Unable to read %(path)s: %(error)s") %
+                    {'path': parsed_args.file, 'error': e})
+        try:
+            if parsed_args.parallel > 1:
+                # Create the client shared by the threads
+                self.app.client_manager.neutron
+                total, failed = self.run_graph(list(_commands(stream)),
+                                               self.app.stdout,
+                                               parsed_args.parallel)
+            else:
+                # readline() does not wait for more lines than needed
+                total, failed = self.run_lines(iter(stream.readline, ''),
+                                               self.app.stdout)
+        finally:
+            if stream is not self.app.stdin:
+                stream.close()
+        if failed:
+            raise exceptions.CommandError(
+                _("%(failed)d of %(total)d commands failed") %
+                {'failed': failed, 'total': total})
@@ -46,6 +46,7 @@ class CreateMember(neutronV20.CreateCommand):
 
     resource = 'member'
     log = logging.getLogger(__name__ + '.CreateMember')
+    has_status = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
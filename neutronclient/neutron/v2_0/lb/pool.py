@@ -45,6 +45,7 @@ class CreatePool(neutronV20.CreateCommand):
 
     resource = 'pool'
     log = logging.getLogger(__name__ + '.CreatePool')
+    has_status = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -45,6 +45,7 @@ class CreateVip(neutronV20.CreateCommand):
 
     resource = 'vip'
     log = logging.getLogger(__name__ + '.CreateVip')
+    has_status = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -18,7 +18,6 @@
 import argparse
 import logging
 
-from neutronclient.common import exceptions
 from neutronclient.neutron import v2_0 as neutronV20
 
 
@@ -33,9 +32,6 @@ def _format_subnets(network):
 class ListNetwork(neutronV20.ListCommand):
     """List networks that belong to a given tenant."""
 
-    # Length of a query filter on subnet id
-    # id=<uuid>& (with len(uuid)=36)
-    subnet_id_filter_len = 40
     resource = 'network'
     log = logging.getLogger(__name__ + '.ListNetwork')
     _formatters = {'subnets': _format_subnets, }
@@ -43,8 +39,8 @@ class ListNetwork(neutronV20.ListCommand):
     pagination_support = True
     sorting_support = True
 
-    def extend_list(self, data, parsed_args):
-        """Add subnet information to a network list."""
+    def fetch_related(self, data, parsed_args):
+        """Fetch the subnets of the networks in data."""
         neutron_client = self.get_client()
         search_opts = {'fields': ['id', 'cidr']}
         if self.pagination_support:
@@ -55,28 +51,17 @@ class ListNetwork(neutronV20.ListCommand):
         for n in data:
             if 'subnets' in n:
                 subnet_ids.extend(n['subnets'])
+        if not subnet_ids:
+            # Subnets are not displayed, or there are none
+            return {}
+        subnets = neutron_client.list_in_chunks(
+            'subnets', 'id', subnet_ids, max_workers=self.max_workers,
+            **search_opts).get('subnets', [])
+        return dict([(s['id'], s) for s in subnets])
 
-        def _get_subnet_list(sub_ids):
-            search_opts['id'] = sub_ids
-            return neutron_client.list_subnets(
-                **search_opts).get('subnets', [])
-
-        try:
-            subnets = _get_subnet_list(subnet_ids)
-        except exceptions.RequestURITooLong as uri_len_exc:
-            # The URI is too long because of too many subnet_id filters
-            # Use the excess attribute of the exception to know how many
-            # subnet_id filters can be inserted into a single request
-            subnet_count = len(subnet_ids)
-            max_size = ((self.subnet_id_filter_len * subnet_count) -
-                        uri_len_exc.excess)
-            chunk_size = max_size / self.subnet_id_filter_len
-            subnets = []
-            for i in xrange(0, subnet_count, chunk_size):
-                subnets.extend(
-                    _get_subnet_list(subnet_ids[i: i + chunk_size]))
-
-        subnet_dict = dict([(s['id'], s) for s in subnets])
+    def extend_list(self, data, parsed_args):
+        """Add subnet information to a network list."""
+        subnet_dict = self.get_related(data, parsed_args)
         for n in data:
             if 'subnets' in n:
                 n['subnets'] = [(subnet_dict.get(s) or {"id": s})
@@ -109,6 +94,7 @@ class CreateNetwork(neutronV20.CreateCommand):
 
     resource = 'network'
     log = logging.getLogger(__name__ + '.CreateNetwork')
+    has_status = True
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -138,6 +124,13 @@ class CreateNetwork(neutronV20.CreateCommand):
         return body
 
 
+class BulkCreateNetwork(neutronV20.BulkCreateCommand):
+    """Create many networks described in a file."""
+
+    resource = 'network'
+    log = logging.getLogger(__name__ + '.BulkCreateNetwork')
+
+
 class DeleteNetwork(neutronV20.DeleteCommand):
     """Delete a given network."""
 
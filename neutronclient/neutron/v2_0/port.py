@@ -78,6 +78,9 @@ class CreatePort(neutronV20.CreateCommand):
 
     resource = 'port'
     log = logging.getLogger(__name__ + '.CreatePort')
+    has_status = True
+    # A port stays DOWN until it is bound to a device
+    wait_statuses = ('ACTIVE', 'DOWN')
 
     def add_known_arguments(self, parser):
         parser.add_argument(
@@ -158,6 +161,13 @@ class CreatePort(neutronV20.CreateCommand):
         return body
 
 
+class BulkCreatePort(neutronV20.BulkCreateCommand):
+    """Create many ports described in a file."""
+
+    resource = 'port'
+    log = logging.getLogger(__name__ + '.BulkCreatePort')
+
+
 class DeletePort(neutronV20.DeleteCommand):
     """Delete a given port."""
 
@@ -126,11 +126,15 @@ class ListSecurityGroupRule(neutronV20.ListCommand):
         parsed_args.fields = self.replace_columns(parsed_args.fields,
                                                   self.replace_rules,
                                                   reverse=True)
+        parsed_args.columns = self.replace_columns(parsed_args.columns,
+                                                   self.replace_rules,
+                                                   reverse=True)
         return super(ListSecurityGroupRule, self).retrieve_list(parsed_args)
 
-    def extend_list(self, data, parsed_args):
+    def fetch_related(self, data, parsed_args):
+        """Fetch the names of the security groups of the rules in data."""
         if parsed_args.no_nameconv:
-            return
+            return {}
         neutron_client = self.get_client()
         search_opts = {'fields': ['id', 'name']}
         if self.pagination_support:
@@ -140,15 +144,25 @@ class ListSecurityGroupRule(neutronV20.ListCommand):
         sec_group_ids = set()
         for rule in data:
             for key in self.replace_rules:
-                sec_group_ids.add(rule[key])
-        search_opts.update({"id": sec_group_ids})
-        secgroups = neutron_client.list_security_groups(**search_opts)
+                if key in rule:
+                    sec_group_ids.add(rule[key])
+        if not sec_group_ids:
+            return {}
+        secgroups = neutron_client.list_in_chunks(
+            'security_groups', 'id', list(sec_group_ids),
+            max_workers=self.max_workers, **search_opts)
         secgroups = secgroups.get('security_groups', [])
-        sg_dict = dict([(sg['id'], sg['name'])
-                        for sg in secgroups if sg['name']])
+        return dict([(sg['id'], sg['name'])
+                     for sg in secgroups if sg['name']])
+
+    def extend_list(self, data, parsed_args):
+        if parsed_args.no_nameconv:
+            return
+        sg_dict = self.get_related(data, parsed_args)
         for rule in data:
             for key in self.replace_rules:
-                rule[key] = sg_dict.get(rule[key], rule[key])
+                if key in rule:
+                    rule[key] = sg_dict.get(rule[key], rule[key])
 
     def setup_columns(self, info, parsed_args):
         parsed_args.columns = self.replace_columns(parsed_args.columns,
@@ -154,6 +154,13 @@ class CreateSubnet(neutronV20.CreateCommand):
         return body
 
 
+class BulkCreateSubnet(neutronV20.BulkCreateCommand):
+    """Create many subnets described in a file."""
+
+    resource = 'subnet'
+    log = logging.getLogger(__name__ + '.BulkCreateSubnet')
+
+
 class DeleteSubnet(neutronV20.DeleteCommand):
     """Delete a given subnet."""
 
@@ -20,6 +20,7 @@ Command-line interface to the Neutron APIs
 """
 
 import argparse
+import collections
 import logging
 import os
 import sys
@@ -27,31 +28,17 @@ import sys
 from cliff import app
 from cliff import commandmanager
 
-from neutronclient.common import clientmanager
+from neutronclient.common import cache
 from neutronclient.common import exceptions as exc
+from neutronclient.common import profiler
 from neutronclient.common import utils
-from neutronclient.neutron.v2_0 import agent
-from neutronclient.neutron.v2_0 import agentscheduler
-from neutronclient.neutron.v2_0 import extension
-from neutronclient.neutron.v2_0 import floatingip
-from neutronclient.neutron.v2_0.lb import healthmonitor as lb_healthmonitor
-from neutronclient.neutron.v2_0.lb import member as lb_member
-from neutronclient.neutron.v2_0.lb import pool as lb_pool
-from neutronclient.neutron.v2_0.lb import vip as lb_vip
-from neutronclient.neutron.v2_0 import network
-from neutronclient.neutron.v2_0 import nvp_qos_queue
-from neutronclient.neutron.v2_0 import nvpnetworkgateway
-from neutronclient.neutron.v2_0 import port
-from neutronclient.neutron.v2_0 import quota
-from neutronclient.neutron.v2_0 import router
-from neutronclient.neutron.v2_0 import securitygroup
-from neutronclient.neutron.v2_0 import subnet
 from neutronclient.openstack.common import strutils
-from neutronclient.version import __version__
 
 
 VERSION = '2.0'
 NEUTRON_API_VERSION = '2.0'
+# Names and IDs whose resolution is cached with --os-cache
+RESOURCE_ID_CACHE_SIZE = 1000
 
 
 def run_command(cmd, cmd_parser, sub_argv):
@@ -81,107 +68,186 @@ def env(*_vars, **kwargs):
     return kwargs.get('default', '')
 
 
-COMMAND_V2 = {
-    'net-list': network.ListNetwork,
-    'net-external-list': network.ListExternalNetwork,
-    'net-show': network.ShowNetwork,
-    'net-create': network.CreateNetwork,
-    'net-delete': network.DeleteNetwork,
-    'net-update': network.UpdateNetwork,
-    'subnet-list': subnet.ListSubnet,
-    'subnet-show': subnet.ShowSubnet,
-    'subnet-create': subnet.CreateSubnet,
-    'subnet-delete': subnet.DeleteSubnet,
-    'subnet-update': subnet.UpdateSubnet,
-    'port-list': port.ListPort,
-    'port-show': port.ShowPort,
-    'port-create': port.CreatePort,
-    'port-delete': port.DeletePort,
-    'port-update': port.UpdatePort,
-    'quota-list': quota.ListQuota,
-    'quota-show': quota.ShowQuota,
-    'quota-delete': quota.DeleteQuota,
-    'quota-update': quota.UpdateQuota,
-    'ext-list': extension.ListExt,
-    'ext-show': extension.ShowExt,
-    'router-list': router.ListRouter,
-    'router-port-list': port.ListRouterPort,
-    'router-show': router.ShowRouter,
-    'router-create': router.CreateRouter,
-    'router-delete': router.DeleteRouter,
-    'router-update': router.UpdateRouter,
-    'router-interface-add': router.AddInterfaceRouter,
-    'router-interface-delete': router.RemoveInterfaceRouter,
-    'router-gateway-set': router.SetGatewayRouter,
-    'router-gateway-clear': router.RemoveGatewayRouter,
-    'floatingip-list': floatingip.ListFloatingIP,
-    'floatingip-show': floatingip.ShowFloatingIP,
-    'floatingip-create': floatingip.CreateFloatingIP,
-    'floatingip-delete': floatingip.DeleteFloatingIP,
-    'floatingip-associate': floatingip.AssociateFloatingIP,
-    'floatingip-disassociate': floatingip.DisassociateFloatingIP,
-    'security-group-list': securitygroup.ListSecurityGroup,
-    'security-group-show': securitygroup.ShowSecurityGroup,
-    'security-group-create': securitygroup.CreateSecurityGroup,
-    'security-group-delete': securitygroup.DeleteSecurityGroup,
-    'security-group-update': securitygroup.UpdateSecurityGroup,
-    'security-group-rule-list': securitygroup.ListSecurityGroupRule,
-    'security-group-rule-show': securitygroup.ShowSecurityGroupRule,
-    'security-group-rule-create': securitygroup.CreateSecurityGroupRule,
-    'security-group-rule-delete': securitygroup.DeleteSecurityGroupRule,
-    'lb-vip-list': lb_vip.ListVip,
-    'lb-vip-show': lb_vip.ShowVip,
-    'lb-vip-create': lb_vip.CreateVip,
-    'lb-vip-update': lb_vip.UpdateVip,
-    'lb-vip-delete': lb_vip.DeleteVip,
-    'lb-pool-list': lb_pool.ListPool,
-    'lb-pool-show': lb_pool.ShowPool,
-    'lb-pool-create': lb_pool.CreatePool,
-    'lb-pool-update': lb_pool.UpdatePool,
-    'lb-pool-delete': lb_pool.DeletePool,
-    'lb-pool-stats': lb_pool.RetrievePoolStats,
-    'lb-member-list': lb_member.ListMember,
-    'lb-member-show': lb_member.ShowMember,
-    'lb-member-create': lb_member.CreateMember,
-    'lb-member-update': lb_member.UpdateMember,
-    'lb-member-delete': lb_member.DeleteMember,
-    'lb-healthmonitor-list': lb_healthmonitor.ListHealthMonitor,
-    'lb-healthmonitor-show': lb_healthmonitor.ShowHealthMonitor,
-    'lb-healthmonitor-create': lb_healthmonitor.CreateHealthMonitor,
-    'lb-healthmonitor-update': lb_healthmonitor.UpdateHealthMonitor,
-    'lb-healthmonitor-delete': lb_healthmonitor.DeleteHealthMonitor,
-    'lb-healthmonitor-associate': lb_healthmonitor.AssociateHealthMonitor,
+class LazyCommandMap(collections.MutableMapping):
+    """Command classes by name, imported when they are first looked up.
+
+    :param commands: the classes or their dotted paths, by name
+    """
+
+    def __init__(self, commands):
+        self._commands = dict(commands)
+
+    def __getitem__(self, name):
+        command_class = self._commands[name]
+        if isinstance(command_class, basestring):
+            with profiler.phase('imports'):
+                command_class = utils.import_class(command_class)
+            self._commands[name] = command_class
+        return command_class
+
+    def __setitem__(self, name, command_class):
+        self._commands[name] = command_class
+
+    def __delitem__(self, name):
+        del self._commands[name]
+
+    def __iter__(self):
+        return iter(self._commands)
+
+    def __len__(self):
+        return len(self._commands)
+
+
+# Command classes by name, only imported when the command is run
+NEUTRON_V20 = 'neutronclient.neutron.v2_0.'
+COMMAND_V2 = LazyCommandMap({
+    'net-list': NEUTRON_V20 + 'network.ListNetwork',
+    'net-external-list': NEUTRON_V20 + 'network.ListExternalNetwork',
+    'net-show': NEUTRON_V20 + 'network.ShowNetwork',
+    'net-create': NEUTRON_V20 + 'network.CreateNetwork',
+    'net-bulk-create': NEUTRON_V20 + 'network.BulkCreateNetwork',
+    'net-delete': NEUTRON_V20 + 'network.DeleteNetwork',
+    'net-update': NEUTRON_V20 + 'network.UpdateNetwork',
+    'subnet-list': NEUTRON_V20 + 'subnet.ListSubnet',
+    'subnet-show': NEUTRON_V20 + 'subnet.ShowSubnet',
+    'subnet-create': NEUTRON_V20 + 'subnet.CreateSubnet',
+    'subnet-bulk-create': NEUTRON_V20 + 'subnet.BulkCreateSubnet',
+    'subnet-delete': NEUTRON_V20 + 'subnet.DeleteSubnet',
+    'subnet-update': NEUTRON_V20 + 'subnet.UpdateSubnet',
+    'port-list': NEUTRON_V20 + 'port.ListPort',
+    'port-show': NEUTRON_V20 + 'port.ShowPort',
+    'port-create': NEUTRON_V20 + 'port.CreatePort',
+    'port-bulk-create': NEUTRON_V20 + 'port.BulkCreatePort',
+    'port-delete': NEUTRON_V20 + 'port.DeletePort',
+    'port-update': NEUTRON_V20 + 'port.UpdatePort',
+    'quota-list': NEUTRON_V20 + 'quota.ListQuota',
+    'quota-show': NEUTRON_V20 + 'quota.ShowQuota',
+    'quota-delete': NEUTRON_V20 + 'quota.DeleteQuota',
+    'quota-update': NEUTRON_V20 + 'quota.UpdateQuota',
+    'ext-list': NEUTRON_V20 + 'extension.ListExt',
+    'ext-show': NEUTRON_V20 + 'extension.ShowExt',
+    'router-list': NEUTRON_V20 + 'router.ListRouter',
+    'router-port-list': NEUTRON_V20 + 'port.ListRouterPort',
+    'router-show': NEUTRON_V20 + 'router.ShowRouter',
+    'router-create': NEUTRON_V20 + 'router.CreateRouter',
+    'router-delete': NEUTRON_V20 + 'router.DeleteRouter',
+    'router-update': NEUTRON_V20 + 'router.UpdateRouter',
+    'router-interface-add': NEUTRON_V20 + 'router.AddInterfaceRouter',
+    'router-interface-delete': NEUTRON_V20 + 'router.RemoveInterfaceRouter',
+    'router-gateway-set': NEUTRON_V20 + 'router.SetGatewayRouter',
+    'router-gateway-clear': NEUTRON_V20 + 'router.RemoveGatewayRouter',
+    'floatingip-list': NEUTRON_V20 + 'floatingip.ListFloatingIP',
+    'floatingip-show': NEUTRON_V20 + 'floatingip.ShowFloatingIP',
+    'floatingip-create': NEUTRON_V20 + 'floatingip.CreateFloatingIP',
+    'floatingip-delete': NEUTRON_V20 + 'floatingip.DeleteFloatingIP',
+    'floatingip-associate': NEUTRON_V20 + 'floatingip.AssociateFloatingIP',
+    'floatingip-disassociate': (
+        NEUTRON_V20 + 'floatingip.DisassociateFloatingIP'),
+    'security-group-list': NEUTRON_V20 + 'securitygroup.ListSecurityGroup',
+    'security-group-show': NEUTRON_V20 + 'securitygroup.ShowSecurityGroup',
+    'security-group-create': NEUTRON_V20 + 'securitygroup.CreateSecurityGroup',
+    'security-group-delete': NEUTRON_V20 + 'securitygroup.DeleteSecurityGroup',
+    'security-group-update': NEUTRON_V20 + 'securitygroup.UpdateSecurityGroup',
+    'security-group-rule-list': (
+        NEUTRON_V20 + 'securitygroup.ListSecurityGroupRule'),
+    'security-group-rule-show': (
+        NEUTRON_V20 + 'securitygroup.ShowSecurityGroupRule'),
+    'security-group-rule-create': (
+        NEUTRON_V20 + 'securitygroup.CreateSecurityGroupRule'),
+    'security-group-rule-delete': (
+        NEUTRON_V20 + 'securitygroup.DeleteSecurityGroupRule'),
+    'lb-vip-list': NEUTRON_V20 + 'lb.vip.ListVip',
+    'lb-vip-show': NEUTRON_V20 + 'lb.vip.ShowVip',
+    'lb-vip-create': NEUTRON_V20 + 'lb.vip.CreateVip',
+    'lb-vip-update': NEUTRON_V20 + 'lb.vip.UpdateVip',
+    'lb-vip-delete': NEUTRON_V20 + 'lb.vip.DeleteVip',
+    'lb-pool-list': NEUTRON_V20 + 'lb.pool.ListPool',
+    'lb-pool-show': NEUTRON_V20 + 'lb.pool.ShowPool',
+    'lb-pool-create': NEUTRON_V20 + 'lb.pool.CreatePool',
+    'lb-pool-update': NEUTRON_V20 + 'lb.pool.UpdatePool',
+    'lb-pool-delete': NEUTRON_V20 + 'lb.pool.DeletePool',
+    'lb-pool-stats': NEUTRON_V20 + 'lb.pool.RetrievePoolStats',
+    'lb-member-list': NEUTRON_V20 + 'lb.member.ListMember',
+    'lb-member-show': NEUTRON_V20 + 'lb.member.ShowMember',
+    'lb-member-create': NEUTRON_V20 + 'lb.member.CreateMember',
+    'lb-member-update': NEUTRON_V20 + 'lb.member.UpdateMember',
+    'lb-member-delete': NEUTRON_V20 + 'lb.member.DeleteMember',
+    'lb-healthmonitor-list': (
+        NEUTRON_V20 + 'lb.healthmonitor.ListHealthMonitor'),
+    'lb-healthmonitor-show': (
+        NEUTRON_V20 + 'lb.healthmonitor.ShowHealthMonitor'),
+    'lb-healthmonitor-create': (
+        NEUTRON_V20 + 'lb.healthmonitor.CreateHealthMonitor'),
+    'lb-healthmonitor-update': (
+        NEUTRON_V20 + 'lb.healthmonitor.UpdateHealthMonitor'),
+    'lb-healthmonitor-delete': (
+        NEUTRON_V20 + 'lb.healthmonitor.DeleteHealthMonitor'),
+    'lb-healthmonitor-associate': (
+        NEUTRON_V20 + 'lb.healthmonitor.AssociateHealthMonitor'),
     'lb-healthmonitor-disassociate': (
-        lb_healthmonitor.DisassociateHealthMonitor
-    ),
-    'queue-create': nvp_qos_queue.CreateQoSQueue,
-    'queue-delete': nvp_qos_queue.DeleteQoSQueue,
-    'queue-show': nvp_qos_queue.ShowQoSQueue,
-    'queue-list': nvp_qos_queue.ListQoSQueue,
-    'agent-list': agent.ListAgent,
-    'agent-show': agent.ShowAgent,
-    'agent-delete': agent.DeleteAgent,
-    'agent-update': agent.UpdateAgent,
-    'net-gateway-create': nvpnetworkgateway.CreateNetworkGateway,
-    'net-gateway-update': nvpnetworkgateway.UpdateNetworkGateway,
-    'net-gateway-delete': nvpnetworkgateway.DeleteNetworkGateway,
-    'net-gateway-show': nvpnetworkgateway.ShowNetworkGateway,
-    'net-gateway-list': nvpnetworkgateway.ListNetworkGateway,
-    'net-gateway-connect': nvpnetworkgateway.ConnectNetworkGateway,
-    'net-gateway-disconnect': nvpnetworkgateway.DisconnectNetworkGateway,
-    'dhcp-agent-network-add': agentscheduler.AddNetworkToDhcpAgent,
-    'dhcp-agent-network-remove': agentscheduler.RemoveNetworkFromDhcpAgent,
-    'net-list-on-dhcp-agent': agentscheduler.ListNetworksOnDhcpAgent,
-    'dhcp-agent-list-hosting-net': agentscheduler.ListDhcpAgentsHostingNetwork,
-    'l3-agent-router-add': agentscheduler.AddRouterToL3Agent,
-    'l3-agent-router-remove': agentscheduler.RemoveRouterFromL3Agent,
-    'router-list-on-l3-agent': agentscheduler.ListRoutersOnL3Agent,
-    'l3-agent-list-hosting-router': agentscheduler.ListL3AgentsHostingRouter,
-}
+        NEUTRON_V20 + 'lb.healthmonitor.DisassociateHealthMonitor'),
+    'queue-create': NEUTRON_V20 + 'nvp_qos_queue.CreateQoSQueue',
+    'queue-delete': NEUTRON_V20 + 'nvp_qos_queue.DeleteQoSQueue',
+    'queue-show': NEUTRON_V20 + 'nvp_qos_queue.ShowQoSQueue',
+    'queue-list': NEUTRON_V20 + 'nvp_qos_queue.ListQoSQueue',
+    'agent-list': NEUTRON_V20 + 'agent.ListAgent',
+    'agent-show': NEUTRON_V20 + 'agent.ShowAgent',
+    'agent-delete': NEUTRON_V20 + 'agent.DeleteAgent',
+    'agent-update': NEUTRON_V20 + 'agent.UpdateAgent',
+    'net-gateway-create': (
+        NEUTRON_V20 + 'nvpnetworkgateway.CreateNetworkGateway'),
+    'net-gateway-update': (
+        NEUTRON_V20 + 'nvpnetworkgateway.UpdateNetworkGateway'),
+    'net-gateway-delete': (
+        NEUTRON_V20 + 'nvpnetworkgateway.DeleteNetworkGateway'),
+    'net-gateway-show': NEUTRON_V20 + 'nvpnetworkgateway.ShowNetworkGateway',
+    'net-gateway-list': NEUTRON_V20 + 'nvpnetworkgateway.ListNetworkGateway',
+    'net-gateway-connect': (
+        NEUTRON_V20 + 'nvpnetworkgateway.ConnectNetworkGateway'),
+    'net-gateway-disconnect': (
+        NEUTRON_V20 + 'nvpnetworkgateway.DisconnectNetworkGateway'),
+    'dhcp-agent-network-add': (
+        NEUTRON_V20 + 'agentscheduler.AddNetworkToDhcpAgent'),
+    'dhcp-agent-network-remove': (
+        NEUTRON_V20 + 'agentscheduler.RemoveNetworkFromDhcpAgent'),
+    'net-list-on-dhcp-agent': (
+        NEUTRON_V20 + 'agentscheduler.ListNetworksOnDhcpAgent'),
+    'dhcp-agent-list-hosting-net': (
+        NEUTRON_V20 + 'agentscheduler.ListDhcpAgentsHostingNetwork'),
+    'l3-agent-router-add': NEUTRON_V20 + 'agentscheduler.AddRouterToL3Agent',
+    'l3-agent-router-remove': (
+        NEUTRON_V20 + 'agentscheduler.RemoveRouterFromL3Agent'),
+    'router-list-on-l3-agent': (
+        NEUTRON_V20 + 'agentscheduler.ListRoutersOnL3Agent'),
+    'l3-agent-list-hosting-router': (
+        NEUTRON_V20 + 'agentscheduler.ListL3AgentsHostingRouter'),
+    'batch': NEUTRON_V20 + 'batch.Batch',
+})
 
 COMMANDS = {'2.0': COMMAND_V2}
 
 
+class LazyCommand(object):
+    """Factory of a command whose class is imported when first used.
+
+    Registered with CommandManager.add_command() in place of the class,
+    whose attributes it gives access to.
+
+    :param commands: the LazyCommandMap of the command
+    :param name: name of the command
+    """
+
+    def __init__(self, commands, name):
+        self.commands = commands
+        self.name = name
+
+    def __call__(self, app, app_args):
+        return self.commands[self.name](app, app_args)
+
+    def __getattr__(self, name):
+        return getattr(self.commands[self.name], name)
+
+
 class HelpAction(argparse.Action):
     """Provide a custom action so the -h and --help options
     to the main app will print a list of the commands.
@@ -207,6 +273,25 @@ class HelpAction(argparse.Action):
         sys.exit(0)
 
 
+class VersionAction(argparse.Action):
+    """Print the version of the client and exit.
+
+    The version is only looked up when asked for, pbr being slow to
+    import.
+    """
+    def __init__(self, option_strings, dest=argparse.SUPPRESS,
+                 default=argparse.SUPPRESS, help=None):
+        super(VersionAction, self).__init__(
+            option_strings=option_strings, dest=dest, default=default,
+            nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from neutronclient.version import __version__
+        formatter = parser._get_formatter()
+        formatter.add_text(__version__)
+        parser.exit(message=formatter.format_help())
+
+
 class NeutronShell(app.App):
 
     CONSOLE_MESSAGE_FORMAT = '%(message)s'
@@ -219,13 +304,16 @@ class NeutronShell(app.App):
             version=VERSION,
             command_manager=commandmanager.CommandManager('neutron.cli'), )
         self.commands = COMMANDS
-        for k, v in self.commands[apiversion].items():
-            self.command_manager.add_command(k, v)
+        for k in self.commands[apiversion]:
+            self.command_manager.add_command(
+                k, LazyCommand(self.commands[apiversion], k))
 
         # This is instantiated in initialize_app() only when using
         # password flow auth
         self.auth_client = None
         self.api_version = apiversion
+        # Started by --profile
+        self.profiler = None
 
     def build_option_parser(self, description, version):
         """Return an argparse option parser for this application.
@@ -243,8 +331,8 @@ class NeutronShell(app.App):
             add_help=False, )
         parser.add_argument(
             '--version',
-            action='version',
-            version=__version__, )
+            action=VersionAction,
+            help="show program's version number and exit", )
         parser.add_argument(
             '-v', '--verbose',
             action='count',
@@ -354,6 +442,34 @@ class NeutronShell(app.App):
                  "not be verified against any certificate authorities. "
                  "This option should be used with caution.")
 
+        parser.add_argument(
+            '--os-cache',
+            action='store_true',
+            default=strutils.bool_from_string(
+                env('OS_CACHE', default=False)),
+            help='Reuse Keystone tokens across invocations by caching '
+                 'them in ~/.neutronclient, and the IDs of the names '
+                 'resolved while the shell runs (Env: OS_CACHE)')
+
+        parser.add_argument(
+            '--trust-ids',
+            action='store_true',
+            default=False,
+            help='Take names or IDs of resources looking like UUIDs for '
+                 'IDs, without checking them with the server first')
+
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            default=False,
+            help='Print the time spent in each phase of the command and '
+                 'the HTTP requests sent on exit')
+
+        parser.add_argument(
+            '--profile-file', metavar='<file>',
+            help='Write the cProfile statistics of the command to <file>, '
+                 'for pstats. Implies --profile')
+
         return parser
 
     def _bash_completion(self):
@@ -377,6 +493,14 @@ class NeutronShell(app.App):
         :param argv: input arguments and options
         :paramtype argv: list of str
         """
+        try:
+            return self._run(argv)
+        finally:
+            stopped = profiler.stop()
+            if stopped is not None:
+                stopped.report(self.stderr)
+
+    def _run(self, argv):
         try:
             index = 0
             command_pos = -1
@@ -401,6 +525,8 @@ class NeutronShell(app.App):
             if help_command_pos > -1 and command_pos == -1:
                 argv[help_command_pos] = '--help'
             self.options, remainder = self.parser.parse_known_args(argv)
+            if self.options.profile or self.options.profile_file:
+                self.profiler = profiler.start(self.options.profile_file)
             self.configure_logging()
             self.interactive_mode = not remainder
             self.initialize_app(remainder)
@@ -423,7 +549,9 @@ class NeutronShell(app.App):
     def run_subcommand(self, argv):
         subcommand = self.command_manager.find_command(argv)
         cmd_factory, cmd_name, sub_argv = subcommand
-        cmd = cmd_factory(self, self.options)
+        # Mostly spent loading the formatter plugins of the command
+        with profiler.phase('imports'):
+            cmd = cmd_factory(self, self.options)
         err = None
         result = 1
         try:
@@ -433,7 +561,8 @@ class NeutronShell(app.App):
                          else ' '.join([self.NAME, cmd_name])
                          )
             cmd_parser = cmd.get_parser(full_name)
-            return run_command(cmd, cmd_parser, sub_argv)
+            with profiler.phase('API calls'):
+                return run_command(cmd, cmd_parser, sub_argv)
         except Exception as err:
             if self.options.debug:
                 self.log.exception(unicode(err))
@@ -504,6 +633,13 @@ class NeutronShell(app.App):
                     "You must provide a service URL via"
                     " either --os-url or env[OS_URL]")
 
+        # Imported here as it pulls in the HTTP client, which help and
+        # bash-completion do not need
+        with profiler.phase('imports'):
+            from neutronclient.common import clientmanager
+        request_hooks = []
+        if self.profiler is not None:
+            request_hooks.append(self.profiler.add_request)
         self.client_manager = clientmanager.ClientManager(
             token=self.options.os_token,
             url=self.options.os_url,
@@ -516,7 +652,12 @@ class NeutronShell(app.App):
             api_version=self.api_version,
             auth_strategy=self.options.os_auth_strategy,
             endpoint_type=self.options.endpoint_type,
-            insecure=self.options.insecure, )
+            insecure=self.options.insecure,
+            token_cache=self.options.os_cache and cache.TokenCache() or None,
+            trust_ids=self.options.trust_ids,
+            request_hooks=request_hooks,
+            resource_id_cache_size=(
+                self.options.os_cache and RESOURCE_ID_CACHE_SIZE or 0), )
         return
 
     def initialize_app(self, argv):
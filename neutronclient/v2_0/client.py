@@ -17,16 +17,21 @@
 
 import httplib
 import logging
+import random
+import threading
 import time
 import urllib
 import urlparse
 
 from neutronclient import client
-from neutronclient.common import _
+from neutronclient.common import cache
+from neutronclient.common import codec
 from neutronclient.common import constants
 from neutronclient.common import exceptions
+from neutronclient.common import retry
 from neutronclient.common import serializer
 from neutronclient.common import utils
+from neutronclient.common import workers
 
 
 _logger = logging.getLogger(__name__)
@@ -69,7 +74,8 @@ def exception_handler_v20(status_code, error_content):
             ex = None
             try:
                 # raise the appropriate error!
-                ex = neutron_errors[error_type](message=error_message)
+                ex = neutron_errors[error_type](message=error_message,
+                                                status_code=status_code)
                 ex.args = ([dict(status_code=status_code,
                                  message=error_message)], )
             except Exception:
@@ -96,6 +102,9 @@ def exception_handler_v20(status_code, error_content):
 class APIParamsCall(object):
     """A Decorator to add support for format and tenant overriding
        and filters
+
+    The format and retry_policy arguments are not sent as filters, but
+    apply to the requests of the call, see Client.get_retry_policy().
     """
     def __init__(self, function):
         self.function = function
@@ -104,10 +113,16 @@ class APIParamsCall(object):
         def with_params(*args, **kwargs):
             _format = instance.format
             if 'format' in kwargs:
-                instance.format = kwargs['format']
-            ret = self.function(instance, *args, **kwargs)
-            instance.format = _format
-            return ret
+                instance.format = kwargs.pop('format')
+            call = instance._call_local
+            _retry_policy = getattr(call, 'retry_policy', None)
+            if 'retry_policy' in kwargs:
+                call.retry_policy = kwargs.pop('retry_policy')
+            try:
+                return self.function(instance, *args, **kwargs)
+            finally:
+                instance.format = _format
+                call.retry_policy = _retry_policy
         return with_params
 
 
@@ -132,6 +147,44 @@ class Client(object):
     :param integer timeout: Allows customization of the timeout for client
                             http requests. (optional)
     :param insecure: ssl certificate validation. (optional)
+    :param integer connection_pool_size: Maximum number of keep-alive
+                            connections per endpoint shared by the threads
+                            using this client. (optional)
+    :param integer connection_idle_timeout: Seconds after which an idle
+                            connection is closed instead of reused.
+                            (optional)
+    :param integer prefetch_pages: Number of pages of a paginated list to
+                            request in the background while the current
+                            one is processed, 0 to fetch pages only when
+                            needed.  Generators of pages or resources not
+                            consumed entirely must then be closed.
+                            (optional)
+    :param bool stream_lists: Decode the resources of list responses
+                            as they are received instead of once the
+                            whole page was read. (optional)
+    :param bool trust_ids: Take names or IDs of resources looking like
+                            UUIDs for IDs, without checking them with the
+                            server. (optional)
+    :param integer resource_id_cache_size: Maximum number of resource
+                            names and IDs whose resolution is cached, 0 (the
+                            default) to disable the cache. (optional)
+    :param integer resource_id_cache_ttl: Seconds during which a resolved
+                            name or ID is cached. (optional)
+    :param integer attr_metadata_ttl: Seconds during which the extension
+                            namespaces needed for XML requests are reused.
+                            (optional)
+    :param integer response_cache_size: Maximum number of responses to
+                            show and list calls which are cached and
+                            revalidated with conditional requests, 0 (the
+                            default) to disable the cache. (optional)
+    :param integer response_cache_ttl: Seconds during which a cached
+                            response is used without asking the server,
+                            when the server gives no caching headers.
+                            (optional)
+    :param retry_policy: neutronclient.common.retry.RetryPolicy deciding
+                            which failed requests are retried, by default
+                            those of the retries and retry_interval
+                            attributes. (optional)
 
     Example::
 
@@ -202,19 +255,43 @@ class Client(object):
                      }
     # 8192 Is the default max URI len for eventlet.wsgi.server
     MAX_URI_LEN = 8192
+    # Default number of resources created by a bulk create request
+    BULK_CHUNK_SIZE = 100
+
+    def get_attr_metadata(self, _format=None):
+        """Returns the metadata needed to serialize XML.
 
-    def get_attr_metadata(self):
-        if self.format == 'json':
+        The extension namespaces are requested from the server the first
+        time, then reused for attr_metadata_ttl seconds.  The metadata is
+        built afresh when it expires and never modified in place, so it
+        can be shared by the threads using the client.
+        """
+        if (_format or self.format) == 'json':
             return {}
-        old_request_format = self.format
-        self.format = 'json'
-        exts = self.list_extensions()['extensions']
-        self.format = old_request_format
-        ns = dict([(ext['alias'], ext['namespace']) for ext in exts])
-        self.EXTED_PLURALS.update(constants.PLURALS)
-        return {'plurals': self.EXTED_PLURALS,
-                'xmlns': constants.XML_NS_V20,
-                constants.EXT_NS: ns}
+        with self._attr_metadata_lock:
+            metadata, expires = self._attr_metadata
+            if metadata is not None and time.time() < expires:
+                return metadata
+            # Requested in JSON, which needs no metadata, without changing
+            # the format other threads may be using
+            exts = self.retry_request('GET', self.extensions_path,
+                                      _format='json')['extensions']
+            ns = dict([(ext['alias'], ext['namespace']) for ext in exts])
+            plurals = dict(self.EXTED_PLURALS)
+            plurals.update(constants.PLURALS)
+            metadata = {'plurals': plurals,
+                        'xmlns': constants.XML_NS_V20,
+                        constants.EXT_NS: ns}
+            self._attr_metadata = (metadata,
+                                   time.time() + self.attr_metadata_ttl)
+            return metadata
+
+    def refresh_attr_metadata(self):
+        """Forgets the cached XML metadata, e.g. after extensions were
+        enabled on the server, so that it is requested again when needed.
+        """
+        with self._attr_metadata_lock:
+            self._attr_metadata = (None, 0)
 
     @APIParamsCall
     def get_quotas_tenant(self, **_params):
@@ -260,6 +337,11 @@ class Client(object):
         return self.list('ports', self.ports_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_ports(self, **_params):
+        """Yields the ports of a tenant one at a time."""
+        return self.iterate('ports', self.ports_path, **_params)
+
     @APIParamsCall
     def show_port(self, port, **_params):
         """Fetches information of a certain network."""
@@ -270,6 +352,12 @@ class Client(object):
         """Creates a new port."""
         return self.post(self.ports_path, body=body)
 
+    @APIParamsCall
+    def bulk_create_ports(self, ports, chunk_size=None, max_workers=1):
+        """Creates many ports, chunk_size per request."""
+        return self.bulk_create('ports', self.ports_path, ports,
+                                chunk_size, max_workers)
+
     @APIParamsCall
     def update_port(self, port, body=None):
         """Updates a port."""
@@ -287,6 +375,11 @@ class Client(object):
         return self.list('networks', self.networks_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_networks(self, **_params):
+        """Yields the networks of a tenant one at a time."""
+        return self.iterate('networks', self.networks_path, **_params)
+
     @APIParamsCall
     def show_network(self, network, **_params):
         """Fetches information of a certain network."""
@@ -297,6 +390,12 @@ class Client(object):
         """Creates a new network."""
         return self.post(self.networks_path, body=body)
 
+    @APIParamsCall
+    def bulk_create_networks(self, networks, chunk_size=None, max_workers=1):
+        """Creates many networks, chunk_size per request."""
+        return self.bulk_create('networks', self.networks_path, networks,
+                                chunk_size, max_workers)
+
     @APIParamsCall
     def update_network(self, network, body=None):
         """Updates a network."""
@@ -313,6 +412,11 @@ class Client(object):
         return self.list('subnets', self.subnets_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_subnets(self, **_params):
+        """Yields the subnets of a tenant one at a time."""
+        return self.iterate('subnets', self.subnets_path, **_params)
+
     @APIParamsCall
     def show_subnet(self, subnet, **_params):
         """Fetches information of a certain subnet."""
@@ -323,6 +427,12 @@ class Client(object):
         """Creates a new subnet."""
         return self.post(self.subnets_path, body=body)
 
+    @APIParamsCall
+    def bulk_create_subnets(self, subnets, chunk_size=None, max_workers=1):
+        """Creates many subnets, chunk_size per request."""
+        return self.bulk_create('subnets', self.subnets_path, subnets,
+                                chunk_size, max_workers)
+
     @APIParamsCall
     def update_subnet(self, subnet, body=None):
         """Updates a subnet."""
@@ -340,6 +450,11 @@ class Client(object):
         return self.list('routers', self.routers_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_routers(self, **_params):
+        """Yields the routers of a tenant one at a time."""
+        return self.iterate('routers', self.routers_path, **_params)
+
     @APIParamsCall
     def show_router(self, router, **_params):
         """Fetches information of a certain router."""
@@ -391,6 +506,11 @@ class Client(object):
         return self.list('floatingips', self.floatingips_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_floatingips(self, **_params):
+        """Yields the floatingips of a tenant one at a time."""
+        return self.iterate('floatingips', self.floatingips_path, **_params)
+
     @APIParamsCall
     def show_floatingip(self, floatingip, **_params):
         """Fetches information of a certain floatingip."""
@@ -428,6 +548,12 @@ class Client(object):
         return self.list('security_groups', self.security_groups_path,
                          retrieve_all, **_params)
 
+    @APIParamsCall
+    def iter_security_groups(self, **_params):
+        """Yields the security groups of a tenant one at a time."""
+        return self.iterate('security_groups',
+                            self.security_groups_path, **_params)
+
     @APIParamsCall
     def show_security_group(self, security_group, **_params):
         """Fetches information of a certain security group."""
@@ -457,6 +583,12 @@ class Client(object):
                          self.security_group_rules_path,
                          retrieve_all, **_params)
 
+    @APIParamsCall
+    def iter_security_group_rules(self, **_params):
+        """Yields the security group rules of a tenant one at a time."""
+        return self.iterate('security_group_rules',
+                            self.security_group_rules_path, **_params)
+
     @APIParamsCall
     def show_security_group_rule(self, security_group_rule, **_params):
         """Fetches information of a certain security group rule."""
@@ -470,6 +602,11 @@ class Client(object):
         return self.list('vips', self.vips_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_vips(self, **_params):
+        """Yields the load balancer vips of a tenant one at a time."""
+        return self.iterate('vips', self.vips_path, **_params)
+
     @APIParamsCall
     def show_vip(self, vip, **_params):
         """Fetches information of a certain load balancer vip."""
@@ -497,6 +634,11 @@ class Client(object):
         return self.list('pools', self.pools_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_pools(self, **_params):
+        """Yields the load balancer pools of a tenant one at a time."""
+        return self.iterate('pools', self.pools_path, **_params)
+
     @APIParamsCall
     def show_pool(self, pool, **_params):
         """Fetches information of a certain load balancer pool."""
@@ -529,6 +671,11 @@ class Client(object):
         return self.list('members', self.members_path, retrieve_all,
                          **_params)
 
+    @APIParamsCall
+    def iter_members(self, **_params):
+        """Yields the load balancer members of a tenant one at a time."""
+        return self.iterate('members', self.members_path, **_params)
+
     @APIParamsCall
     def show_member(self, member, **_params):
         """Fetches information of a certain load balancer member."""
@@ -556,6 +703,14 @@ class Client(object):
         return self.list('health_monitors', self.health_monitors_path,
                          retrieve_all, **_params)
 
+    @APIParamsCall
+    def iter_health_monitors(self, **_params):
+        """Yields the load balancer health monitors of a tenant one at a
+        time.
+        """
+        return self.iterate('health_monitors',
+                            self.health_monitors_path, **_params)
+
     @APIParamsCall
     def show_health_monitor(self, health_monitor, **_params):
         """Fetches information of a certain load balancer health monitor."""
@@ -720,6 +875,24 @@ class Client(object):
     def __init__(self, **kwargs):
         """Initialize a new client for the Neutron v2.0 API."""
         super(Client, self).__init__()
+        self.prefetch_pages = kwargs.pop('prefetch_pages', 0)
+        self.stream_lists = kwargs.pop('stream_lists', False)
+        self.trust_ids = kwargs.pop('trust_ids', False)
+        self.attr_metadata_ttl = kwargs.pop('attr_metadata_ttl', 3600)
+        self._attr_metadata = (None, 0)
+        self._attr_metadata_lock = threading.RLock()
+        self._serializer = None
+        self.resource_id_cache = cache.LRUCache(
+            kwargs.pop('resource_id_cache_size', 0),
+            kwargs.pop('resource_id_cache_ttl', 60))
+        response_cache_size = kwargs.pop('response_cache_size', 0)
+        response_cache_ttl = kwargs.pop('response_cache_ttl', 0)
+        if response_cache_size:
+            kwargs['response_cache'] = cache.ResponseCache(
+                response_cache_size, response_cache_ttl)
+        self.retry_policy = kwargs.pop('retry_policy', None)
+        # The retry policy of the API call being made by each thread
+        self._call_local = threading.local()
         self.httpclient = client.HTTPClient(**kwargs)
         self.version = '2.0'
         self.format = 'json'
@@ -727,18 +900,25 @@ class Client(object):
         self.retries = 0
         self.retry_interval = 1
 
-    def _handle_fault_response(self, status_code, response_body):
+    def _handle_fault_response(self, status_code, response_body, resp=None,
+                               _format=None):
         # Create exception with HTTP status code and message
         _logger.debug("Error message: %s", response_body)
         # Add deserialized error message to exception arguments
         try:
-            des_error_body = self.deserialize(response_body, status_code)
+            des_error_body = self.deserialize(response_body, status_code,
+                                              _format)
         except Exception:
             # If unable to deserialized body it is probably not a
             # Neutron error
             des_error_body = {'message': response_body}
         # Raise the appropriate exception
-        exception_handler_v20(status_code, des_error_body)
+        try:
+            exception_handler_v20(status_code, des_error_body)
+        except exceptions.NeutronClientException as e:
+            # Honored by retry policies
+            e.retry_after = isinstance(resp, dict) and resp.get('retry-after')
+            raise
 
     def _check_uri_length(self, action):
         uri_len = len(self.httpclient.endpoint_url) + len(action)
@@ -746,9 +926,9 @@ class Client(object):
             raise exceptions.RequestURITooLong(
                 excess=uri_len - self.MAX_URI_LEN)
 
-    def do_request(self, method, action, body=None, headers=None, params=None):
+    def _build_action(self, action, params, _format=None):
         # Add format and tenant_id
-        action += ".%s" % self.format
+        action += ".%s" % (_format or self.format)
         action = self.action_prefix + action
         if type(params) is dict and params:
             params = utils.safe_encode_dict(params)
@@ -756,19 +936,36 @@ class Client(object):
         # Ensure client always has correct uri - do not guesstimate anything
         self.httpclient.authenticate_and_fetch_endpoint_url()
         self._check_uri_length(action)
+        return action
+
+    def do_request(self, method, action, body=None, headers=None, params=None,
+                   retries=0, _format=None):
+        """Sends a request and returns its deserialized response body.
+
+        retries is the number of earlier attempts of the call, reported to
+        the request hooks of the HTTP client.  _format is the format of
+        the request, the one of the client by default.
+        """
+        action = self._build_action(action, params, _format)
 
         if body:
-            body = self.serialize(body)
-        self.httpclient.content_type = self.content_type()
-        resp, replybody = self.httpclient.do_request(action, method, body=body)
+            body = self.serialize(body, _format)
+        content_type = self.content_type(_format)
+        self.httpclient.content_type = content_type
+        # Pass the content type along explicitly as well, the HTTP client
+        # may be shared with threads using another format
+        resp, replybody = self.httpclient.do_request(
+            action, method, body=body, content_type=content_type,
+            headers=dict(headers or {}), retries=retries)
         status_code = self.get_status_code(resp)
         if status_code in (httplib.OK,
                            httplib.CREATED,
                            httplib.ACCEPTED,
                            httplib.NO_CONTENT):
-            return self.deserialize(replybody, status_code)
+            return self.deserialize(replybody, status_code, _format)
         else:
-            self._handle_fault_response(status_code, replybody)
+            self._handle_fault_response(status_code, replybody, resp,
+                                        _format)
 
     def get_auth_info(self):
         return self.httpclient.get_auth_info()
@@ -784,7 +981,7 @@ class Client(object):
         else:
             return response.status
 
-    def serialize(self, data):
+    def serialize(self, data, _format=None):
         """Serializes a dictionary into either xml or json.
 
         A dictionary with a single key can be passed and
@@ -793,18 +990,30 @@ class Client(object):
         if data is None:
             return None
         elif type(data) is dict:
-            return serializer.Serializer(
-                self.get_attr_metadata()).serialize(data, self.content_type())
+            return self._get_serializer(_format).serialize(
+                data, self.content_type(_format))
         else:
             raise Exception("unable to serialize object of type = '%s'" %
                             type(data))
 
-    def deserialize(self, data, status_code):
+    def deserialize(self, data, status_code, _format=None):
         """Deserializes an xml or json string into a dictionary."""
         if status_code == 204:
             return data
-        return serializer.Serializer(self.get_attr_metadata()).deserialize(
-            data, self.content_type())['body']
+        return self._get_serializer(_format).deserialize(
+            data, self.content_type(_format))['body']
+
+    def _get_serializer(self, _format=None):
+        # Reuse the Serializer as long as the metadata is the same
+        if (_format or self.format) == 'json':
+            metadata = None
+        else:
+            metadata = self.get_attr_metadata(_format) or None
+        cached = self._serializer
+        if cached is None or cached[0] is not metadata:
+            cached = (metadata, serializer.Serializer(metadata))
+            self._serializer = cached
+        return cached[1]
 
     def content_type(self, _format=None):
         """Returns the mime-type for either 'xml' or 'json'.
@@ -814,68 +1023,410 @@ class Client(object):
         _format = _format or self.format
         return "application/%s" % (_format)
 
-    def retry_request(self, method, action, body=None,
-                      headers=None, params=None):
-        """Call do_request with the default retry configuration.
+    def stream_request(self, method, action, params=None, retries=0,
+                       _format=None):
+        """Sends a request whose response body is returned unread.
 
-        Only idempotent requests should retry failed connection attempts.
-        :raises: ConnectionFailed if the maximum # of retries is exceeded
+        Returns a neutronclient.client.StreamedBody, which must be closed
+        if it is not read entirely.
         """
-        max_attempts = self.retries + 1
-        for i in xrange(max_attempts):
-            try:
-                return self.do_request(method, action, body=body,
-                                       headers=headers, params=params)
-            except exceptions.ConnectionFailed:
-                # Exception has already been logged by do_request()
-                if i < self.retries:
-                    _logger.debug(_('Retrying connection to Neutron service'))
-                    time.sleep(self.retry_interval)
+        action = self._build_action(action, params, _format)
+        content_type = self.content_type(_format)
+        self.httpclient.content_type = content_type
+        resp, replybody = self.httpclient.stream_request(
+            action, method, content_type=content_type, retries=retries)
+        status_code = self.get_status_code(resp)
+        if isinstance(replybody, client.StreamedBody):
+            return replybody
+        self._handle_fault_response(status_code, replybody, resp)
+
+    def get_retry_policy(self, retry_policy=None):
+        """Returns the retry policy of a call.
+
+        That is retry_policy if given, else the one given to the API
+        method being called, e.g. show_port(port, retry_policy=policy),
+        else the retry_policy of the client, else retries attempts of
+        idempotent requests whose connection failed, retry_interval
+        seconds apart.
+        """
+        if retry_policy is not None:
+            return retry_policy
+        call_policy = getattr(self._call_local, 'retry_policy', None)
+        if call_policy is not None:
+            return call_policy
+        if self.retry_policy is not None:
+            return self.retry_policy
+        return retry.RetryPolicy(max_attempts=self.retries + 1,
+                                 interval=self.retry_interval, backoff=1,
+                                 retry_statuses=(), jitter=False)
 
-        raise exceptions.ConnectionFailed(reason=_("Maximum attempts reached"))
+    def retry_request(self, method, action, body=None,
+                      headers=None, params=None, stream=False,
+                      retry_policy=None, _format=None):
+        """Call do_request, retrying as allowed by the retry policy.
 
-    def delete(self, action, body=None, headers=None, params=None):
+        With stream=True, stream_request is called instead.
+        :raises: the exception of the last attempt
+        """
+        attempts = [0]
+
+        def request(policy_headers):
+            retries = attempts[0]
+            attempts[0] += 1
+            if stream:
+                return self.stream_request(method, action, params=params,
+                                           retries=retries, _format=_format)
+            return self.do_request(method, action, body=body,
+                                   headers=dict(headers or {},
+                                                **policy_headers),
+                                   params=params, retries=retries,
+                                   _format=_format)
+
+        return self.get_retry_policy(retry_policy).call(method, request)
+
+    def delete(self, action, body=None, headers=None, params=None,
+               retry_policy=None):
+        self._invalidate_resource_ids(action)
         return self.retry_request("DELETE", action, body=body,
-                                  headers=headers, params=params)
+                                  headers=headers, params=params,
+                                  retry_policy=retry_policy)
 
-    def get(self, action, body=None, headers=None, params=None):
+    def get(self, action, body=None, headers=None, params=None,
+            retry_policy=None):
         return self.retry_request("GET", action, body=body,
-                                  headers=headers, params=params)
+                                  headers=headers, params=params,
+                                  retry_policy=retry_policy)
+
+    def post(self, action, body=None, headers=None, params=None,
+             retry_policy=None):
+        # POST requests are only retried by policies giving them an
+        # idempotency key, to avoid the orphan objects problem.
+        return self.retry_request("POST", action, body=body,
+                                  headers=headers, params=params,
+                                  retry_policy=retry_policy)
+
+    def put(self, action, body=None, headers=None, params=None,
+            retry_policy=None):
+        self._invalidate_resource_ids(action)
+        return self.retry_request("PUT", action, body=body,
+                                  headers=headers, params=params,
+                                  retry_policy=retry_policy)
+
+    def _invalidate_resource_ids(self, action):
+        # Forget the names resolved to a resource which is being deleted
+        # or possibly renamed
+        segments = action.split('/')
+        self.resource_id_cache.invalidate(
+            lambda key, resource_id: resource_id in segments)
+
+    def bulk_create(self, collection, path, resources, chunk_size=None,
+                    max_workers=1):
+        """Creates many resources with plural-body POST requests.
+
+        :param collection: name of the collection, e.g. 'ports'
+        :param resources: list of the attributes of each resource to create
+        :param chunk_size: maximum number of resources per request,
+                           BULK_CHUNK_SIZE by default
+        :param max_workers: number of requests sent concurrently
+
+        Neutron creates the resources of a request all together or not at
+        all, so a failed request does not affect the other chunks.
+        Returns one (created, error) pair per resource, in order: created
+        is the resource returned by the server, or None if the request of
+        its chunk failed with the NeutronClientException error.
+        """
+        chunk_size = chunk_size or self.BULK_CHUNK_SIZE
+        chunks = [resources[i:i + chunk_size]
+                  for i in xrange(0, len(resources), chunk_size)]
+
+        def _create_chunk(chunk):
+            try:
+                data = self.post(path, body={collection: chunk})
+                return [(created, None) for created in data[collection]]
+            except exceptions.NeutronClientException as e:
+                return [(None, e)] * len(chunk)
+
+        if max_workers > 1 and len(chunks) > 1:
+            with workers.WorkerPool(min(max_workers, len(chunks))) as pool:
+                results = pool.map(_create_chunk, chunks)
+        else:
+            results = [_create_chunk(chunk) for chunk in chunks]
+        return [result for chunk in results for result in chunk]
 
-    def post(self, action, body=None, headers=None, params=None):
-        # Do not retry POST requests to avoid the orphan objects problem.
-        return self.do_request("POST", action, body=body,
-                               headers=headers, params=params)
+    def list_in_chunks(self, collection, key, values, max_workers=1,
+                       **params):
+        """Lists the resources of collection whose key is one of values.
 
-    def put(self, action, body=None, headers=None, params=None):
-        return self.retry_request("PUT", action, body=body,
-                                  headers=headers, params=params)
+        :param collection: name of the collection, e.g. 'subnets'
+        :param key: name of the filter, e.g. 'id'
+        :param values: values of the filter
+        :param max_workers: number of requests sent concurrently
+
+        The values are split across as few requests as the length of their
+        URI allows, and the resources they return are merged in a single
+        {collection: [...]} body.
+        """
+        path = getattr(self, '%s_path' % collection)
+        chunks = self._split_filter(path, key, values, params)
+
+        def _list_chunk(chunk):
+            chunk_params = dict(params)
+            chunk_params[key] = chunk
+            return self.list(collection, path, **chunk_params)[collection]
+
+        if max_workers > 1 and len(chunks) > 1:
+            with workers.WorkerPool(min(max_workers, len(chunks))) as pool:
+                results = pool.map(_list_chunk, chunks)
+        else:
+            results = [_list_chunk(chunk) for chunk in chunks]
+        return {collection: [res for chunk in results for res in chunk]}
+
+    def _split_filter(self, path, key, values, params):
+        # Length of the URI without the filter, which raises
+        # RequestURITooLong if it is too long already
+        self.httpclient.authenticate_and_fetch_endpoint_url()
+        uri_len = (len(self.httpclient.endpoint_url) +
+                   len(self._build_action(path, params)))
+        chunks = []
+        chunk_len = uri_len
+        for value in values:
+            # &key=value
+            value_len = 1 + len(urllib.urlencode(
+                utils.safe_encode_dict({key: [value]}), doseq=1))
+            if uri_len + value_len > self.MAX_URI_LEN:
+                raise exceptions.RequestURITooLong(
+                    excess=uri_len + value_len - self.MAX_URI_LEN)
+            if not chunks or chunk_len + value_len > self.MAX_URI_LEN:
+                chunks.append([])
+                chunk_len = uri_len
+            chunks[-1].append(value)
+            chunk_len += value_len
+        return chunks
+
+    def wait_for_status(self, resource, ids, target='ACTIVE', timeout=None,
+                        interval=1, max_interval=10,
+                        failure_statuses=('ERROR',)):
+        """Waits until resources reached their target or a failure status.
+
+        :param resource: name of the resource, e.g. 'port' or 'vip'
+        :param ids: IDs of the resources
+        :param target: status waited for, or a tuple of them
+        :param timeout: seconds after which WaitTimeout is raised, None to
+                        wait forever
+        :param interval: seconds between the first polls, doubled after
+                         each poll up to max_interval
+        :param failure_statuses: statuses from which the resources are not
+                                 expected to reach target
+
+        The statuses of all the resources still pending are polled with a
+        single list request (more if their IDs do not fit in one URI), at
+        random times within each interval so that clients started together
+        do not poll in step.  Returns {id: status} as soon as every
+        resource is in a terminal status, the status of the resources
+        which were deleted being None.
+        """
+        if isinstance(target, basestring):
+            target = (target,)
+        collection = resource + 's'
+        deadline = None if timeout is None else time.time() + timeout
+        pending = set(ids)
+        statuses = {}
+        delay = interval
+        while True:
+            found = self.list_in_chunks(collection, 'id', sorted(pending),
+                                        fields=['id', 'status'])
+            current = dict((res['id'], res.get('status'))
+                           for res in found[collection])
+            for _id in pending:
+                status = current.get(_id)
+                if (_id not in current or status in target or
+                        status in failure_statuses):
+                    statuses[_id] = status
+            pending.difference_update(statuses)
+            if not pending:
+                return statuses
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                raise exceptions.WaitTimeout(
+                    resource=resource, ids=', '.join(sorted(pending)),
+                    status=' or '.join(target))
+            sleep = random.uniform(delay / 2.0, delay)
+            if deadline is not None:
+                sleep = min(sleep, deadline - now)
+            time.sleep(sleep)
+            delay = min(delay * 2, max_interval)
 
     def list(self, collection, path, retrieve_all=True, **params):
+        """Fetches a collection, all pages at once or one at a time.
+
+        Without retrieve_all, returns a generator of the pages, which must
+        be closed when not consumed entirely if prefetch_pages is set.
+        """
         if retrieve_all:
             res = []
-            for r in self._pagination(collection, path, **params):
-                res.extend(r[collection])
+            pages = self._pagination(collection, path, **params)
+            try:
+                for r in pages:
+                    res.extend(r[collection])
+            finally:
+                pages.close()
             return {collection: res}
         else:
             return self._pagination(collection, path, **params)
 
-    def _pagination(self, collection, path, **params):
-        if params.get('page_reverse', False):
-            linkrel = 'previous'
+    def iterate(self, collection, path, **params):
+        """Yields the resources of a collection one at a time.
+
+        Pages are requested as the previous one is consumed, so only one
+        page is held in memory at any time, however large the collection.
+        With stream_lists, pages are not even held in memory entirely,
+        resources being decoded as they are received.
+        """
+        if self.stream_lists and self.format in ('json', 'xml'):
+            # The requests are sent later on, once the format and retry
+            # policy of an API call were restored
+            return self._iterate_streamed(collection, path, params,
+                                          self.format,
+                                          self.get_retry_policy())
+        return self._iterate_pages(collection,
+                                   self._pagination(collection, path,
+                                                    **params))
+
+    def _iterate_pages(self, collection, pages):
+        try:
+            for page in pages:
+                for item in page.get(collection, []):
+                    yield item
+        finally:
+            pages.close()
+
+    def _iterate_streamed(self, collection, path, params, _format,
+                          retry_policy):
+        linkrel = self._link_rel(params)
+        if _format == 'xml':
+            iterparse = self._get_serializer(_format).get_deserialize_handler(
+                self.content_type(_format)).iterparse
         else:
-            linkrel = 'next'
-        next = True
-        while next:
-            res = self.get(path, params=params)
-            yield res
-            next = False
+            iterparse = codec.iterparse
+        while params is not None:
+            body = self.retry_request("GET", path, params=params, stream=True,
+                                      retry_policy=retry_policy,
+                                      _format=_format)
+            links = {}
             try:
-                for link in res['%s_links' % collection]:
-                    if link['rel'] == linkrel:
-                        query_str = urlparse.urlparse(link['href']).query
-                        params = urlparse.parse_qs(query_str)
-                        next = True
-                        break
-            except KeyError:
-                break
+                for item in iterparse(body, collection, links):
+                    yield item
+            finally:
+                body.close()
+            params = self._next_page_params(collection, links, linkrel)
+
+    def _pagination(self, collection, path, **params):
+        # The pages are fetched later on, once the format and retry policy
+        # of an API call were restored
+        pages = self._fetch_pages(collection, path, params, self.format,
+                                  self.get_retry_policy())
+        if self.prefetch_pages > 0:
+            pages = workers.read_ahead(pages, self.prefetch_pages)
+        return pages
+
+    def _fetch_pages(self, collection, path, params, _format, retry_policy):
+        linkrel = self._link_rel(params)
+        while params is not None:
+            res = self.retry_request("GET", path, params=params,
+                                     retry_policy=retry_policy,
+                                     _format=_format)
+            yield res
+            params = self._next_page_params(collection, res, linkrel)
+
+    def _link_rel(self, params):
+        if params.get('page_reverse', False):
+            return 'previous'
+        return 'next'
+
+    def _next_page_params(self, collection, res, linkrel):
+        """Returns the query parameters of the next page, None if res is
+        the last one.
+        """
+        for link in res.get('%s_links' % collection, []):
+            if link['rel'] == linkrel:
+                query_str = urlparse.urlparse(link['href']).query
+                return urlparse.parse_qs(query_str)
+        return None
+
+
+class AsyncClient(object):
+    """Non-blocking variant of Client for the OpenStack Neutron v2.0 API.
+
+    Every API call of Client is available with the same arguments, but is
+    run by a pool of worker threads and immediately returns a
+    neutronclient.common.workers.Future.  Calls share a single Client, so
+    paths, serialization, pagination and error handling are those of the
+    blocking client; Future.result() raises the same exceptions.
+
+    Set the request format on the client rather than passing format= to
+    each call, as the format is shared by all the calls in flight.
+
+    :param integer max_workers: Maximum number of requests in flight.
+                                (optional)
+
+    All other parameters are those of Client.
+
+    Example::
+
+        from neutronclient.v2_0 import client
+        neutron = client.AsyncClient(username=USER,
+                                     password=PASS,
+                                     tenant_name=TENANT_NAME,
+                                     auth_url=KEYSTONE_URL)
+
+        futures = [neutron.show_port(port_id) for port_id in port_ids]
+        ports = [f.result()['port'] for f in futures]
+        ...
+
+    """
+
+    def __init__(self, max_workers=10, **kwargs):
+        kwargs.setdefault('connection_pool_size', max_workers)
+        self.client = Client(**kwargs)
+        self.pool = workers.WorkerPool(max_workers)
+
+    def _api_call(self, name):
+        client = self.__dict__.get('client')
+        if client is None or name.startswith('_'):
+            return None
+        for klass in type(client).__mro__:
+            if name in klass.__dict__:
+                attr = klass.__dict__[name]
+                return isinstance(attr, APIParamsCall) and attr or None
+        return None
+
+    def __getattr__(self, name):
+        api_call = self._api_call(name)
+        if api_call is None:
+            raise AttributeError(name)
+        method = getattr(self.client, name)
+
+        def submit(*args, **kwargs):
+            return self.pool.submit(method, *args, **kwargs)
+        submit.__name__ = name
+        submit.__doc__ = api_call.function.__doc__
+        return submit
+
+    @property
+    def format(self):
+        return self.client.format
+
+    @format.setter
+    def format(self, value):
+        self.client.format = value
+
+    def close(self):
+        """Waits for the calls in flight and stops the worker threads."""
+        self.pool.shutdown()
+        self.client.httpclient.connection_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
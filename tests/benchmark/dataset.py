@@ -0,0 +1,134 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Generate the resources of a tenant for the benchmarks.
+
+    python -m tests.benchmark.dataset [--networks N] [--ports N] [--rules N]
+
+prints the number of resources generated and the size of their JSON
+documents.  The same arguments always give the same resources.
+"""
+
+import argparse
+import random
+import sys
+import uuid
+
+from neutronclient.common import codec
+
+
+TENANT_ID = 'b0a0e0e7e0a04e0e8e0e0e0e0e0e0e0e'
+# Security group rules per security group
+RULES_PER_GROUP = 10
+
+
+def generate(networks=100, ports=1000, rules=500, seed=0):
+    """Returns the resources of a tenant by collection.
+
+    Each network has a subnet, the ports are spread over the networks and
+    the rules over security groups of RULES_PER_GROUP rules, each port
+    being in one of them.
+    """
+    rand = random.Random(seed)
+
+    def new_id():
+        return str(uuid.UUID(int=rand.getrandbits(128), version=4))
+
+    data = {'networks': [], 'subnets': [], 'ports': [],
+            'security_groups': [], 'security_group_rules': []}
+    for i in xrange(networks):
+        network_id = new_id()
+        subnet = {'id': new_id(),
+                  'name': 'subnet-%d' % i,
+                  'network_id': network_id,
+                  'tenant_id': TENANT_ID,
+                  'ip_version': 4,
+                  'cidr': '10.%d.%d.0/24' % (i >> 8 & 255, i & 255),
+                  'gateway_ip': '10.%d.%d.1' % (i >> 8 & 255, i & 255),
+                  'enable_dhcp': True,
+                  'allocation_pools': [
+                      {'start': '10.%d.%d.2' % (i >> 8 & 255, i & 255),
+                       'end': '10.%d.%d.254' % (i >> 8 & 255, i & 255)}],
+                  'dns_nameservers': [],
+                  'host_routes': []}
+        data['subnets'].append(subnet)
+        data['networks'].append({'id': network_id,
+                                 'name': 'net-%d' % i,
+                                 'tenant_id': TENANT_ID,
+                                 'admin_state_up': True,
+                                 'shared': False,
+                                 'status': 'ACTIVE',
+                                 'subnets': [subnet['id']]})
+    for i in xrange(max(1, -(-rules // RULES_PER_GROUP))):
+        data['security_groups'].append({
+            'id': new_id(),
+            'name': i and 'sg-%d' % i or 'default',
+            'description': '',
+            'tenant_id': TENANT_ID})
+    for i in xrange(rules):
+        group = data['security_groups'][i // RULES_PER_GROUP]
+        data['security_group_rules'].append({
+            'id': new_id(),
+            'security_group_id': group['id'],
+            'tenant_id': TENANT_ID,
+            'direction': i % 2 and 'egress' or 'ingress',
+            'ethertype': 'IPv4',
+            'protocol': 'tcp',
+            'port_range_min': 1000 + i % 60000,
+            'port_range_max': 1000 + i % 60000,
+            'remote_ip_prefix': '10.0.0.0/8',
+            'remote_group_id': None})
+    for i in xrange(ports if networks else 0):
+        subnet = data['subnets'][i % networks]
+        host = i // networks % 250 + 3
+        data['ports'].append({
+            'id': new_id(),
+            'name': 'port-%d' % i,
+            'network_id': subnet['network_id'],
+            'tenant_id': TENANT_ID,
+            'admin_state_up': True,
+            'status': 'ACTIVE',
+            'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+                i >> 16 & 255, i >> 8 & 255, i & 255),
+            'fixed_ips': [{'subnet_id': subnet['id'],
+                           'ip_address': '%s.%d' % (
+                               subnet['cidr'].rsplit('.', 1)[0], host)}],
+            'device_id': new_id(),
+            'device_owner': 'compute:nova',
+            'security_groups': [
+                rand.choice(data['security_groups'])['id']]})
+    return data
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--networks', type=int, default=100)
+    parser.add_argument('--ports', type=int, default=1000)
+    parser.add_argument('--rules', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = generate(args.networks, args.ports, args.rules, args.seed)
+    print '%-24s %10s %12s' % ('collection', 'resources', 'bytes')
+    for collection in sorted(data):
+        print '%-24s %10d %12d' % (
+            collection, len(data[collection]),
+            len(codec.dumps({collection: data[collection]})))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""An in-process stand-in for the Neutron server, for the benchmarks.
+
+FakeNeutronApp is a WSGI application serving the v2.0 API of the
+collections it is given, e.g. by dataset.generate(), in JSON and XML:
+lists with filters, fields, sorting and pagination links, shows, creates
+of one or many resources, updates and deletes.  Tokens are not checked.
+
+FakeNeutronServer serves it on a local port with keep-alive connections,
+one thread per connection.
+"""
+
+import copy
+import socket
+import SocketServer
+import sys
+import threading
+import urllib
+import urlparse
+import uuid
+from wsgiref import simple_server
+
+from neutronclient.common import constants
+from neutronclient.common import serializer
+from neutronclient.v2_0 import client
+from tests.benchmark import dataset
+
+
+# Query parameters which are not filters
+_LIST_PARAMS = ('fields', 'limit', 'marker', 'page_reverse', 'sort_key',
+                'sort_dir', 'verbose')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, error_type, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+
+class FakeNeutronApp(object):
+    """Serves the resources of collections, a dict of lists by name."""
+
+    STATUSES = {200: '200 OK', 201: '201 Created', 204: '204 No Content',
+                400: '400 Bad Request', 404: '404 Not Found',
+                405: '405 Method Not Allowed'}
+
+    def __init__(self, collections):
+        self.collections = dict((name, list(resources))
+                                for name, resources in collections.items())
+        self.by_id = dict((name, dict((r['id'], r) for r in resources))
+                          for name, resources in self.collections.items())
+        plurals = dict(client.Client.EXTED_PLURALS)
+        plurals.update(constants.PLURALS)
+        self.plurals = plurals
+        self.serializer = serializer.Serializer(
+            {'plurals': plurals, 'xmlns': constants.XML_NS_V20})
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.requests += 1
+        path = environ.get('PATH_INFO', '')
+        fmt = 'json'
+        if path.endswith('.json') or path.endswith('.xml'):
+            path, fmt = path.rsplit('.', 1)
+        content_type = 'application/' + fmt
+        try:
+            status, body = self.handle(environ, path, content_type)
+        except HTTPError as e:
+            status = e.status
+            body = {'NeutronError': {'type': e.error_type,
+                                     'message': str(e), 'detail': ''}}
+        if body is None:
+            data = ''
+        else:
+            data = self.serializer.serialize(body, content_type)
+        start_response(self.STATUSES[status],
+                       [('Content-Type', content_type),
+                        ('Content-Length', str(len(data)))])
+        return [data]
+
+    def handle(self, environ, path, content_type):
+        parts = path.strip('/').split('/')
+        if parts[0] != 'v2.0' or len(parts) not in (2, 3):
+            raise HTTPError(404, 'NotFound', 'Unknown path %s' % path)
+        method = environ['REQUEST_METHOD']
+        if parts[1] == 'extensions' and len(parts) == 2:
+            return 200, {'extensions': []}
+        # e.g. security-group-rules
+        collection = parts[1].replace('-', '_')
+        if collection not in self.collections:
+            raise HTTPError(404, 'NotFound',
+                            'Unknown collection %s' % collection)
+        query = urlparse.parse_qs(environ.get('QUERY_STRING', ''))
+        if len(parts) == 2:
+            if method == 'GET':
+                return 200, self.list(environ, collection, query)
+            if method == 'POST':
+                return 201, self.create(
+                    collection, self.read_body(environ, content_type))
+        else:
+            resource = self.get(collection, parts[2])
+            if method == 'GET':
+                return 200, {self.plurals[collection]: self.select(
+                    resource, query.get('fields'))}
+            if method == 'PUT':
+                body = self.read_body(environ, content_type)
+                resource.update(body.get(self.plurals[collection], {}))
+                return 200, {self.plurals[collection]: resource}
+            if method == 'DELETE':
+                with self._lock:
+                    del self.by_id[collection][resource['id']]
+                    self.collections[collection].remove(resource)
+                return 204, None
+        raise HTTPError(405, 'HTTPMethodNotAllowed',
+                        'Method %s not allowed on %s' % (method, path))
+
+    def read_body(self, environ, content_type):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        data = environ['wsgi.input'].read(length)
+        try:
+            return self.serializer.deserialize(data, content_type)['body']
+        except Exception as e:
+            raise HTTPError(400, 'MalformedRequestBody', str(e))
+
+    def get(self, collection, resource_id):
+        try:
+            return self.by_id[collection][resource_id]
+        except KeyError:
+            raise HTTPError(404, '%sNotFound' % self.plurals[collection],
+                            '%s %s could not be found' %
+                            (self.plurals[collection], resource_id))
+
+    def select(self, resource, fields):
+        if not fields:
+            return resource
+        return dict((k, v) for k, v in resource.iteritems() if k in fields)
+
+    def list(self, environ, collection, query):
+        filters = dict((k, v) for k, v in query.items()
+                       if k not in _LIST_PARAMS)
+        resources = [r for r in self.collections[collection]
+                     if all(str(r.get(k)) in v for k, v in filters.items())]
+        sort_keys = query.get('sort_key', [])
+        sort_dirs = query.get('sort_dir', []) + ['asc'] * len(sort_keys)
+        for key, direction in reversed(zip(sort_keys, sort_dirs)):
+            resources.sort(key=lambda r: r.get(key),
+                           reverse=direction == 'desc')
+        if 'marker' in query:
+            ids = [r['id'] for r in resources]
+            try:
+                resources = resources[ids.index(query['marker'][0]) + 1:]
+            except ValueError:
+                raise HTTPError(404, 'NotFound', 'Marker not found')
+        body = {}
+        if 'limit' in query:
+            limit = int(query['limit'][0])
+            if 0 < limit < len(resources):
+                resources = resources[:limit]
+                next_query = dict(query, marker=[resources[-1]['id']])
+                body[collection + '_links'] = [{
+                    'rel': 'next',
+                    'href': 'http://%s%s?%s' % (
+                        environ.get('HTTP_HOST', 'localhost'),
+                        environ['PATH_INFO'],
+                        urllib.urlencode(next_query, doseq=1))}]
+        fields = query.get('fields')
+        body[collection] = [self.select(r, fields) for r in resources]
+        return body
+
+    def create(self, collection, body):
+        singular = self.plurals[collection]
+        if collection in body:
+            resources = body[collection]
+        elif singular in body:
+            resources = [body[singular]]
+        else:
+            raise HTTPError(400, 'BadRequest',
+                            'Resource body required')
+        created = []
+        for attributes in resources:
+            resource = {'id': str(uuid.uuid4()),
+                        'tenant_id': dataset.TENANT_ID}
+            if collection in ('networks', 'ports', 'routers'):
+                resource.update(admin_state_up=True, status='ACTIVE')
+            if collection == 'networks':
+                resource['subnets'] = []
+            resource.update(copy.deepcopy(attributes))
+            created.append(resource)
+        with self._lock:
+            for resource in created:
+                self.collections[collection].append(resource)
+                self.by_id[collection][resource['id']] = resource
+        if collection in body:
+            return {collection: created}
+        return {singular: created[0]}
+
+
+class _ServerHandler(simple_server.ServerHandler):
+    # Keeps connections alive, the responses having a Content-Length
+    http_version = '1.1'
+
+
+class _RequestHandler(simple_server.WSGIRequestHandler):
+    """Serves the requests of a connection until the client closes it."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # The headers and the body of responses are sent separately, do
+        # not wait for the client to acknowledge the headers
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        simple_server.WSGIRequestHandler.setup(self)
+
+    def handle(self):
+        while True:
+            self.raw_requestline = self.rfile.readline(65537)
+            if not self.parse_request():
+                return
+            handler = _ServerHandler(self.rfile, self.wfile,
+                                     self.get_stderr(), self.get_environ())
+            handler.request_handler = self
+            handler.run(self.server.get_app())
+            if self.close_connection:
+                return
+
+    def log_message(self, *args):
+        pass
+
+
+class _WSGIServer(SocketServer.ThreadingMixIn, simple_server.WSGIServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        simple_server.WSGIServer.__init__(self, *args, **kwargs)
+        # The kept alive connections, closed by close_connections()
+        self.connections = set()
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def process_request_thread(self, request, client_address):
+        with self.lock:
+            self.connections.add(request)
+            self.threads.add(threading.current_thread())
+        try:
+            SocketServer.ThreadingMixIn.process_request_thread(
+                self, request, client_address)
+        finally:
+            with self.lock:
+                self.connections.discard(request)
+                self.threads.discard(threading.current_thread())
+
+    def handle_error(self, request, client_address):
+        # Clients closing kept alive connections are not errors
+        if not isinstance(sys.exc_info()[1], socket.error):
+            simple_server.WSGIServer.handle_error(self, request,
+                                                  client_address)
+
+    def close_connections(self):
+        with self.lock:
+            connections = list(self.connections)
+            threads = list(self.threads)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        for thread in threads:
+            thread.join()
+
+
+class FakeNeutronServer(object):
+    """Serves a FakeNeutronApp on a local port from a thread.
+
+    :param collections: resources to serve, see FakeNeutronApp
+    """
+
+    def __init__(self, collections):
+        self.app = FakeNeutronApp(collections)
+        self._server = simple_server.make_server(
+            '127.0.0.1', 0, self.app, server_class=_WSGIServer,
+            handler_class=_RequestHandler)
+        self.endpoint = 'http://127.0.0.1:%d' % self._server.server_port
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the connections of the clients."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server.close_connections()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,82 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Compare the JSON backends on a large list of ports.
+
+    python -m tests.benchmark.json_codec [--ports N] [--repeat N]
+"""
+
+import argparse
+import sys
+import timeit
+import uuid
+
+from neutronclient.common import codec
+from neutronclient.common import serializer
+
+
+def make_ports(count):
+    network_id = str(uuid.uuid4())
+    return {'ports': [
+        {'id': str(uuid.uuid4()),
+         'name': u'port-%d' % i,
+         'network_id': network_id,
+         'tenant_id': 'b0a0e0e7e0a04e0e8e0e0e0e0e0e0e0e',
+         'admin_state_up': True,
+         'status': 'ACTIVE',
+         'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+             i >> 16 & 255, i >> 8 & 255, i & 255),
+         'fixed_ips': [{'subnet_id': str(uuid.uuid4()),
+                        'ip_address': '10.%d.%d.%d' % (
+                            i >> 16 & 255, i >> 8 & 255, i & 255)}],
+         'device_id': str(uuid.uuid4()),
+         'device_owner': 'compute:nova',
+         'security_groups': [str(uuid.uuid4())]}
+        for i in xrange(count)]}
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ports', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = make_ports(args.ports)
+    document = codec.dumps(data)
+    print 'Document of %d ports, %d bytes' % (args.ports, len(document))
+    print '%-12s %12s %12s' % ('backend', 'encode (ms)', 'decode (ms)')
+    default = codec.backend
+    content_type = 'application/json'
+    try:
+        for backend in codec.available_backends():
+            codec.set_backend(backend)
+            json_serializer = serializer.Serializer()
+            encode = min(timeit.repeat(
+                lambda: json_serializer.serialize(data, content_type),
+                number=1, repeat=args.repeat))
+            decode = min(timeit.repeat(
+                lambda: json_serializer.deserialize(document, content_type),
+                number=1, repeat=args.repeat))
+            print '%-12s %12.1f %12.1f' % (backend.name, encode * 1000,
+                                           decode * 1000)
+    finally:
+        codec.set_backend(default)
+    print 'Selected backend: %s' % default.name
+
+
+if __name__ == '__main__':
+    main()
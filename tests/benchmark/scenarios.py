@@ -0,0 +1,265 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Measure the client and the CLI against a fake Neutron server.
+
+    python -m tests.benchmark.scenarios [--networks N] [--ports N]
+        [--rules N] [--format json|xml] [--page-size N] [--runs N]
+        [SCENARIO ...]
+
+Each scenario runs in a new interpreter, which generates the resources
+(see dataset) and serves them with an in-process fake server (see
+fake_server), then runs the scenario once to warm up and --runs times.
+The latency percentiles of the runs are reported, with the number of
+requests per run and the peak memory of the interpreter, client and
+server together, above the one reached by the warm up.  The cli-*
+scenarios run a command of the shell, with a new client each time but
+the modules already imported.
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import resource
+import StringIO
+import subprocess
+import sys
+import time
+
+from neutronclient.neutron import v2_0 as neutronV20
+from neutronclient import shell
+from neutronclient.v2_0 import client
+from tests.benchmark import dataset
+from tests.benchmark import fake_server
+
+
+TOKEN = 'benchmarktoken'
+
+
+class Environment(object):
+    """What scenarios run against.
+
+    :ivar args: the arguments of the benchmark
+    :ivar data: the resources served, by collection
+    :ivar server: the FakeNeutronServer
+    :ivar client: a v2.0 Client of the server, in the format of args
+    """
+
+    def __init__(self, args, data, server):
+        self.args = args
+        self.data = data
+        self.server = server
+        self.random = random.Random(0)
+        self.client = self.new_client()
+
+    def new_client(self, **kwargs):
+        neutron_client = client.Client(token=TOKEN,
+                                       endpoint_url=self.server.endpoint,
+                                       **kwargs)
+        neutron_client.format = self.args.format
+        return neutron_client
+
+    def random_id(self, collection):
+        return self.random.choice(self.data[collection])['id']
+
+
+def list_networks(env):
+    return env.client.list_networks
+
+
+def list_ports(env):
+    return env.client.list_ports
+
+
+def list_ports_paged(env):
+    return lambda: env.client.list_ports(limit=env.args.page_size)
+
+
+def iterate_ports(env):
+    streaming = env.new_client(stream_lists=True)
+    return lambda: sum(1 for port in
+                       streaming.iter_ports(limit=env.args.page_size))
+
+
+def show_port(env):
+    return lambda: env.client.show_port(env.random_id('ports'))
+
+
+def create_port(env):
+    def run():
+        env.client.create_port({'port': {
+            'network_id': env.random_id('networks'),
+            'name': 'bench-port'}})
+    return run
+
+
+def resolve_name(env):
+    def run():
+        # Resolve the name with the server each time
+        env.client.resource_id_cache.clear()
+        name = env.random.choice(env.data['networks'])['name']
+        neutronV20.find_resourceid_by_name_or_id(env.client, 'network',
+                                                 name)
+    return run
+
+
+def resolve_names(env):
+    names = [network['name'] for network in env.data['networks'][:50]]
+
+    def run():
+        env.client.resource_id_cache.clear()
+        neutronV20.find_resourceids_by_names_or_ids(env.client, 'network',
+                                                    names)
+    return run
+
+
+def cli(*command):
+    def scenario(env):
+        argv = ['--os-token', TOKEN, '--os-url', env.server.endpoint]
+        argv.extend(command)
+        argv.extend(['--request-format', env.args.format])
+        if env.args.page_size:
+            argv.extend(['--page-size', str(env.args.page_size)])
+
+        def run():
+            root_logger = logging.getLogger('')
+            handlers = root_logger.handlers[:]
+            stdout, sys.stdout = sys.stdout, StringIO.StringIO()
+            try:
+                status = shell.NeutronShell(
+                    shell.NEUTRON_API_VERSION).run(list(argv))
+            finally:
+                sys.stdout = stdout
+                # The shell adds a handler each time
+                root_logger.handlers[:] = handlers
+            if status:
+                raise RuntimeError('%s failed' % ' '.join(command))
+        return run
+    return scenario
+
+
+SCENARIOS = [
+    ('list-networks', list_networks),
+    ('list-ports', list_ports),
+    ('list-ports-paged', list_ports_paged),
+    ('iterate-ports', iterate_ports),
+    ('show-port', show_port),
+    ('create-port', create_port),
+    ('resolve-name', resolve_name),
+    ('resolve-names', resolve_names),
+    ('cli-net-list', cli('net-list')),
+    ('cli-port-list', cli('port-list')),
+    ('cli-security-group-rule-list', cli('security-group-rule-list')),
+]
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of sorted values."""
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(0, index)]
+
+
+def peak_memory():
+    """Returns the peak resident memory of the interpreter in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Bytes there, kilobytes elsewhere
+        peak //= 1024
+    return peak / 1024.0
+
+
+def measure(scenario, args):
+    """Runs scenario and returns its results."""
+    data = dataset.generate(args.networks, args.ports, args.rules)
+    with fake_server.FakeNeutronServer(data) as server:
+        env = Environment(args, data, server)
+        run = scenario(env)
+        run()
+        memory = peak_memory()
+        requests = server.app.requests
+        times = []
+        for i in xrange(args.runs):
+            start = time.time()
+            run()
+            times.append(time.time() - start)
+        requests = server.app.requests - requests
+        env.client.httpclient.connection_pool.close()
+    times.sort()
+    return {'p50': percentile(times, 50),
+            'p90': percentile(times, 90),
+            'p99': percentile(times, 99),
+            'max': times[-1],
+            'total': sum(times),
+            'requests': requests / float(args.runs),
+            'memory': peak_memory() - memory}
+
+
+def measure_in_child(name, argv):
+    """Runs the scenario name in a new interpreter."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'tests.benchmark.scenarios', '--child',
+         name] + argv, stdout=subprocess.PIPE)
+    output = process.communicate()[0]
+    if process.returncode:
+        raise RuntimeError('Scenario %s failed' % name)
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=sys.argv[1:]):
+    names = [name for name, scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--networks', type=int, default=100)
+    parser.add_argument('--ports', type=int, default=1000)
+    parser.add_argument('--rules', type=int, default=500)
+    parser.add_argument('--format', choices=['json', 'xml'],
+                        default='json')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='0 to list everything at once')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('scenarios', metavar='SCENARIO', nargs='*',
+                        help='Scenarios to run, all by default: %s' %
+                        ', '.join(names))
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in names]
+    if unknown:
+        parser.error('Unknown scenarios: %s' % ', '.join(unknown))
+
+    if args.child:
+        scenario = dict(SCENARIOS)[args.scenarios[0]]
+        print json.dumps(measure(scenario, args))
+        return
+    child_argv = [arg for arg in argv if arg not in names]
+    print ('%d networks, %d ports, %d rules in %s, %d runs' %
+           (args.networks, args.ports, args.rules, args.format, args.runs))
+    print '%-30s %9s %9s %9s %9s %8s %9s %9s' % (
+        'scenario', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)',
+        'ops/s', 'requests', 'peak (MB)')
+    for name in args.scenarios or names:
+        result = measure_in_child(name, child_argv)
+        print '%-30s %9.1f %9.1f %9.1f %9.1f %8.1f %9.1f %9.1f' % (
+            name, result['p50'] * 1000, result['p90'] * 1000,
+            result['p99'] * 1000, result['max'] * 1000,
+            args.runs / result['total'], result['requests'],
+            result['memory'])
+
+
+if __name__ == '__main__':
+    main()
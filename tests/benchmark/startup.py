@@ -0,0 +1,92 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Measure the startup time of the CLI up to running a command.
+
+    python -m tests.benchmark.startup [--command NAME] [--repeat N]
+
+Each run is a new interpreter which imports the shell, parses the global
+options and loads the command class, then builds the parser of the
+command, as `neutron net-show` does before sending its request.  The
+eager runs load every command class first, as the shell did when it
+imported all the command modules.  Building the parser of a command
+loads the cliff formatter plugins, whatever the command.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+RUN = """
+import sys
+import time
+start = time.time()
+from neutronclient import shell
+app = shell.NeutronShell(shell.NEUTRON_API_VERSION)
+if %(eager)r:
+    for name in shell.COMMAND_V2:
+        shell.COMMAND_V2[name]
+app.parser.parse_known_args(['%(command)s'])
+cmd_factory, name, argv = app.command_manager.find_command(['%(command)s'])
+# Imports the class of the command
+shell.COMMAND_V2[name]
+loaded = time.time()
+modules = len(sys.modules)
+cmd_factory(app, None).get_parser(name)
+print loaded - start, time.time() - start, modules
+"""
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def measure(command, eager, repeat):
+    loaded = []
+    ready = []
+    modules = 0
+    for i in xrange(repeat):
+        process = subprocess.Popen(
+            [sys.executable, '-c', RUN % {'command': command,
+                                          'eager': eager}],
+            stdout=subprocess.PIPE, env=os.environ)
+        output = process.communicate()[0]
+        load_time, ready_time, modules = output.split()
+        loaded.append(float(load_time))
+        ready.append(float(ready_time))
+    return median(loaded), median(ready), int(modules)
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--command', default='net-show')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print 'Startup of %s, median of %d runs' % (args.command, args.repeat)
+    print '%-8s %12s %8s %12s' % ('loading', 'loaded (ms)', 'modules',
+                                  'ready (ms)')
+    for label, eager in (('eager', True), ('lazy', False)):
+        loaded, ready, modules = measure(args.command, eager, args.repeat)
+        print '%-8s %12.1f %8d %12.1f' % (label, loaded * 1000, modules,
+                                          ready * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+"""Compare the ElementTree implementations on a large list of ports.
+
+    python -m tests.benchmark.xml_codec [--ports N] [--repeat N]
+"""
+
+import argparse
+import sys
+import timeit
+
+from neutronclient.common import constants
+from neutronclient.common import serializer
+from tests.benchmark import json_codec
+
+
+def implementations():
+    """Yields the ElementTree modules available, fastest last."""
+    from xml.etree import ElementTree
+    yield ElementTree
+    try:
+        from xml.etree import cElementTree
+    except ImportError:
+        return
+    yield cElementTree
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ports', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = json_codec.make_ports(args.ports)
+    metadata = {'plurals': constants.PLURALS,
+                'xmlns': constants.XML_NS_V20}
+    content_type = 'application/xml'
+    xml_serializer = serializer.Serializer(metadata)
+    document = xml_serializer.serialize(data, content_type)
+    print 'Document of %d ports, %d bytes' % (args.ports, len(document))
+    chunks = [document[i:i + 65536] for i in range(0, len(document), 65536)]
+    deserializer = xml_serializer.get_deserialize_handler(content_type)
+    print '%-24s %12s %12s %12s' % ('implementation', 'encode (ms)',
+                                    'decode (ms)', 'stream (ms)')
+    default = serializer.etree
+    try:
+        for etree in implementations():
+            serializer.etree = etree
+            encode = min(timeit.repeat(
+                lambda: xml_serializer.serialize(data, content_type),
+                number=1, repeat=args.repeat))
+            decode = min(timeit.repeat(
+                lambda: xml_serializer.deserialize(document, content_type),
+                number=1, repeat=args.repeat))
+            stream = min(timeit.repeat(
+                lambda: sum(1 for port in
+                            deserializer.iterparse(chunks, 'ports')),
+                number=1, repeat=args.repeat))
+            print '%-24s %12.1f %12.1f %12.1f' % (
+                etree.__name__, encode * 1000, decode * 1000, stream * 1000)
+    finally:
+        serializer.etree = default
+    print 'Selected implementation: %s' % default.__name__
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import BaseHTTPServer
+import json
+import threading
+import time
+import urlparse
+
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.common import workers
+from neutronclient.v2_0 import client
+
+
+TOKEN = 'testtoken'
+NETWORKS = [{'id': 'netid%d' % i, 'name': 'net%d' % i} for i in range(5)]
+
+
+class FakeNeutronHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers GET requests on networks with a small delay."""
+
+    protocol_version = 'HTTP/1.1'
+    delay = 0.1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        path, _sep, query = self.path.partition('?')
+        if path == '/v2.0/networks.json':
+            filters = urlparse.parse_qs(query)
+            nets = [net for net in NETWORKS
+                    if all(net[key] in filters[key]
+                           for key in ('id', 'name') if key in filters)]
+            self._reply(200, {'networks': nets})
+            return
+        for net in NETWORKS:
+            if path == '/v2.0/networks/%s.json' % net['id']:
+                self._reply(200, {'network': net})
+                return
+        self._reply(404, {'NeutronError': {'type': 'NetworkNotFound',
+                                           'message': 'not found',
+                                           'detail': ''}})
+
+    def _reply(self, status, body):
+        body = json.dumps(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeNeutronServer(BaseHTTPServer.HTTPServer):
+    def process_request(self, request, client_address):
+        # One thread per connection, so keep-alive clients run in parallel
+        thread = threading.Thread(target=self._handle,
+                                  args=(request, client_address))
+        thread.daemon = True
+        thread.start()
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class AsyncClientTest(testtools.TestCase):
+
+    def setUp(self):
+        super(AsyncClientTest, self).setUp()
+        self.server = FakeNeutronServer(('127.0.0.1', 0), FakeNeutronHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+        endpoint = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.client = client.AsyncClient(max_workers=5, token=TOKEN,
+                                         endpoint_url=endpoint)
+        self.addCleanup(self.client.close)
+
+    def test_calls_return_futures(self):
+        future = self.client.list_networks()
+        self.assertTrue(isinstance(future, workers.Future))
+        self.assertEqual({'networks': NETWORKS}, future.result())
+
+    def test_requests_in_flight_concurrently(self):
+        start = time.time()
+        futures = [self.client.show_network(net['id']) for net in NETWORKS]
+        results = [f.result()['network'] for f in futures]
+        elapsed = time.time() - start
+        self.assertEqual(NETWORKS, results)
+        # Sequential requests would take len(NETWORKS) * delay
+        self.assertTrue(elapsed < FakeNeutronHandler.delay * len(NETWORKS))
+
+    def test_error_raised_by_result(self):
+        future = self.client.show_network('unknown')
+        self.assertRaises(exceptions.NetworkNotFoundClient, future.result)
+
+    def test_only_api_calls_exposed(self):
+        self.assertRaises(AttributeError, getattr, self.client, 'do_request')
+        self.assertRaises(AttributeError, getattr, self.client, 'serialize')
+
+
+class WorkerPoolTest(testtools.TestCase):
+
+    def test_map(self):
+        with workers.WorkerPool(3) as pool:
+            self.assertEqual([2, 4, 6], pool.map(lambda x: x * 2, [1, 2, 3]))
+
+    def test_map_raises(self):
+        def fail(x):
+            raise ValueError(x)
+        with workers.WorkerPool(3) as pool:
+            self.assertRaises(ValueError, pool.map, fail, [1, 2])
+
+    def test_done_callback(self):
+        called = []
+        with workers.WorkerPool(1) as pool:
+            future = pool.submit(lambda: 42)
+            future.result()
+            future.add_done_callback(lambda f: called.append(f.result()))
+        self.assertEqual([42], called)
+
+    def test_bounded_threads(self):
+        with workers.WorkerPool(2) as pool:
+            pool.map(time.sleep, [0.01] * 10)
+            self.assertEqual(2, len(pool._threads))
+
+
+class ReadAheadTest(testtools.TestCase):
+
+    def test_items_in_order(self):
+        self.assertEqual(range(10), list(workers.read_ahead(xrange(10), 3)))
+
+    def test_produces_ahead(self):
+        produced = []
+
+        def produce():
+            for i in range(5):
+                produced.append(i)
+                yield i
+        items = workers.read_ahead(produce(), 2)
+        self.assertEqual(0, next(items))
+        time.sleep(0.1)
+        # One item handed out, two queued and one waiting to be queued
+        self.assertEqual([0, 1, 2, 3], produced)
+        self.assertEqual([1, 2, 3, 4], list(items))
+
+    def test_error_raised_to_consumer(self):
+        def produce():
+            yield 1
+            raise ValueError()
+        items = workers.read_ahead(produce())
+        self.assertEqual(1, next(items))
+        self.assertRaises(ValueError, next, items)
+
+    def test_close_stops_producer(self):
+        produced = []
+
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+        items = workers.read_ahead(produce(), 1)
+        next(items)
+        items.close()
+        time.sleep(0.3)
+        self.assertTrue(len(produced) < 5)
+
+    def test_abandoned_generator_stops_producer(self):
+        closed = threading.Event()
+
+        def produce():
+            try:
+                for i in range(100):
+                    yield i
+            finally:
+                closed.set()
+        pages = produce()
+        items = workers.read_ahead(pages, 1)
+        next(items)
+        del items
+        self.assertTrue(closed.wait(1))
@@ -16,15 +16,20 @@
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
 import copy
+import datetime
 import httplib2
 import json
+import os
 import uuid
 
+import fixtures
 import mox
 import testtools
 
 from neutronclient import client
+from neutronclient.common import cache
 from neutronclient.common import exceptions
+from neutronclient.openstack.common import timeutils
 
 
 USERNAME = 'testuser'
@@ -91,7 +96,8 @@ class CLITestAuthKeystone(testtools.TestCase):
 
         self.client.request(
             AUTH_URL + '/tokens', 'POST',
-            body=mox.StrContains(self.auth_type), headers=mox.IsA(dict)
+            body=mox.StrContains(self.auth_type), headers=mox.IsA(dict),
+            follow_all_redirects=True
         ).AndReturn((res200, json.dumps(KS_TOKEN_RESULT)))
         self.client.request(
             mox.StrContains(ENDPOINT_URL + '/resource'), 'GET',
@@ -121,7 +127,8 @@ class CLITestAuthKeystone(testtools.TestCase):
         ).AndReturn((res401, ''))
         self.client.request(
             AUTH_URL + '/tokens', 'POST',
-            body=mox.IsA(str), headers=mox.IsA(dict)
+            body=mox.IsA(str), headers=mox.IsA(dict),
+            follow_all_redirects=True
         ).AndReturn((res200, json.dumps(KS_TOKEN_RESULT)))
         self.client.request(
             mox.StrContains(ENDPOINT_URL + '/resource'), 'GET',
@@ -186,7 +193,8 @@ class CLITestAuthKeystone(testtools.TestCase):
         ).AndReturn((res401, ''))
         self.client.request(
             AUTH_URL + '/tokens', 'POST',
-            body=mox.IsA(str), headers=mox.IsA(dict)
+            body=mox.IsA(str), headers=mox.IsA(dict),
+            follow_all_redirects=True
         ).AndReturn((res200, json.dumps(KS_TOKEN_RESULT)))
         self.client.request(
             mox.StrContains(ENDPOINT_URL + '/resource'), 'GET',
@@ -357,3 +365,92 @@ class CLITestAuthKeystoneWithIdandName(CLITestAuthKeystone):
                                         password=PASSWORD,
                                         auth_url=AUTH_URL,
                                         region_name=REGION)
+
+
+class CLITestAuthKeystoneTokenCache(testtools.TestCase):
+
+    def setUp(self):
+        """Prepare the test environment."""
+        super(CLITestAuthKeystoneTokenCache, self).setUp()
+        self.mox = mox.Mox()
+        self.addCleanup(self.mox.VerifyAll)
+        self.addCleanup(self.mox.UnsetStubs)
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.token_cache = cache.TokenCache(path=self.cache_dir)
+        self.client = self._make_client()
+        self.token_result = copy.deepcopy(KS_TOKEN_RESULT)
+        expires = timeutils.utcnow() + datetime.timedelta(hours=1)
+        self.token_result['access']['token']['expires'] = (
+            timeutils.isotime(expires))
+
+    def _make_client(self, password=PASSWORD):
+        return client.HTTPClient(username=USERNAME,
+                                 tenant_name=TENANT_NAME,
+                                 password=password,
+                                 auth_url=AUTH_URL,
+                                 region_name=REGION,
+                                 token_cache=self.token_cache)
+
+    def _expect_token_request(self, http_client):
+        res200 = self.mox.CreateMock(httplib2.Response)
+        res200.status = 200
+        http_client.request(
+            AUTH_URL + '/tokens', 'POST',
+            body=mox.IsA(str), headers=mox.IsA(dict),
+            follow_all_redirects=True
+        ).AndReturn((res200, json.dumps(self.token_result)))
+
+    def test_cache_miss_stores_token(self):
+        self.mox.StubOutWithMock(self.client, "request")
+        self._expect_token_request(self.client)
+        self.mox.ReplayAll()
+        self.client.authenticate()
+        self.assertEqual(TOKEN, self.client.auth_token)
+        self.assertEqual(1, len([f for f in os.listdir(self.cache_dir)
+                                 if not f.endswith('.lock')]))
+
+    def test_cache_hit_skips_keystone(self):
+        key = self.client._token_cache_key()
+        self.token_cache.set(key, self.token_result)
+        self.mox.StubOutWithMock(self.client, "request")
+        self.mox.ReplayAll()
+        self.client.authenticate_and_fetch_endpoint_url()
+        self.assertEqual(TOKEN, self.client.auth_token)
+        self.assertEqual(ENDPOINT_URL, self.client.endpoint_url)
+
+    def test_cache_not_shared_between_credentials(self):
+        key = self.client._token_cache_key()
+        self.token_cache.set(key, self.token_result)
+        other = self._make_client(password='other')
+        self.assertNotEqual(key, other._token_cache_key())
+
+    def test_expiring_token_is_refreshed(self):
+        expires = timeutils.utcnow() + datetime.timedelta(seconds=10)
+        expiring = copy.deepcopy(self.token_result)
+        expiring['access']['token']['expires'] = timeutils.isotime(expires)
+        self.token_cache.set(self.client._token_cache_key(), expiring)
+        self.mox.StubOutWithMock(self.client, "request")
+        self._expect_token_request(self.client)
+        self.mox.ReplayAll()
+        self.client.authenticate()
+
+    def test_rejected_token_is_evicted(self):
+        self.token_cache.set(self.client._token_cache_key(),
+                             self.token_result)
+        self.client.authenticate()
+        self.mox.StubOutWithMock(self.client, "request")
+        res200 = self.mox.CreateMock(httplib2.Response)
+        res200.status = 200
+        res401 = self.mox.CreateMock(httplib2.Response)
+        res401.status = 401
+        self.client.request(
+            mox.StrContains(ENDPOINT_URL + '/resource'), 'GET',
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).AndReturn((res401, ''))
+        self._expect_token_request(self.client)
+        self.client.request(
+            mox.StrContains(ENDPOINT_URL + '/resource'), 'GET',
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).AndReturn((res200, ''))
+        self.mox.ReplayAll()
+        self.client.do_request('/resource', 'GET')
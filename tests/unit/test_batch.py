@@ -0,0 +1,193 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import os
+import socket
+import StringIO
+import threading
+import time
+
+import fixtures
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.common import utils
+from neutronclient.neutron.v2_0 import batch
+from neutronclient import shell
+from tests.unit import test_async_client
+
+
+class FakeStdin(StringIO.StringIO):
+    encoding = None
+
+
+class BatchTest(testtools.TestCase):
+
+    def setUp(self):
+        super(BatchTest, self).setUp()
+        self.useFixture(fixtures.MonkeyPatch(
+            'tests.unit.test_async_client.FakeNeutronHandler.delay', 0))
+        self.server = test_async_client.FakeNeutronServer(
+            ('127.0.0.1', 0), test_async_client.FakeNeutronHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.stdout = StringIO.StringIO()
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', self.stdout))
+        self.useFixture(fixtures.MonkeyPatch('sys.stderr',
+                                             StringIO.StringIO()))
+        self.tempdir = self.useFixture(fixtures.TempDir()).path
+
+    def _run(self, *args):
+        return shell.NeutronShell('2.0').run(
+            ['--os-token', test_async_client.TOKEN,
+             '--os-url', self.endpoint] + list(args))
+
+    def _results(self, output):
+        return [utils.loads(line) for line in output.splitlines()]
+
+    def test_batch_file(self):
+        path = os.path.join(self.tempdir, 'commands')
+        with open(path, 'w') as f:
+            f.write('# Networks\n'
+                    'net-show net1 -f shell -c id\n'
+                    '\n'
+                    'net-show net9\n'
+                    'net-show --bad-option\n')
+        self.assertEqual(1, self._run('batch', path))
+        results = self._results(self.stdout.getvalue())
+        self.assertEqual(['net-show net1 -f shell -c id',
+                          'net-show net9',
+                          'net-show --bad-option'],
+                         [r['command'] for r in results])
+        self.assertEqual([0, 1, 1], [r['status'] for r in results])
+        self.assertEqual('id="netid1"\n', results[0]['output'])
+        self.assertEqual(None, results[0]['error'])
+        self.assertEqual("Unable to find network with name 'net9'",
+                         results[1]['error'])
+        self.assertTrue(results[2]['error'])
+
+    def test_batch_stdin(self):
+        self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdin', FakeStdin('net-list -f csv -c id\n'
+                                   'net-show net2 -F id\n')))
+        self.assertEqual(0, self._run('batch'))
+        results = self._results(self.stdout.getvalue())
+        self.assertEqual([0, 0], [r['status'] for r in results])
+        self.assertTrue('"netid4"' in results[0]['output'])
+        self.assertTrue('netid2' in results[1]['output'])
+
+    def test_batch_parallel(self):
+        path = os.path.join(self.tempdir, 'commands')
+        with open(path, 'w') as f:
+            f.write(''.join('net-show net%d -f shell -c id\n' % i
+                            for i in range(5)))
+        self.assertEqual(0, self._run('batch', '--parallel', '3', path))
+        results = self._results(self.stdout.getvalue())
+        self.assertEqual(['id="netid%d"\n' % i for i in range(5)],
+                         [r['output'] for r in results])
+
+    def test_batch_socket(self):
+        path = os.path.join(self.tempdir, 'socket')
+        thread = threading.Thread(target=self._run,
+                                  args=('batch', '--socket', path))
+        thread.daemon = True
+        thread.start()
+        for i in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        client.sendall('net-show net3 -f shell -c id\nnet-show nope\n')
+        client.shutdown(socket.SHUT_WR)
+        output = client.makefile().read()
+        client.close()
+        results = self._results(output)
+        self.assertEqual([0, 1], [r['status'] for r in results])
+        self.assertEqual('id="netid3"\n', results[0]['output'])
+
+
+class BatchGraphTest(testtools.TestCase):
+
+    LINES = ['net-create net-a',
+             'net-create net-b',
+             'subnet-create net-a 10.0.0.0/24 --name sub-a',
+             'net-show net1',
+             'port-create net-b --fixed-ip subnet_id=sub-a,'
+             'ip_address=10.0.0.5',
+             'net-delete net-a']
+
+    def setUp(self):
+        super(BatchGraphTest, self).setUp()
+        self.batch = batch.Batch(shell.NeutronShell('2.0'), None)
+
+    def test_plan(self):
+        self.assertEqual([[], [], [0], [], [1, 2], [0, 2]],
+                         self.batch.plan(self.LINES))
+
+    def test_plan_readers_run_concurrently(self):
+        lines = ['net-create net1',
+                 'port-create net1 --name p1',
+                 'port-create net1 --name p2',
+                 'port-create net1 --name p3',
+                 'net-update net1 --name net2',
+                 'net-show net1',
+                 'net-delete net1',
+                 'port-delete p1 p2']
+        self.assertEqual([[], [0], [0], [0], [0, 1, 2, 3], [4], [4, 5],
+                          [1, 2]],
+                         self.batch.plan(lines))
+
+    def test_run_graph_request_formats(self):
+        self.assertRaises(exceptions.CommandError, self.batch.run_graph,
+                          ['net-show net1 --request-format xml',
+                           'net-show net2'], StringIO.StringIO(), 2)
+
+    def test_run_graph(self):
+        lock = threading.Lock()
+        events = []
+
+        def run_line(line):
+            with lock:
+                events.append(('start', line))
+            time.sleep(0.01)
+            with lock:
+                events.append(('end', line))
+            status = line == 'net-create net-b' and 1 or 0
+            return {'command': line, 'status': status, 'output': line,
+                    'error': None}
+
+        self.batch.run_line = run_line
+        output = StringIO.StringIO()
+        self.assertEqual((6, 2),
+                         self.batch.run_graph(self.LINES, output, 4))
+        results = [utils.loads(line)
+                   for line in output.getvalue().splitlines()]
+        self.assertEqual(self.LINES, [r['command'] for r in results])
+        self.assertEqual([0, 1, 0, 0, 1, 0], [r['status'] for r in results])
+        self.assertEqual('Not run as net-create net-b failed',
+                         results[4]['error'])
+        self.assertFalse(('start', self.LINES[4]) in events)
+        # Independent commands ran concurrently
+        self.assertEqual(['start'] * 3, [e[0] for e in events[:3]])
+        self.assertTrue(events.index(('end', self.LINES[0])) <
+                        events.index(('start', self.LINES[2])) <
+                        events.index(('end', self.LINES[2])) <
+                        events.index(('start', self.LINES[5])))
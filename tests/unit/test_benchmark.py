@@ -0,0 +1,86 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import argparse
+
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.v2_0 import client
+from tests.benchmark import dataset
+from tests.benchmark import fake_server
+from tests.benchmark import scenarios
+
+
+class FakeNeutronServerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(FakeNeutronServerTest, self).setUp()
+        self.data = dataset.generate(networks=5, ports=30, rules=25)
+        server = fake_server.FakeNeutronServer(self.data).start()
+        self.addCleanup(server.stop)
+        self.client = client.Client(token='token',
+                                    endpoint_url=server.endpoint)
+        self.addCleanup(self.client.httpclient.connection_pool.close)
+
+    def test_dataset(self):
+        self.assertEqual(dataset.generate(networks=5, ports=30, rules=25),
+                         self.data)
+        self.assertEqual([5, 5, 30, 3, 25],
+                         [len(self.data[collection]) for collection in
+                          ('networks', 'subnets', 'ports', 'security_groups',
+                           'security_group_rules')])
+
+    def test_pagination(self):
+        for fmt in ('json', 'xml'):
+            self.client.format = fmt
+            self.assertEqual(self.data['ports'],
+                             self.client.list_ports(limit=7)['ports'])
+
+    def test_filters_and_fields(self):
+        networks = self.client.list_networks(name=['net-1', 'net-3'],
+                                             fields=['id', 'name'])
+        self.assertEqual([{'id': self.data['networks'][i]['id'],
+                           'name': 'net-%d' % i} for i in (1, 3)],
+                         networks['networks'])
+
+    def test_create_update_delete(self):
+        port = self.client.create_port({'port': {'name': 'new'}})['port']
+        self.client.update_port(port['id'], {'port': {'name': 'renamed'}})
+        self.assertEqual('renamed',
+                         self.client.show_port(port['id'])['port']['name'])
+        self.client.delete_port(port['id'])
+        self.assertRaises(exceptions.NeutronClientException,
+                          self.client.show_port, port['id'])
+
+
+class ScenariosTest(testtools.TestCase):
+
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(50, scenarios.percentile(values, 50))
+        self.assertEqual(99, scenarios.percentile(values, 99))
+        self.assertEqual(1, scenarios.percentile([1], 90))
+
+    def test_scenarios_run(self):
+        args = argparse.Namespace(networks=3, ports=10, rules=10,
+                                  format='json', page_size=4, runs=1)
+        for name in ('list-ports-paged', 'resolve-name', 'cli-net-list'):
+            result = scenarios.measure(dict(scenarios.SCENARIOS)[name],
+                                       args)
+            self.assertTrue(result['requests'] >= 1, name)
+            self.assertTrue(result['p50'] <= result['max'], name)
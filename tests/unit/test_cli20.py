@@ -15,6 +15,8 @@
 #
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
+import threading
+import time
 import urllib
 
 import fixtures
@@ -22,6 +24,8 @@ import mox
 import testtools
 
 from neutronclient.common import constants
+from neutronclient.common import exceptions
+from neutronclient.common import utils
 from neutronclient import shell
 from neutronclient.v2_0 import client
 
@@ -68,7 +72,21 @@ class MyUrlComparator(mox.Comparator):
         self.client = client
 
     def equals(self, rhs):
-        return str(self) == rhs
+        # The order of the parameters does not matter, only the order of
+        # the values of each of them
+        lhs_parts = str(self).split("?", 1)
+        rhs_parts = rhs.split("?", 1)
+        if lhs_parts[0] != rhs_parts[0]:
+            return False
+        return (self._params(lhs_parts[1:]) == self._params(rhs_parts[1:]))
+
+    @staticmethod
+    def _params(query):
+        params = {}
+        for item in (query and query[0].split('&') or []):
+            key, _sep, value = item.partition('=')
+            params.setdefault(key, []).append(value)
+        return params
 
     def __str__(self):
         if self.client and self.client.format != FORMAT:
@@ -148,7 +166,7 @@ class CLITestV20Base(testtools.TestCase):
     def _find_resourceid(self, client, resource, name_or_id):
         return name_or_id
 
-    def _get_attr_metadata(self):
+    def _get_attr_metadata(self, _format=None):
         return self.metadata
         client.Client.EXTED_PLURALS.update(constants.PLURALS)
         client.Client.EXTED_PLURALS.update({'tags': 'tag'})
@@ -236,9 +254,14 @@ class CLITestV20Base(testtools.TestCase):
         self.client.format = self.format
         resstr = self.client.serialize(resources_out)
 
+        # Only the columns displayed are requested
+        columns = [args[i + 1] for i, arg in enumerate(args) if arg == '-c']
+        query = '&'.join(['fields=' + field
+                          for field in columns or cmd.list_columns])
         path = getattr(self.client, resources_collection + "_path")
         self.client.httpclient.request(
-            end_url(path, format=self.format), 'GET',
+            MyUrlComparator(end_url(path, query, format=self.format),
+                            self.client), 'GET',
             body=None,
             headers=mox.ContainsKeyValue(
                 'X-Auth-Token', TOKEN)).AndReturn((MyResp(200), resstr))
@@ -292,6 +315,9 @@ class CLITestV20Base(testtools.TestCase):
         if detail:
             query = query and query + '&verbose=True' or 'verbose=True'
         fields_1.extend(fields_2)
+        if not fields_1 and not detail:
+            # Only the columns displayed are requested by default
+            fields_1 = list(cmd.list_columns)
         for field in fields_1:
             if query:
                 query += "&fields=" + field
@@ -356,8 +382,9 @@ class CLITestV20Base(testtools.TestCase):
         self.client.format = self.format
         resstr1 = self.client.serialize(reses1)
         resstr2 = self.client.serialize(reses2)
+        query = '&'.join(['fields=' + field for field in cmd.list_columns])
         self.client.httpclient.request(
-            end_url(path, "", format=self.format), 'GET',
+            end_url(path, query, format=self.format), 'GET',
             body=None,
             headers=mox.ContainsKeyValue(
                 'X-Auth-Token', TOKEN)).AndReturn((MyResp(200), resstr1))
@@ -502,3 +529,235 @@ class ClientV2UnicodeTestJson(CLITestV20Base):
 
 class ClientV2UnicodeTestXML(ClientV2UnicodeTestJson):
     format = 'xml'
+
+
+class ClientV2IterateTest(CLITestV20Base):
+    def test_iter_networks_fetches_pages_lazily(self):
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        path = self.client.networks_path
+        fake_query = "marker=myid2&limit=2"
+        page1 = {'networks': [{'id': 'myid1'}, {'id': 'myid2'}],
+                 'networks_links': [{'href': end_url(path, fake_query),
+                                     'rel': 'next'}]}
+        page2 = {'networks': [{'id': 'myid3'}]}
+        requested = []
+        self.client.httpclient.request(
+            end_url(path, "", format=self.format), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).WithSideEffects(lambda *args, **kwargs: requested.append(1)
+                          ).AndReturn((MyResp(200),
+                                       self.client.serialize(page1)))
+        self.client.httpclient.request(
+            end_url(path, fake_query, format=self.format), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).WithSideEffects(lambda *args, **kwargs: requested.append(2)
+                          ).AndReturn((MyResp(200),
+                                       self.client.serialize(page2)))
+        self.mox.ReplayAll()
+        networks = self.client.iter_networks()
+        self.assertEqual([], requested)
+        self.assertEqual({'id': 'myid1'}, next(networks))
+        self.assertEqual({'id': 'myid2'}, next(networks))
+        self.assertEqual([1], requested)
+        self.assertEqual([{'id': 'myid3'}], list(networks))
+        self.assertEqual([1, 2], requested)
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+    def test_list_networks_prefetch_pages(self):
+        self.client.prefetch_pages = 1
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        path = self.client.networks_path
+        fake_query = "marker=myid1&limit=1"
+        page1 = {'networks': [{'id': 'myid1'}],
+                 'networks_links': [{'href': end_url(path, fake_query),
+                                     'rel': 'next'}]}
+        page2 = {'networks': [{'id': 'myid2'}]}
+        self.client.httpclient.request(
+            end_url(path, "", format=self.format), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).AndReturn((MyResp(200), self.client.serialize(page1)))
+        self.client.httpclient.request(
+            end_url(path, fake_query, format=self.format), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).AndReturn((MyResp(200), self.client.serialize(page2)))
+        self.mox.ReplayAll()
+        self.assertEqual({'networks': [{'id': 'myid1'}, {'id': 'myid2'}]},
+                         self.client.list_networks())
+        self.mox.VerifyAll()
+        self.mox.UnsetStubs()
+
+
+class ClientV2AttrMetadataTest(testtools.TestCase):
+    def setUp(self):
+        super(ClientV2AttrMetadataTest, self).setUp()
+        self.mox = mox.Mox()
+        self.addCleanup(self.mox.UnsetStubs)
+        self.client = client.Client(token=TOKEN, endpoint_url=ENDURL)
+        self.client.format = 'xml'
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+
+    def _expect_list_extensions(self):
+        exts = {'extensions': [{'alias': 'ext', 'namespace': 'http://ext'}]}
+        self.client.httpclient.request(
+            end_url(self.client.extensions_path, format='json'), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', TOKEN)
+        ).AndReturn((MyResp(200), utils.dumps(exts)))
+
+    def test_metadata_cached(self):
+        self._expect_list_extensions()
+        self.mox.ReplayAll()
+        plurals = dict(client.Client.EXTED_PLURALS)
+        metadata = self.client.get_attr_metadata()
+        self.client.serialize({'network': {'name': 'net'}})
+        self.assertTrue(metadata is self.client.get_attr_metadata())
+        self.assertEqual({'ext': 'http://ext'}, metadata[constants.EXT_NS])
+        self.assertEqual('port', metadata['plurals']['ports'])
+        self.assertEqual(plurals, client.Client.EXTED_PLURALS)
+        self.assertTrue(self.client._get_serializer() is
+                        self.client._get_serializer())
+        self.assertEqual('xml', self.client.format)
+        self.mox.VerifyAll()
+
+    def test_metadata_format_unchanged(self):
+        formats = []
+        self.client.httpclient.request(
+            end_url(self.client.extensions_path, format='json'), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('Content-Type', 'application/json')
+        ).WithSideEffects(
+            lambda *args, **kwargs: formats.append(self.client.format)
+        ).AndReturn((MyResp(200), utils.dumps({'extensions': []})))
+        self.mox.ReplayAll()
+        self.client.get_attr_metadata()
+        # Threads sharing the client keep sending XML meanwhile
+        self.assertEqual(['xml'], formats)
+        self.mox.VerifyAll()
+
+    def test_metadata_refresh(self):
+        self._expect_list_extensions()
+        self._expect_list_extensions()
+        self.mox.ReplayAll()
+        metadata = self.client.get_attr_metadata()
+        self.client.refresh_attr_metadata()
+        self.assertFalse(metadata is self.client.get_attr_metadata())
+        self.mox.VerifyAll()
+
+    def test_metadata_ttl(self):
+        self._expect_list_extensions()
+        self._expect_list_extensions()
+        self.mox.ReplayAll()
+        now = time.time()
+        self.useFixture(fixtures.MonkeyPatch('time.time', lambda: now))
+        self.client.get_attr_metadata()
+        now += self.client.attr_metadata_ttl + 1
+        self.client.get_attr_metadata()
+        self.mox.VerifyAll()
+
+
+class ClientV2ListInChunksTest(testtools.TestCase):
+    def setUp(self):
+        super(ClientV2ListInChunksTest, self).setUp()
+        self.client = client.Client(token=TOKEN, endpoint_url=ENDURL)
+        self.ids = ['subnetid%02d' % i for i in range(20)]
+        # The URI of a request on all ids: 20 "&id=subnetidNN" filters
+        uri = end_url(self.client.subnets_path, 'fields=id&' +
+                      '&'.join(['id=' + _id for _id in self.ids]))
+        # Room for 7 ids per request
+        self.client.MAX_URI_LEN = len(uri) - 13 * 14
+        self.requested = []
+        lock = threading.Lock()
+
+        def fake_list(collection, path, **params):
+            with lock:
+                self.requested.append(params['id'])
+            return {collection: [{'id': _id} for _id in params['id']]}
+        self.client.list = fake_list
+
+    def test_minimal_chunks(self):
+        res = self.client.list_in_chunks('subnets', 'id', self.ids,
+                                         fields='id')
+        self.assertEqual([{'id': _id} for _id in self.ids], res['subnets'])
+        self.assertEqual([self.ids[:7], self.ids[7:14], self.ids[14:]],
+                         self.requested)
+
+    def test_concurrent_chunks(self):
+        res = self.client.list_in_chunks('subnets', 'id', self.ids,
+                                         max_workers=3, fields='id')
+        # Merged in order whichever request completes first
+        self.assertEqual([{'id': _id} for _id in self.ids], res['subnets'])
+        self.assertEqual(3, len(self.requested))
+
+    def test_no_values(self):
+        res = self.client.list_in_chunks('subnets', 'id', [])
+        self.assertEqual({'subnets': []}, res)
+        self.assertEqual([], self.requested)
+
+    def test_value_too_long(self):
+        self.assertRaises(exceptions.RequestURITooLong,
+                          self.client.list_in_chunks, 'subnets', 'id',
+                          ['x' * self.client.MAX_URI_LEN])
+
+
+class ClientV2WaitForStatusTest(testtools.TestCase):
+    def setUp(self):
+        super(ClientV2WaitForStatusTest, self).setUp()
+        self.client = client.Client(token=TOKEN, endpoint_url=ENDURL)
+        self.now = 0
+        self.sleeps = []
+
+        def fake_sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+        self.useFixture(fixtures.MonkeyPatch('time.time', lambda: self.now))
+        self.useFixture(fixtures.MonkeyPatch('time.sleep', fake_sleep))
+
+    def _poll(self, *polls):
+        polls = list(polls)
+        self.requested = []
+
+        def fake_list_in_chunks(collection, key, values, **params):
+            self.assertEqual(['id', 'status'], params['fields'])
+            self.requested.append(values)
+            statuses = polls.pop(0)
+            return {collection: [{'id': _id, 'status': statuses[_id]}
+                                 for _id in values if _id in statuses]}
+        self.client.list_in_chunks = fake_list_in_chunks
+
+    def test_wait_for_status(self):
+        self._poll({'p1': 'BUILD', 'p2': 'BUILD', 'p3': 'ACTIVE'},
+                   {'p1': 'BUILD', 'p2': 'ERROR'},
+                   {'p1': 'ACTIVE'})
+        statuses = self.client.wait_for_status('port', ['p1', 'p2', 'p3'],
+                                               interval=1)
+        self.assertEqual({'p1': 'ACTIVE', 'p2': 'ERROR', 'p3': 'ACTIVE'},
+                         statuses)
+        # A single request per poll for the resources still pending
+        self.assertEqual([['p1', 'p2', 'p3'], ['p1', 'p2'], ['p1']],
+                         self.requested)
+        # Exponential backoff with jitter
+        self.assertTrue(0.5 <= self.sleeps[0] <= 1)
+        self.assertTrue(1 <= self.sleeps[1] <= 2)
+
+    def test_wait_for_statuses(self):
+        self._poll({'p1': 'BUILD', 'p2': 'DOWN'}, {'p1': 'ACTIVE'})
+        self.assertEqual({'p1': 'ACTIVE', 'p2': 'DOWN'},
+                         self.client.wait_for_status(
+                             'port', ['p1', 'p2'], target=('ACTIVE', 'DOWN')))
+
+    def test_deleted(self):
+        self._poll({})
+        self.assertEqual({'p1': None},
+                         self.client.wait_for_status('port', ['p1']))
+
+    def test_timeout(self):
+        self._poll(*[{'p1': 'BUILD'}] * 10)
+        self.assertRaises(exceptions.WaitTimeout,
+                          self.client.wait_for_status, 'port', ['p1'],
+                          timeout=20, max_interval=4)
+        self.assertEqual(20, self.now)
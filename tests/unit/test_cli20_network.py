@@ -15,6 +15,7 @@
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
 import sys
+import threading
 
 import mox
 
@@ -115,11 +116,12 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
         reses = {resources: []}
         resstr = self.client.serialize(reses)
         # url method body
-        query = "id=myfakeid"
+        query = "fields=id&id=myfakeid"
         args = ['-c', 'id', '--', '--id', 'myfakeid']
         path = getattr(self.client, resources + "_path")
         self.client.httpclient.request(
-            test_cli20.end_url(path, query), 'GET',
+            test_cli20.MyUrlComparator(test_cli20.end_url(path, query),
+                                       self.client), 'GET',
             body=None,
             headers=mox.ContainsKeyValue(
                 'X-Auth-Token',
@@ -212,7 +214,8 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
         self.mox.StubOutWithMock(cmd, 'get_client')
         self.mox.StubOutWithMock(self.client.httpclient, 'request')
         cmd.get_client().AndReturn(self.client)
-        setup_list_stub('networks', data, '')
+        setup_list_stub('networks', data,
+                        'fields=id&fields=name&fields=subnets')
         cmd.get_client().AndReturn(self.client)
         filters = ''
         for n in data:
@@ -256,6 +259,39 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
                     ('netid2', 'net2', 'mysubid4 ')]
         self._test_list_nets_extend_subnets(data, expected)
 
+    def test_list_nets_fetch_subnets_while_paginating(self):
+        pages = [[{'id': 'netid1', 'name': 'net1', 'subnets': ['subid1']},
+                  {'id': 'netid2', 'name': 'net2', 'subnets': ['subid2']}],
+                 [{'id': 'netid3', 'name': 'net3', 'subnets': ['subid3']}]]
+        fetched = threading.Event()
+        fetched_before_page2 = []
+
+        def list_networks(retrieve_all=True, **params):
+            self.assertFalse(retrieve_all)
+            for i, page in enumerate(pages):
+                if i:
+                    # The subnets of the 1st page are fetched concurrently
+                    fetched_before_page2.append(fetched.wait(5) or False)
+                yield {'networks': page}
+
+        def list_in_chunks(collection, key, values, **params):
+            fetched.set()
+            return {'subnets': [{'id': _id, 'cidr': '10.0.0.0/24'}
+                                for _id in values]}
+
+        self.client.list_networks = list_networks
+        self.client.list_in_chunks = list_in_chunks
+        cmd = network.ListNetwork(test_cli20.MyApp(sys.stdout), None)
+        cmd.get_client = lambda: self.client
+        # Pages of the size chosen by the server
+        parsed_args = cmd.get_parser('list_networks').parse_args([])
+        columns, data = cmd.get_data(parsed_args)
+        self.assertEqual([True], fetched_before_page2)
+        self.assertEqual([('netid1', 'net1', 'subid1 10.0.0.0/24'),
+                          ('netid2', 'net2', 'subid2 10.0.0.0/24'),
+                          ('netid3', 'net3', 'subid3 10.0.0.0/24')],
+                         list(data))
+
     def test_list_nets_fields(self):
         """List nets: --fields a --fields b -- --fields c d."""
         cmd = network.ListNetwork(test_cli20.MyApp(sys.stdout), None)
@@ -309,11 +345,12 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
         reses = {resources: []}
         resstr = self.client.serialize(reses)
         # url method body
-        query = "router%3Aexternal=True&id=myfakeid"
+        query = "router%3Aexternal=True&fields=id&id=myfakeid"
         args = ['-c', 'id', '--', '--id', 'myfakeid']
         path = getattr(self.client, resources + "_path")
         self.client.httpclient.request(
-            test_cli20.end_url(path, query), 'GET',
+            test_cli20.MyUrlComparator(test_cli20.end_url(path, query),
+                                       self.client), 'GET',
             body=None,
             headers=mox.ContainsKeyValue(
                 'X-Auth-Token',
@@ -359,6 +396,9 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
             for field in fields_2:
                 args.append(field)
         fields_1.extend(fields_2)
+        if not fields_1 and not detail:
+            # Only the columns displayed are requested by default
+            fields_1 = list(cmd.list_columns)
         for field in fields_1:
             if query:
                 query += "&fields=" + field
@@ -378,7 +418,8 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
         path = getattr(self.client, resources + "_path")
 
         self.client.httpclient.request(
-            test_cli20.end_url(path, query), 'GET',
+            test_cli20.MyUrlComparator(test_cli20.end_url(path, query),
+                                       self.client), 'GET',
             body=None,
             headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
         ).AndReturn((test_cli20.MyResp(200), resstr))
@@ -470,6 +511,8 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
         self.mox.StubOutWithMock(self.client.httpclient, "request")
         path = getattr(self.client, 'subnets_path')
         cmd = network.ListNetwork(test_cli20.MyApp(sys.stdout), None)
+        # mox expects the requests in order
+        cmd.max_workers = 1
         self.mox.StubOutWithMock(cmd, "get_client")
         cmd.get_client().MultipleTimes().AndReturn(self.client)
         mox_calls(path, data)
@@ -511,13 +554,12 @@ class CLITestV20NetworkJSON(test_cli20.CLITestV20Base):
             filters, response = self._build_test_data(data)
 
             # 1 char of extra URI len will cause a split in 2 requests
-            self.mox.StubOutWithMock(self.client, "_check_uri_length")
-            self.client._check_uri_length(mox.IgnoreArg()).AndRaise(
-                exceptions.RequestURITooLong(excess=1))
+            url = test_cli20.end_url(path, 'fields=id&fields=cidr' + filters,
+                                     format=self.format)
+            self.client.MAX_URI_LEN = len(url) - 1
 
             for data in sub_data_lists:
                 filters, response = self._build_test_data(data)
-                self.client._check_uri_length(mox.IgnoreArg()).AndReturn(None)
                 self.client.httpclient.request(
                     test_cli20.end_url(path,
                                        'fields=id&fields=cidr%s' % filters),
@@ -15,10 +15,22 @@
 #
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
+import json
+import logging
+import os
 import sys
+import threading
 
+import fixtures
 import mox
-
+import testtools
+try:
+    import yaml
+except ImportError:
+    # Only needed to read YAML files
+    yaml = None
+
+from neutronclient.common import exceptions
 from neutronclient.neutron.v2_0 import port
 from neutronclient import shell
 from tests.unit import test_cli20
@@ -42,6 +54,46 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
         self._test_create_resource(resource, cmd, name, myid, args,
                                    position_names, position_values)
 
+    def test_create_port_wait(self):
+        """Create port: --wait netid."""
+        resource = 'port'
+        cmd = port.CreatePort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(self.client, 'wait_for_status')
+        self.client.wait_for_status(
+            'port', ['myid'], target=('ACTIVE', 'DOWN'),
+            timeout=300).AndReturn({'myid': 'ACTIVE'})
+        self._test_create_resource(resource, cmd, 'myname', 'myid',
+                                   ['--wait', 'netid'], ['network_id'],
+                                   ['netid'])
+        self.assertTrue('ACTIVE' in self.fake_stdout.make_string())
+
+    def test_create_port_wait_unbound(self):
+        """Create port: --wait netid, the port staying DOWN."""
+        resource = 'port'
+        cmd = port.CreatePort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(self.client, 'wait_for_status')
+        self.client.wait_for_status(
+            'port', ['myid'], target=('ACTIVE', 'DOWN'),
+            timeout=300).AndReturn({'myid': 'DOWN'})
+        self._test_create_resource(resource, cmd, 'myname', 'myid',
+                                   ['--wait', 'netid'], ['network_id'],
+                                   ['netid'])
+        self.assertTrue('DOWN' in self.fake_stdout.make_string())
+
+    def test_create_port_wait_error(self):
+        """Create port: --wait --wait-timeout 60 netid."""
+        resource = 'port'
+        cmd = port.CreatePort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(self.client, 'wait_for_status')
+        self.client.wait_for_status(
+            'port', ['myid'], target=('ACTIVE', 'DOWN'),
+            timeout=60).AndReturn({'myid': 'ERROR'})
+        self.assertRaises(exceptions.CommandError,
+                          self._test_create_resource, resource, cmd,
+                          'myname', 'myid',
+                          ['--wait', '--wait-timeout', '60', 'netid'],
+                          ['network_id'], ['netid'])
+
     def test_create_port_full(self):
         """Create port: --mac_address mac --device_id deviceid netid."""
         resource = 'port'
@@ -168,6 +220,30 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
         cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
         self._test_list_resources(resources, cmd, detail=True, tags=['a', 'b'])
 
+    def test_list_ports_columns(self):
+        """List ports: -c id -c mac_address."""
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        returned_body = {'ports': [{'id': 'myid1',
+                                    'mac_address': 'fa:16:3e:00:00:01'}]}
+        self._test_list_columns(cmd, 'ports', returned_body,
+                                args=['-c', 'id', '-c', 'mac_address'])
+        self.assertTrue('fa:16:3e:00:00:01' in
+                        self.fake_stdout.make_string())
+
+    def test_list_fields(self):
+        cmd = port.ListPort(test_cli20.MyApp(sys.stdout), None)
+        cmd_parser = cmd.get_parser('list_ports')
+        parsed_args = cmd_parser.parse_args([])
+        self.assertEqual(['id', 'name', 'mac_address', 'fixed_ips'],
+                         cmd.list_fields(parsed_args))
+        parsed_args = cmd_parser.parse_args(['-c', 'fixed_ips', '-c', 'id',
+                                             '-c', 'id'])
+        self.assertEqual(['fixed_ips', 'id'], cmd.list_fields(parsed_args))
+        parsed_args = cmd_parser.parse_args(['-c', 'id', '-F', 'name'])
+        self.assertEqual(['name'], cmd.list_fields(parsed_args))
+        parsed_args = cmd_parser.parse_args(['-D'])
+        self.assertEqual([], cmd.list_fields(parsed_args))
+
     def test_list_ports_fields(self):
         """List ports: --fields a --fields b -- --fields c d."""
         resources = "ports"
@@ -207,6 +283,9 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
             for field in fields_2:
                 args.append(field)
         fields_1.extend(fields_2)
+        if not fields_1 and not detail:
+            # Only the columns displayed are requested by default
+            fields_1 = list(cmd.list_columns)
         for field in fields_1:
             if query:
                 query += "&fields=" + field
@@ -223,7 +302,8 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
         query = query and query + '&device_id=%s' or 'device_id=%s'
         path = getattr(self.client, resources + "_path")
         self.client.httpclient.request(
-            test_cli20.end_url(path, query % myid), 'GET',
+            test_cli20.MyUrlComparator(test_cli20.end_url(path, query % myid),
+                                       self.client), 'GET',
             body=None,
             headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
         ).AndReturn((test_cli20.MyResp(200), resstr))
@@ -299,6 +379,194 @@ class CLITestV20PortJSON(test_cli20.CLITestV20Base):
         args = [myid]
         self._test_delete_resource(resource, cmd, myid, args)
 
+    def _test_bulk_create_port(self, content, ports, extra_args=[],
+                               fail_last=False):
+        cmd = port.BulkCreatePort(test_cli20.MyApp(sys.stdout), None)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'ports')
+        with open(path, 'w') as f:
+            f.write(content)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        self.client.format = self.format
+        for i in xrange(0, len(ports), 2):
+            chunk = ports[i:i + 2]
+            created = [dict(p, id='myid%d' % (i + n))
+                       for n, p in enumerate(chunk)]
+            if fail_last and i + 2 >= len(ports):
+                response = (test_cli20.MyResp(409), 'conflict')
+            else:
+                response = (test_cli20.MyResp(201),
+                            self.client.serialize({'ports': created}))
+            self.client.httpclient.request(
+                test_cli20.end_url(self.client.ports_path,
+                                   format=self.format), 'POST',
+                body=test_cli20.MyComparator({'ports': chunk}, self.client),
+                headers=mox.ContainsKeyValue(
+                    'X-Auth-Token', test_cli20.TOKEN)).AndReturn(response)
+        self.mox.ReplayAll()
+        cmd_parser = cmd.get_parser('port_bulk_create')
+        args = ['--chunk-size', '2', '--request-format', self.format, path]
+        try:
+            shell.run_command(cmd, cmd_parser, extra_args + args)
+        finally:
+            self.mox.VerifyAll()
+            self.mox.UnsetStubs()
+        return self.fake_stdout.make_string()
+
+    def test_bulk_create_port(self):
+        """port-bulk-create --chunk-size 2 FILE with 3 ports."""
+        ports = [{'network_id': 'netid', 'name': 'p%d' % i}
+                 for i in range(3)]
+        log = self.useFixture(fixtures.FakeLogger(level=logging.INFO))
+        _str = self._test_bulk_create_port(json.dumps({'ports': ports}),
+                                           ports)
+        self.assertTrue('Created 3 of 3 ports' in log.output)
+        self.assertTrue('myid2' in _str)
+
+    def test_bulk_create_port_csv(self):
+        """port-bulk-create -f csv FILE only writes the CSV rows."""
+        ports = [{'network_id': 'netid', 'name': 'p%d' % i}
+                 for i in range(2)]
+        _str = self._test_bulk_create_port(json.dumps(ports), ports,
+                                           ['-f', 'csv'])
+        self.assertEqual(['"id","name","error"',
+                          '"myid0","p0",""',
+                          '"myid1","p1",""'], _str.splitlines())
+
+    @testtools.skipUnless(yaml, 'PyYAML is not installed')
+    def test_bulk_create_port_yaml_tenant_id(self):
+        """port-bulk-create --tenant-id tenantid FILE in YAML."""
+        ports = [{'network_id': 'netid', 'tenant_id': 'tenantid'},
+                 {'network_id': 'netid2', 'tenant_id': 'other'}]
+        _str = self._test_bulk_create_port(
+            '- network_id: netid\n'
+            '- network_id: netid2\n'
+            '  tenant_id: other\n', ports, ['--tenant-id', 'tenantid'])
+        self.assertTrue('myid1' in _str)
+
+    def test_bulk_create_port_partial_failure(self):
+        """port-bulk-create FILE with the last chunk failing."""
+        ports = [{'network_id': 'netid', 'name': 'p%d' % i}
+                 for i in range(3)]
+        e = self.assertRaises(exceptions.NeutronClientException,
+                              self._test_bulk_create_port,
+                              json.dumps(ports), ports,
+                              fail_last=True)
+        self.assertTrue('Failed to create 1 of 3 ports' in str(e))
+        _str = self.fake_stdout.make_string()
+        self.assertFalse('Created' in _str)
+        self.assertTrue('conflict' in _str)
+
+    def test_bulk_create_port_invalid_file(self):
+        cmd = port.BulkCreatePort(test_cli20.MyApp(sys.stdout), None)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'ports')
+        with open(path, 'w') as f:
+            f.write('{"networks": []}')
+        self.assertRaises(exceptions.CommandError,
+                          cmd.load_resources, path)
+
+    def _test_delete_ports(self):
+        cmd = port.DeletePort(test_cli20.MyApp(sys.stdout), None)
+        self.mox.StubOutWithMock(cmd, "get_client")
+        self.mox.StubOutWithMock(self.client, "list_ports")
+        self.mox.StubOutWithMock(self.client, "list_in_chunks")
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        cmd.get_client().MultipleTimes().AndReturn(self.client)
+        return cmd
+
+    def _expect_delete(self, myid, status=204):
+        path = self.client.port_path % myid
+        self.client.httpclient.request(
+            test_cli20.end_url(path, format=self.format), 'DELETE',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
+        ).AndReturn((test_cli20.MyResp(status), None))
+
+    def _run_delete(self, cmd, args):
+        self.mox.ReplayAll()
+        cmd_parser = cmd.get_parser('delete_port')
+        try:
+            shell.run_command(cmd, cmd_parser,
+                              ['--request-format', self.format] + args)
+        finally:
+            self.mox.VerifyAll()
+            self.mox.UnsetStubs()
+        return self.fake_stdout.make_string()
+
+    def test_delete_ports_by_names_and_ids(self):
+        """Delete port: myuuid myname missing."""
+        cmd = self._test_delete_ports()
+        self.client.list_in_chunks('ports', 'id', [self.test_id],
+                                   fields='id').AndReturn(
+                                       {'ports': [{'id': self.test_id}]})
+        self.client.list_in_chunks(
+            'ports', 'name', ['myname', 'missing'],
+            fields=['id', 'name']).AndReturn(
+                {'ports': [{'id': 'myid', 'name': 'myname'}]})
+        self._expect_delete(self.test_id)
+        self._expect_delete('myid')
+        self.assertRaises(exceptions.NeutronClientException,
+                          self._run_delete, cmd,
+                          [self.test_id, 'myname', 'missing',
+                           '--parallel', '1'])
+        _str = self.fake_stdout.make_string()
+        self.assertTrue('Deleted port: myname' in _str)
+        self.assertTrue('Unable to delete port: missing' in _str)
+        self.assertTrue('Deleted 2 of 3 ports' in _str)
+
+    def test_delete_ports_by_tenant(self):
+        """Delete port: --tenant-id mytenant -- --device_owner owner."""
+        cmd = self._test_delete_ports()
+        ports = [{'id': 'myid%d' % i, 'tenant_id': 'mytenant',
+                  'device_owner': 'owner'} for i in range(20)]
+        self.client.list_ports(fields=['id', 'device_owner', 'tenant_id'],
+                               tenant_id='mytenant',
+                               device_owner='owner').AndReturn(
+                                   {'ports': ports})
+        deleted = []
+        lock = threading.Lock()
+
+        def delete_port(port_id):
+            with lock:
+                deleted.append(port_id)
+        # DELETE requests are sent from several threads
+        self.client.delete_port = delete_port
+        _str = self._run_delete(cmd, ['--tenant-id', 'mytenant', '--all',
+                                      '--', '--device_owner', 'owner'])
+        self.assertEqual(sorted(p['id'] for p in ports), sorted(deleted))
+        self.assertTrue('Deleted 20 of 20 ports' in _str)
+
+    def test_delete_ports_by_tenant_not_confirmed(self):
+        """Delete port: --tenant-id mytenant."""
+        cmd = self._test_delete_ports()
+        self.client.list_ports(fields=['id', 'tenant_id'],
+                               tenant_id='mytenant').AndReturn(
+                                   {'ports': [{'id': 'myid1',
+                                               'tenant_id': 'mytenant'}]})
+        e = self.assertRaises(exceptions.CommandError, self._run_delete,
+                              cmd, ['--tenant-id', 'mytenant'])
+        self.assertTrue('use --all' in unicode(e))
+        self.assertTrue('Matching port: myid1' in
+                        self.fake_stdout.make_string())
+
+    def test_delete_ports_unknown_filter(self):
+        """Delete port: --all -- --nmae foo."""
+        cmd = self._test_delete_ports()
+        self.client.list_ports(fields=['id', 'nmae'], nmae='foo').AndReturn(
+            {'ports': [{'id': 'myid1'}, {'id': 'myid2'}]})
+        e = self.assertRaises(exceptions.CommandError, self._run_delete,
+                              cmd, ['--all', '--', '--nmae', 'foo'])
+        self.assertTrue('nmae' in unicode(e))
+
+    def test_delete_ports_requires_target(self):
+        """Delete port: without ports nor filters."""
+        cmd = self._test_delete_ports()
+        self.assertRaises(exceptions.CommandError,
+                          self._run_delete, cmd, [])
+
 
 class CLITestV20PortXML(CLITestV20PortJSON):
     format = 'xml'
@@ -264,9 +264,12 @@ class CLITestV20SecurityGroupsJSON(test_cli20.CLITestV20Base):
         self.mox.StubOutWithMock(cmd, 'get_client')
         self.mox.StubOutWithMock(self.client.httpclient, 'request')
         cmd.get_client().AndReturn(self.client)
-        query = ''
-        if query_field:
-            query = '&'.join(['fields=' + f for f in data['cols']])
+        # Only the columns displayed are requested unless -F is used
+        if query_field or '-c' in args:
+            fields = data['cols']
+        else:
+            fields = cmd.list_columns
+        query = '&'.join(['fields=' + f for f in fields])
         setup_list_stub('security_group_rules', list_data, query)
         if conv:
             cmd.get_client().AndReturn(self.client)
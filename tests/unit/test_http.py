@@ -14,11 +14,19 @@
 #    under the License.
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
+import socket
+import threading
+import time
+
+import fixtures
 import httplib2
 import mox
 import testtools
 
+from neutronclient.client import ConnectionPool
 from neutronclient.client import HTTPClient
+from neutronclient.client import path_template
+from neutronclient.common import cache
 from neutronclient.common import exceptions
 from tests.unit.test_cli20 import MyResp
 
@@ -62,3 +70,281 @@ class TestHTTPClient(testtools.TestCase):
 
         self.assertEqual(rv_should_be, self.http._cs_request(URL, METHOD))
         self.mox.VerifyAll()
+
+    def test_request_error_discards_connections(self):
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndRaise(Exception('error msg'))
+        self.mox.ReplayAll()
+
+        self.assertRaises(exceptions.ConnectionFailed,
+                          self.http._cs_request, URL, METHOD)
+        pooled = self.http.connection_pool.get()
+        self.assertEqual({}, pooled.connections)
+        self.mox.VerifyAll()
+
+    def test_follow_all_redirects_per_request(self):
+        followed = []
+
+        def fake_request(self, *args, **kwargs):
+            followed.append(self.follow_all_redirects)
+            return MyResp(200), 'test content'
+
+        self.useFixture(fixtures.MonkeyPatch(
+            'httplib2.Http.request', fake_request))
+        self.http._cs_request(URL, 'POST', follow_all_redirects=True)
+        self.http._cs_request(URL, METHOD)
+        self.assertEqual([True, False], followed)
+        self.assertFalse(self.http.follow_all_redirects)
+
+    def test_request_hook(self):
+        events = []
+        self.http.add_request_hook(events.append)
+        httplib2.Http.request(
+            URL + '.json', 'PUT', headers=mox.IgnoreArg(), body='{"a": 1}'
+        ).AndReturn((MyResp(200), 'test content'))
+        self.mox.ReplayAll()
+
+        self.http._cs_request(URL + '.json', 'PUT', body='{"a": 1}',
+                              retries=2)
+        self.mox.VerifyAll()
+        self.assertEqual(1, len(events))
+        event = events[0]
+        self.assertEqual('PUT', event.method)
+        self.assertEqual('/v2.0/test.json', event.path)
+        self.assertEqual(200, event.status)
+        self.assertEqual(8, event.bytes_sent)
+        self.assertEqual(12, event.bytes_received)
+        self.assertEqual(2, event.retries)
+        self.assertEqual(0, event.auth_refreshes)
+        self.assertTrue(event.total_time >= 0)
+        self.assertIsNone(event.error)
+
+    def test_request_hook_error(self):
+        events = []
+        self.http.add_request_hook(events.append)
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndRaise(socket.error('error msg'))
+        self.mox.ReplayAll()
+
+        self.assertRaises(exceptions.ConnectionFailed,
+                          self.http._cs_request, URL, METHOD)
+        self.mox.VerifyAll()
+        self.assertIsNone(events[0].status)
+        self.assertIsInstance(events[0].error, socket.error)
+
+    def test_request_hook_auth_refresh(self):
+        events = []
+        self.http = HTTPClient(token=AUTH_TOKEN,
+                               endpoint_url='http://test.test:1234',
+                               request_hooks=[events.append])
+        self.mox.StubOutWithMock(self.http, 'authenticate')
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndReturn((MyResp(401), ''))
+        self.http.authenticate()
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndReturn((MyResp(200), ''))
+        self.mox.ReplayAll()
+
+        self.http.do_request('/v2.0/test', METHOD)
+        self.mox.VerifyAll()
+        self.assertEqual([401, 200], [e.status for e in events])
+        self.assertEqual([0, 1], [e.auth_refreshes for e in events])
+
+    def test_failing_request_hook(self):
+        def hook(event):
+            raise Exception('hook failed')
+
+        self.http.add_request_hook(hook)
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndReturn((MyResp(200), 'test content'))
+        self.mox.ReplayAll()
+
+        self.assertEqual('test content',
+                         self.http._cs_request(URL, METHOD)[1])
+        self.mox.VerifyAll()
+
+    def test_removed_request_hook(self):
+        events = []
+        self.http.add_request_hook(events.append)
+        self.http.remove_request_hook(events.append)
+        httplib2.Http.request(
+            URL, METHOD, headers=mox.IgnoreArg()
+        ).AndReturn((MyResp(200), 'test content'))
+        self.mox.ReplayAll()
+
+        self.http._cs_request(URL, METHOD)
+        self.mox.VerifyAll()
+        self.assertEqual([], events)
+        # Without hooks httplib2 opens its own connections
+        pooled = self.http.connection_pool.get()
+        self.assertEqual({}, pooled.connections)
+
+    def test_path_template(self):
+        self.assertEqual(
+            '/v2.0/ports/{id}.json',
+            path_template('http://host:9696/v2.0/ports/'
+                          '6f5a37e2-2fbb-4c3b-8fd1-5ae3e4c32d4e.json'
+                          '?fields=id'))
+        self.assertEqual(
+            '/v2.0/quotas/{id}',
+            path_template('/v2.0/quotas/0123456789abcdef0123456789ABCDEF'))
+        self.assertEqual('/v2.0/ports.json',
+                         path_template('/v2.0/ports.json?name=port1'))
+
+
+class TestHTTPClientResponseCache(testtools.TestCase):
+    def setUp(self):
+        super(TestHTTPClientResponseCache, self).setUp()
+
+        self.mox = mox.Mox()
+        self.mox.StubOutWithMock(httplib2.Http, 'request')
+        self.addCleanup(self.mox.UnsetStubs)
+
+        self.http = HTTPClient(token=AUTH_TOKEN, endpoint_url=END_URL,
+                               response_cache=cache.ResponseCache(ttl=60))
+
+    def _expect(self, url, method, status, headers=None, conditional=False,
+                **kwargs):
+        if conditional:
+            request_headers = mox.ContainsKeyValue('If-None-Match', '"v1"')
+        else:
+            request_headers = mox.Func(
+                lambda headers: 'If-None-Match' not in headers)
+        resp = httplib2.Response(dict(headers or {}, status=status))
+        httplib2.Http.request(
+            END_URL + url, method, headers=request_headers, **kwargs
+        ).AndReturn((resp, 'body %s' % method))
+
+    def test_fresh_response_reused(self):
+        self._expect('/v2.0/ports/1.json', 'GET', 200)
+        self.mox.ReplayAll()
+
+        for i in range(2):
+            resp, body = self.http.do_request('/v2.0/ports/1.json', 'GET')
+            self.assertEqual(200, resp.status)
+            self.assertEqual('body GET', body)
+        self.mox.VerifyAll()
+
+    def test_stale_response_revalidated(self):
+        self._expect('/v2.0/ports/1.json', 'GET', 200,
+                     {'etag': '"v1"', 'cache-control': 'no-cache'})
+        self._expect('/v2.0/ports/1.json', 'GET', 304,
+                     {'etag': '"v1"', 'cache-control': 'no-cache'},
+                     conditional=True)
+        self.mox.ReplayAll()
+
+        self.http.do_request('/v2.0/ports/1.json', 'GET')
+        resp, body = self.http.do_request('/v2.0/ports/1.json', 'GET')
+        self.assertEqual(200, resp.status)
+        self.assertEqual('body GET', body)
+        self.mox.VerifyAll()
+
+    def test_no_store(self):
+        self._expect('/v2.0/ports.json', 'GET', 200,
+                     {'cache-control': 'no-store', 'etag': '"v1"'})
+        self._expect('/v2.0/ports.json', 'GET', 200)
+        self.mox.ReplayAll()
+
+        self.http.do_request('/v2.0/ports.json', 'GET')
+        self.http.do_request('/v2.0/ports.json', 'GET')
+        self.mox.VerifyAll()
+
+    def test_write_invalidates_cache(self):
+        self._expect('/v2.0/ports.json?name=a', 'GET', 200)
+        self._expect('/v2.0/networks.json', 'GET', 200)
+        self._expect('/v2.0/ports/1.json', 'PUT', 200, body='{}')
+        self._expect('/v2.0/ports.json?name=a', 'GET', 200)
+        self._expect('/v2.0/networks.json', 'GET', 200)
+        self.mox.ReplayAll()
+
+        self.http.do_request('/v2.0/ports.json?name=a', 'GET')
+        self.http.do_request('/v2.0/networks.json', 'GET')
+        self.http.do_request('/v2.0/ports/1.json', 'PUT', body='{}')
+        self.http.do_request('/v2.0/ports.json?name=a', 'GET')
+        self.http.do_request('/v2.0/networks.json', 'GET')
+        self.mox.VerifyAll()
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.sock = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHttp(object):
+    def __init__(self):
+        self.connections = {}
+
+
+class TestConnectionPool(testtools.TestCase):
+    def test_reuse_idle_object(self):
+        pool = ConnectionPool(FakeHttp, max_size=2)
+        http = pool.get()
+        pool.put(http)
+        self.assertTrue(http is pool.get())
+
+    def test_max_size(self):
+        pool = ConnectionPool(FakeHttp, max_size=1, timeout=0.01)
+        http = pool.get()
+        self.assertRaises(exceptions.ConnectionFailed, pool.get)
+        pool.put(http)
+        self.assertTrue(http is pool.get())
+
+    def test_idle_timeout_closes_connections(self):
+        pool = ConnectionPool(FakeHttp, max_size=1, idle_timeout=0)
+        http = pool.get()
+        conn = FakeConnection()
+        http.connections['http:test.test'] = conn
+        pool.put(http)
+        time.sleep(0.01)
+        self.assertTrue(http is pool.get())
+        self.assertTrue(conn.closed)
+        self.assertEqual({}, http.connections)
+
+    def test_dropped_connection_closed_on_checkout(self):
+        pool = ConnectionPool(FakeHttp, max_size=1)
+        http = pool.get()
+        conn = FakeConnection()
+        server, conn.sock = socket.socketpair()
+        self.addCleanup(conn.sock.close)
+        http.connections['http:test.test'] = conn
+        pool.put(http)
+        # Still open: the connection is reused
+        self.assertTrue(http is pool.get())
+        self.assertFalse(conn.closed)
+        server.close()
+        pool.put(http)
+        self.assertTrue(http is pool.get())
+        self.assertTrue(conn.closed)
+
+    def test_threads_share_client(self):
+        http_client = HTTPClient(token=AUTH_TOKEN, endpoint_url=END_URL,
+                                 connection_pool_size=2)
+        used = []
+        lock = threading.Lock()
+
+        def fake_request(self, *args, **kwargs):
+            with lock:
+                used.append(self)
+            time.sleep(0.01)
+            return MyResp(200), 'test content'
+
+        self.useFixture(fixtures.MonkeyPatch(
+            'httplib2.Http.request', fake_request))
+        threads = [threading.Thread(target=http_client._cs_request,
+                                    args=(URL, METHOD))
+                   for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(6, len(used))
+        self.assertTrue(len(set(used)) <= 2)
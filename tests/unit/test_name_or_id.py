@@ -23,6 +23,8 @@ import testtools
 from neutronclient.common import exceptions
 from neutronclient.neutron import v2_0 as neutronV20
 from neutronclient.v2_0 import client
+from tests.benchmark import dataset
+from tests.benchmark import fake_server
 from tests.unit import test_cli20
 
 
@@ -130,3 +132,138 @@ class CLITestNameorID(testtools.TestCase):
         except exceptions.NeutronClientException as ex:
             self.assertTrue('Unable to find' in ex.message)
             self.assertEqual(404, ex.status_code)
+
+    def _cache_resource_ids(self):
+        self.client = client.Client(token=test_cli20.TOKEN,
+                                    endpoint_url=self.endurl,
+                                    resource_id_cache_size=10)
+
+    def test_get_id_from_name_cached(self):
+        self._cache_resource_ids()
+        name = 'myname'
+        _id = str(uuid.uuid4())
+        resstr = self.client.serialize({'networks': [{'id': _id}]})
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        path = getattr(self.client, "networks_path")
+        self.client.httpclient.request(
+            test_cli20.end_url(path, "fields=id&name=" + name), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
+        ).AndReturn((test_cli20.MyResp(200), resstr))
+        self.client.httpclient.request(
+            test_cli20.end_url(self.client.network_path % _id), 'DELETE',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
+        ).AndReturn((test_cli20.MyResp(204), None))
+        self.client.httpclient.request(
+            test_cli20.end_url(path, "fields=id&name=" + name), 'GET',
+            body=None,
+            headers=mox.ContainsKeyValue('X-Auth-Token', test_cli20.TOKEN)
+        ).AndReturn((test_cli20.MyResp(200), resstr))
+        self.mox.ReplayAll()
+        for i in range(2):
+            self.assertEqual(_id, neutronV20.find_resourceid_by_name_or_id(
+                self.client, 'network', name))
+        # Deleting the network through the client invalidates its name
+        self.client.delete_network(_id)
+        self.assertEqual(_id, neutronV20.find_resourceid_by_name_or_id(
+            self.client, 'network', name))
+
+    def test_get_id_from_id_trusted(self):
+        _id = str(uuid.uuid4())
+        self.client.trust_ids = True
+        self.mox.StubOutWithMock(self.client.httpclient, "request")
+        self.mox.ReplayAll()
+        self.assertEqual(_id, neutronV20.find_resourceid_by_name_or_id(
+            self.client, 'network', _id))
+
+    def test_get_id_from_name_like_id_trusted(self):
+        _id = str(uuid.uuid4())
+        name = _id + '-backup'
+        self.client.trust_ids = True
+        self.mox.StubOutWithMock(self.client, "list_networks")
+        self.client.list_networks(name=name, fields='id').AndReturn(
+            {'networks': [{'id': _id}]})
+        self.mox.StubOutWithMock(self.client, "list_in_chunks")
+        self.client.list_in_chunks('networks', 'name', [name],
+                                   fields=['id', 'name']).AndReturn(
+                                       {'networks': [{'id': _id,
+                                                      'name': name}]})
+        self.mox.ReplayAll()
+        self.assertEqual(_id, neutronV20.find_resourceid_by_name_or_id(
+            self.client, 'network', name))
+        self.assertEqual({name: _id},
+                         neutronV20.find_resourceids_by_names_or_ids(
+                             self.client, 'network', [name]))
+
+    def test_invalidate_resource_ids(self):
+        self._cache_resource_ids()
+        self.client.resource_id_cache.set(('network', 'net1'), 'id1')
+        self.client.resource_id_cache.set(('network', 'net2'), 'id2')
+        # Not a resource whose ID merely contains id1
+        self.client._invalidate_resource_ids('/networks/id10')
+        self.assertEqual('id1', self.client.resource_id_cache.get(
+            ('network', 'net1')))
+        self.client._invalidate_resource_ids('/networks/id1')
+        self.assertIsNone(self.client.resource_id_cache.get(
+            ('network', 'net1')))
+        self.assertEqual('id2', self.client.resource_id_cache.get(
+            ('network', 'net2')))
+
+    def test_resource_ids_not_cached_by_default(self):
+        self.assertEqual(0, self.client.resource_id_cache.max_size)
+
+    def test_get_ids_from_names_or_ids(self):
+        self._cache_resource_ids()
+        _id1 = str(uuid.uuid4())
+        _id2 = str(uuid.uuid4())
+        self.mox.StubOutWithMock(self.client, "list_in_chunks")
+        networks = [{'id': 'id1', 'name': 'name1'},
+                    {'id': 'id2', 'name': 'name2'},
+                    {'id': 'id3', 'name': 'name2'}]
+        self.client.list_in_chunks('networks', 'id', [_id1, _id2],
+                                   fields='id').AndReturn(
+                                       {'networks': [{'id': _id1}]})
+        self.client.list_in_chunks('networks', 'name',
+                                   [_id2, 'name1', 'name2'],
+                                   fields=['id', 'name']).AndReturn(
+                                       {'networks': networks})
+        self.mox.ReplayAll()
+        ids = neutronV20.find_resourceids_by_names_or_ids(
+            self.client, 'network', [_id1, _id2, 'name1', 'name2', _id1])
+        self.assertEqual(_id1, ids[_id1])
+        self.assertEqual('id1', ids['name1'])
+        self.assertEqual(404, ids[_id2].status_code)
+        self.assertTrue('Multiple' in ids['name2'].message)
+        # Resolved names and IDs are cached
+        self.assertEqual({_id1: _id1, 'name1': 'id1'},
+                         neutronV20.find_resourceids_by_names_or_ids(
+                             self.client, 'network', [_id1, 'name1']))
+
+    def test_get_ids_from_ids_other_case(self):
+        _id = str(uuid.uuid4())
+        self.mox.StubOutWithMock(self.client, "list_in_chunks")
+        self.client.list_in_chunks('networks', 'id', [_id.upper()],
+                                   fields='id').AndReturn(
+                                       {'networks': [{'id': _id}]})
+        self.mox.ReplayAll()
+        self.assertEqual({_id.upper(): _id},
+                         neutronV20.find_resourceids_by_names_or_ids(
+                             self.client, 'network', [_id.upper()]))
+
+    def test_get_many_ids_from_names_or_ids(self):
+        data = dataset.generate(networks=500, ports=0, rules=0)
+        server = fake_server.FakeNeutronServer(data).start()
+        self.addCleanup(server.stop)
+        neutron_client = client.Client(token=test_cli20.TOKEN,
+                                       endpoint_url=server.endpoint)
+        self.addCleanup(neutron_client.httpclient.connection_pool.close)
+        refs = [network['id'] for network in data['networks']]
+        refs += [network['name'] for network in data['networks']]
+        ids = neutronV20.find_resourceids_by_names_or_ids(
+            neutron_client, 'network', refs)
+        for network in data['networks']:
+            self.assertEqual(network['id'], ids[network['id']])
+            self.assertEqual(network['id'], ids[network['name']])
+        # Too many for a request by ID and another by name
+        self.assertTrue(server.app.requests > 2)
@@ -0,0 +1,132 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import os
+import pstats
+import StringIO
+import threading
+
+import fixtures
+import testtools
+
+from neutronclient.client import RequestEvent
+from neutronclient.common import profiler
+from neutronclient import shell
+from tests.unit import test_async_client
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProfilerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ProfilerTest, self).setUp()
+        self.clock = FakeClock()
+        self.useFixture(fixtures.MonkeyPatch('time.time', self.clock))
+        self.addCleanup(profiler.stop)
+
+    def test_no_profiler(self):
+        with profiler.phase('imports'):
+            pass
+        self.assertIsNone(profiler.stop())
+
+    def test_nested_phases(self):
+        prof = profiler.start()
+        with profiler.phase('API calls'):
+            self.clock.now += 1
+            with profiler.phase('name lookups'):
+                self.clock.now += 2
+            self.clock.now += 3
+        self.clock.now += 4
+        self.assertIs(prof, profiler.stop())
+        self.assertEqual(4, prof.times['API calls'])
+        self.assertEqual(2, prof.times['name lookups'])
+        self.assertEqual(10, prof.elapsed)
+
+    def test_iterate(self):
+        def pages():
+            for page in range(3):
+                self.clock.now += 2
+                yield page
+
+        self.assertEqual([0, 1], list(profiler.iterate('API calls',
+                                                       [0, 1])))
+        prof = profiler.start()
+        with profiler.phase('formatting'):
+            for page in profiler.iterate('API calls', pages()):
+                self.clock.now += 1
+        profiler.stop()
+        self.assertEqual(6, prof.times['API calls'])
+        self.assertEqual(3, prof.times['formatting'])
+
+    def test_report(self):
+        prof = profiler.start()
+        with profiler.phase('formatting'):
+            self.clock.now += 1
+        prof.add_request(RequestEvent('GET', '/v2.0/ports.json',
+                                      total_time=0.25))
+        prof.add_request(RequestEvent('GET', '/v2.0/ports.json',
+                                      total_time=0.5))
+        self.clock.now += 1
+        profiler.stop()
+        output = StringIO.StringIO()
+        prof.report(output)
+        lines = output.getvalue().splitlines()
+        self.assertIn('formatting         1.000   50.0%', lines)
+        self.assertIn('other              1.000   50.0%', lines)
+        self.assertIn('total              2.000  100.0%', lines)
+        self.assertIn('2 HTTP requests in 0.750 seconds', lines)
+        self.assertIn('    2    0.750  GET /v2.0/ports.json', lines)
+
+
+class ShellProfileTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ShellProfileTest, self).setUp()
+        self.useFixture(fixtures.MonkeyPatch(
+            'tests.unit.test_async_client.FakeNeutronHandler.delay', 0))
+        server = test_async_client.FakeNeutronServer(
+            ('127.0.0.1', 0), test_async_client.FakeNeutronHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+        self.endpoint = 'http://127.0.0.1:%d' % server.server_address[1]
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout',
+                                             StringIO.StringIO()))
+        self.stderr = StringIO.StringIO()
+        self.useFixture(fixtures.MonkeyPatch('sys.stderr', self.stderr))
+
+    def test_profile(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'neutron.prof')
+        self.assertEqual(0, shell.NeutronShell('2.0').run(
+            ['--os-token', test_async_client.TOKEN, '--os-url',
+             self.endpoint, '--profile-file', path, 'net-show', 'net1']))
+        report = self.stderr.getvalue()
+        for name in profiler.Profiler.PHASES:
+            self.assertIn('\n' + name + ' ', report)
+        self.assertIn('2 HTTP requests in', report)
+        self.assertIn('GET /v2.0/networks/netid1.json', report)
+        self.assertIsNone(profiler._profiler)
+        self.assertTrue(pstats.Stats(path).total_calls > 0)
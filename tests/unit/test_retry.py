@@ -0,0 +1,197 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import json
+
+import fixtures
+import httplib2
+import testtools
+
+from neutronclient.common import exceptions
+from neutronclient.common import retry
+from neutronclient.v2_0 import client
+
+
+TOKEN = 'testtoken'
+ENDURL = 'localurl'
+
+
+class RetryPolicyTest(testtools.TestCase):
+    def setUp(self):
+        super(RetryPolicyTest, self).setUp()
+        self.now = 1000.0
+        self.sleeps = []
+
+        def fake_sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+        self.useFixture(fixtures.MonkeyPatch('time.time', lambda: self.now))
+        self.useFixture(fixtures.MonkeyPatch('time.sleep', fake_sleep))
+
+    def _failing(self, *errors):
+        errors = list(errors)
+        self.headers = []
+
+        def request(headers):
+            self.headers.append(headers)
+            if errors:
+                raise errors.pop(0)
+            return 'ok'
+        return request
+
+    def _error(self, status_code, retry_after=None):
+        error = exceptions.NeutronClientException(status_code=status_code)
+        error.retry_after = retry_after
+        return error
+
+    def test_exponential_backoff_with_jitter(self):
+        policy = retry.RetryPolicy(max_attempts=4, interval=1)
+        request = self._failing(exceptions.ConnectionFailed(reason='reset'),
+                                self._error(503), self._error(502))
+        self.assertEqual('ok', policy.call('GET', request))
+        self.assertEqual(3, len(self.sleeps))
+        for retry_number, delay in enumerate(self.sleeps):
+            self.assertTrue(2 ** retry_number / 2.0 <= delay <=
+                            2 ** retry_number)
+
+    def test_max_attempts(self):
+        policy = retry.RetryPolicy(max_attempts=2)
+        error = self._error(503)
+        request = self._failing(self._error(503), error)
+        raised = self.assertRaises(exceptions.NeutronClientException,
+                                   policy.call, 'GET', request)
+        self.assertTrue(raised is error)
+        self.assertEqual(1, len(self.sleeps))
+
+    def test_max_elapsed(self):
+        policy = retry.RetryPolicy(max_attempts=10, interval=4, jitter=False,
+                                   max_elapsed=10)
+        request = self._failing(*[self._error(503)] * 10)
+        self.assertRaises(exceptions.NeutronClientException,
+                          policy.call, 'GET', request)
+        self.assertEqual([4], self.sleeps)
+
+    def test_status_not_retried(self):
+        policy = retry.RetryPolicy()
+        request = self._failing(self._error(409))
+        self.assertRaises(exceptions.NeutronClientException,
+                          policy.call, 'PUT', request)
+        self.assertEqual([], self.sleeps)
+
+    def test_retry_after(self):
+        policy = retry.RetryPolicy(max_interval=30)
+        request = self._failing(self._error(503, '7'), self._error(503, '90'))
+        policy.call('GET', request)
+        self.assertEqual([7, 30], self.sleeps)
+
+    def test_parse_retry_after_date(self):
+        self.now = 1381140000.0
+        self.assertEqual(
+            30, retry.parse_retry_after('Mon, 07 Oct 2013 10:00:30 GMT'))
+        self.assertEqual(None, retry.parse_retry_after('soon'))
+
+    def test_post_not_retried(self):
+        policy = retry.RetryPolicy()
+        request = self._failing(exceptions.ConnectionFailed(reason='reset'))
+        self.assertRaises(exceptions.ConnectionFailed,
+                          policy.call, 'POST', request)
+        self.assertEqual([{}], self.headers)
+
+    def test_post_retried_with_idempotency_key(self):
+        policy = retry.RetryPolicy(idempotency_header='X-Idempotency-Key')
+        request = self._failing(exceptions.ConnectionFailed(reason='reset'))
+        self.assertEqual('ok', policy.call('POST', request))
+        self.assertEqual(2, len(self.headers))
+        # The same key for all the attempts of a call
+        self.assertEqual(self.headers[0], self.headers[1])
+        key = self.headers[0]['X-Idempotency-Key']
+        request = self._failing()
+        policy.call('POST', request)
+        self.assertNotEqual(key, self.headers[0]['X-Idempotency-Key'])
+
+
+class ClientRetryTest(testtools.TestCase):
+    def setUp(self):
+        super(ClientRetryTest, self).setUp()
+        self.sleeps = []
+        self.useFixture(fixtures.MonkeyPatch('time.sleep',
+                                             self.sleeps.append))
+
+    def _client(self, responses, **kwargs):
+        neutron = client.Client(token=TOKEN, endpoint_url=ENDURL, **kwargs)
+        self.requests = []
+
+        self.urls = []
+
+        def fake_request(url, method, body=None, headers=None):
+            self.requests.append((method, headers))
+            self.urls.append(url)
+            status, body, resp_headers = responses.pop(0)
+            resp = httplib2.Response(dict(resp_headers, status=status))
+            return resp, json.dumps(body)
+        neutron.httpclient.request = fake_request
+        return neutron
+
+    def test_client_policy(self):
+        neutron = self._client(
+            [(503, {'message': 'busy'}, {'retry-after': '2'}),
+             (200, {'networks': []}, {})],
+            retry_policy=retry.RetryPolicy())
+        self.assertEqual({'networks': []}, neutron.list_networks())
+        self.assertEqual([2], self.sleeps)
+
+    def test_client_policy_not_passed_to_http_client(self):
+        http_kwargs = []
+
+        def http_client(**kwargs):
+            http_kwargs.append(kwargs)
+
+        self.useFixture(fixtures.MonkeyPatch(
+            'neutronclient.client.HTTPClient', http_client))
+        policy = retry.RetryPolicy()
+        neutron = client.Client(token=TOKEN, endpoint_url=ENDURL,
+                                retry_policy=policy)
+        self.assertIs(policy, neutron.retry_policy)
+        self.assertFalse('retry_policy' in http_kwargs[0])
+
+    def test_call_policy(self):
+        neutron = self._client(
+            [(503, {'message': 'busy'}, {}), (201, {'network': {}}, {})])
+        policy = retry.RetryPolicy(idempotency_header='X-Idempotency-Key')
+        neutron.post(neutron.networks_path, body={'network': {}},
+                     retry_policy=policy)
+        self.assertEqual(['POST', 'POST'], [r[0] for r in self.requests])
+        self.assertTrue('X-Idempotency-Key' in self.requests[1][1])
+
+    def test_api_call_policy(self):
+        neutron = self._client(
+            [(503, {'message': 'busy'}, {}), (200, {'networks': []}, {}),
+             (503, {'message': 'busy'}, {})])
+        self.assertEqual({'networks': []}, neutron.list_networks(
+            retry_policy=retry.RetryPolicy(interval=0, jitter=False)))
+        # Not sent as a filter
+        self.assertFalse('retry_policy' in self.urls[0])
+        # Nor used by the next calls
+        self.assertRaises(exceptions.NeutronClientException,
+                          neutron.list_networks)
+
+    def test_default_policy(self):
+        neutron = self._client([(503, {'message': 'busy'}, {})])
+        neutron.retries = 2
+        self.assertRaises(exceptions.NeutronClientException,
+                          neutron.list_networks)
+        self.assertEqual([], self.sleeps)
@@ -0,0 +1,109 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import testtools
+
+from neutronclient.common import constants
+from neutronclient.common import exceptions
+from neutronclient.common import serializer
+
+
+PROVIDER_NS = 'http://docs.openstack.org/ext/provider/api/v1.0'
+METADATA = {'plurals': constants.PLURALS,
+            'xmlns': constants.XML_NS_V20,
+            constants.EXT_NS: {'provider': PROVIDER_NS}}
+
+
+class XMLSerializerTest(testtools.TestCase):
+    def setUp(self):
+        super(XMLSerializerTest, self).setUp()
+        self.serializer = serializer.XMLDictSerializer(METADATA)
+        self.deserializer = serializer.XMLDeserializer(METADATA)
+
+    def _round_trip(self, data):
+        return self.deserializer.default(
+            self.serializer.default(dict(data)))['body']
+
+    def test_serialize(self):
+        xml = self.serializer.default(
+            {'network': {'name': u'r\xe9seau <1> & "2"',
+                         'shared': False,
+                         'provider:segmentation_id': 10,
+                         'subnets': [],
+                         'tenant_id': None}})
+        self.assertEqual(
+            "<?xml version='1.0' encoding='UTF-8'?>\n"
+            '<network xmlns="%(ns)s" xmlns:provider="%(provider)s" '
+            'xmlns:quantum="%(ns)s" xmlns:xsi="%(xsi)s">' %
+            {'ns': constants.XML_NS_V20, 'provider': PROVIDER_NS,
+             'xsi': constants.XSI_NAMESPACE},
+            xml[:xml.index('>', 45) + 1])
+        self.assertTrue('<name>r\xc3\xa9seau &lt;1&gt; &amp; "2"</name>'
+                        in xml)
+        self.assertTrue('<shared quantum:type="bool">False</shared>' in xml)
+        self.assertTrue('<subnets quantum:type="list" />' in xml)
+        self.assertTrue('<tenant_id xsi:nil="true" />' in xml)
+
+    def test_round_trip(self):
+        data = {'networks': [{'id': 'netid',
+                              'name': u'r\xe9seau',
+                              'admin_state_up': True,
+                              'provider:segmentation_id': 10,
+                              'mtu': 2 ** 40,
+                              'ratio': 0.5,
+                              'subnets': ['subnetid1', 'subnetid2'],
+                              'tags': [],
+                              'options': {},
+                              'description': '',
+                              'tenant_id': None}]}
+        self.assertEqual(data, self._round_trip(data))
+
+    def test_links(self):
+        links = [{'rel': 'next', 'href': 'http://localhost/?a=1&b=2'}]
+        data = {'networks': [{'id': 'netid'}], 'networks_links': links}
+        self.assertEqual(data, self._round_trip(data))
+
+    def test_iterparse(self):
+        ports = [{'id': 'portid%d' % i, 'fixed_ips': [{'ip_address': ip}]}
+                 for i, ip in enumerate(['10.0.0.1', '10.0.0.2'])]
+        links = [{'rel': 'next', 'href': 'http://localhost/?marker=portid1'}]
+        xml = self.serializer.default({'ports': ports, 'ports_links': links})
+        # In chunks splitting the tags
+        chunks = [xml[i:i + 7] for i in range(0, len(xml), 7)]
+        extra = {}
+        items = self.deserializer.iterparse(chunks, 'ports', extra)
+        self.assertEqual(ports[0], next(items))
+        self.assertEqual({}, extra)
+        self.assertEqual(ports[1:], list(items))
+        self.assertEqual({'ports_links': links}, extra)
+
+    def test_iterparse_empty(self):
+        xml = self.serializer.default({'ports': []})
+        self.assertEqual([], list(self.deserializer.iterparse([xml],
+                                                              'ports')))
+
+    def test_iterparse_malformed(self):
+        items = self.deserializer.iterparse(['<ports><port>'], 'ports')
+        self.assertRaises(exceptions.MalformedRequestBody, list, items)
+
+    def test_virtual_root(self):
+        data = {'a': 'x', 'b': 'y'}
+        self.assertEqual(data, self._round_trip(data))
+
+    def test_malformed(self):
+        self.assertRaises(exceptions.MalformedRequestBody,
+                          self.deserializer.default, '<a><b></a>')
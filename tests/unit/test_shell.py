@@ -18,6 +18,7 @@ import argparse
 import cStringIO
 import os
 import re
+import subprocess
 import sys
 
 import fixtures
@@ -26,6 +27,7 @@ import testtools
 from testtools import matchers
 
 from neutronclient.common import exceptions
+from neutronclient.neutron.v2_0 import network
 from neutronclient import shell as openstack_shell
 
 
@@ -130,6 +132,37 @@ class ShellTest(testtools.TestCase):
         result = neutron_shell.build_option_parser('descr', '2.0')
         self.assertEqual(True, isinstance(result, argparse.ArgumentParser))
 
+    def test_commands_load(self):
+        neutron_shell = openstack_shell.NeutronShell('2.0')
+        for name, entry_point in neutron_shell.command_manager:
+            command_class = entry_point.load()
+            self.assertTrue(hasattr(command_class, 'get_parser'), name)
+
+    def test_command_classes(self):
+        commands = openstack_shell.COMMAND_V2
+        self.assertIs(network.ListNetwork, commands['net-list'])
+        self.assertEqual(len(commands), len(dict(commands.items())))
+        commands['my-net-list'] = network.ListNetwork
+        self.addCleanup(commands.__delitem__, 'my-net-list')
+        neutron_shell = openstack_shell.NeutronShell('2.0')
+        cmd_factory = neutron_shell.command_manager.find_command(
+            ['my-net-list'])[0]
+        self.assertIsInstance(cmd_factory(neutron_shell, None),
+                              network.ListNetwork)
+
+    def test_command_modules_imported_lazily(self):
+        # A new interpreter, the modules are all imported in this one
+        process = subprocess.Popen([
+            sys.executable, '-c',
+            'import sys\n'
+            'from neutronclient import shell\n'
+            'shell.NeutronShell("2.0")\n'
+            'print sorted(m for m in sys.modules if m.startswith('
+            '"neutronclient.neutron.v2_0.") or m == "httplib2")\n'],
+            stdout=subprocess.PIPE)
+        output = process.communicate()[0]
+        self.assertEqual('[]', output.strip())
+
     def test_main_with_unicode(self):
         self.mox.StubOutClassWithMocks(openstack_shell, 'NeutronShell')
         qshell_mock = openstack_shell.NeutronShell('2.0')
@@ -0,0 +1,158 @@
+# Copyright 2013 OpenStack Foundation.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+import BaseHTTPServer
+import json
+import threading
+import urlparse
+
+import testtools
+
+from neutronclient.common import constants
+from neutronclient.common import exceptions
+from neutronclient.common import serializer
+from neutronclient.v2_0 import client
+from tests.unit import test_async_client
+
+
+TOKEN = 'testtoken'
+PORTS = [{'id': 'portid%03d' % i, 'name': 'port%d' % i} for i in range(250)]
+
+
+class PagingNeutronHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Lists ports by pages of limit ports, sent in small chunks."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        self.format = url.path.rsplit('.', 1)[-1]
+        if url.path == '/v2.0/extensions.json':
+            self._reply(200, {'extensions': []})
+            return
+        if url.path != '/v2.0/ports.' + self.format:
+            self._reply(404, {'NeutronError': {'type': 'PortNotFound',
+                                               'message': 'not found',
+                                               'detail': ''}})
+            return
+        query = urlparse.parse_qs(url.query)
+        limit = int(query.get('limit', [len(PORTS)])[0])
+        start = 0
+        if 'marker' in query:
+            start = [p['id'] for p in PORTS].index(query['marker'][0]) + 1
+        body = {'ports': PORTS[start:start + limit]}
+        if start + limit < len(PORTS):
+            body['ports_links'] = [
+                {'rel': 'next',
+                 'href': 'http://host/v2.0/ports.%s?limit=%d&marker=%s' %
+                 (self.format, limit, PORTS[start + limit - 1]['id'])}]
+        self._reply(200, body)
+
+    def _reply(self, status, body):
+        if self.format == 'xml':
+            body = serializer.XMLDictSerializer(
+                {'plurals': constants.PLURALS}).default(body)
+        else:
+            body = json.dumps(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/' + self.format)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for i in range(0, len(body), 100):
+            self.wfile.write(body[i:i + 100])
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class StreamListsTest(testtools.TestCase):
+
+    def setUp(self):
+        super(StreamListsTest, self).setUp()
+        self.server = test_async_client.FakeNeutronServer(
+            ('127.0.0.1', 0), PagingNeutronHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.client = client.Client(token=TOKEN, endpoint_url=self.endpoint,
+                                    stream_lists=True)
+        self.addCleanup(self.client.httpclient.connection_pool.close)
+
+    def test_iterate(self):
+        self.assertEqual(PORTS, list(self.client.iter_ports()))
+
+    def test_iterate_pages(self):
+        self.assertEqual(PORTS, list(self.client.iter_ports(limit=100)))
+
+    def test_same_result_as_list(self):
+        paged = client.Client(token=TOKEN, endpoint_url=self.endpoint)
+        self.assertEqual(paged.list_ports(limit=30)['ports'],
+                         list(self.client.iter_ports(limit=30)))
+
+    def test_connection_reused(self):
+        list(self.client.iter_ports(limit=100))
+        pool = self.client.httpclient.connection_pool
+        self.assertEqual(1, len(pool._idle))
+        http, last_used = pool._idle[0]
+        self.assertEqual(1, len(http.connections))
+
+    def test_partially_read(self):
+        ports = self.client.iter_ports()
+        self.assertEqual(PORTS[0], next(ports))
+        ports.close()
+        # The connection left with unread data is not reused
+        self.assertEqual(PORTS, list(self.client.iter_ports(limit=100)))
+
+    def test_iterate_xml(self):
+        self.client.format = 'xml'
+        self.assertEqual(PORTS, list(self.client.iter_ports(limit=100)))
+
+    def test_iterate_format_argument(self):
+        paged = client.Client(token=TOKEN, endpoint_url=self.endpoint)
+        self.addCleanup(paged.httpclient.connection_pool.close)
+        for neutron_client in (self.client, paged):
+            events = []
+            neutron_client.httpclient.add_request_hook(events.append)
+            ports = neutron_client.iter_ports(limit=100, format='xml')
+            self.assertEqual('json', neutron_client.format)
+            self.assertEqual(PORTS, list(ports))
+            self.assertEqual(['/v2.0/ports.xml'] * 3,
+                             [e.path for e in events
+                              if 'extensions' not in e.path])
+
+    def test_request_hooks(self):
+        events = []
+        self.client.httpclient.add_request_hook(events.append)
+        self.client.list_ports(limit=100)
+        list(self.client.iter_ports(limit=100))
+        self.assertEqual(['/v2.0/ports.json'] * 6,
+                         [e.path for e in events])
+        # The connection opened for the first request is kept alive
+        self.assertTrue(events[0].connect_time > 0)
+        self.assertEqual([None] * 5, [e.connect_time for e in events[1:]])
+        for event in events:
+            self.assertEqual(200, event.status)
+            self.assertTrue(event.bytes_received > 0)
+            self.assertTrue(0 < event.first_byte_time <= event.total_time)
+
+    def test_error(self):
+        self.client.ports_path = '/noports'
+        self.assertRaises(exceptions.NeutronClientException,
+                          list, self.client.iter_ports())
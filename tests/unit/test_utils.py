@@ -16,9 +16,13 @@
 
 import datetime
 import sys
+import time
 
+import fixtures
 import testtools
 
+from neutronclient.common import cache
+from neutronclient.common import codec
 from neutronclient.common import exceptions
 from neutronclient.common import utils
 
@@ -188,3 +192,147 @@ class ImportClassTestCase(testtools.TestCase):
         self.assertRaises(
             exceptions.UnsupportedVersion,
             utils.get_client_class, 'image', '2', {'image': '2'})
+
+
+class TestLRUCache(testtools.TestCase):
+    def test_get_set(self):
+        lru = cache.LRUCache(max_size=2)
+        lru.set('a', 1)
+        self.assertEqual(1, lru.get('a'))
+        self.assertIsNone(lru.get('b'))
+
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(max_size=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(1, lru.get('a'))
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(3, lru.get('c'))
+
+    def test_ttl(self):
+        lru = cache.LRUCache(ttl=60)
+        now = time.time()
+        self.useFixture(fixtures.MonkeyPatch('time.time', lambda: now))
+        lru.set('a', 1)
+        now += 61
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(0, len(lru))
+
+    def test_disabled(self):
+        lru = cache.LRUCache(max_size=0)
+        lru.set('a', 1)
+        self.assertIsNone(lru.get('a'))
+
+    def test_invalidate(self):
+        lru = cache.LRUCache()
+        lru.set('a', 'id1')
+        lru.set('b', 'id2')
+        lru.invalidate(lambda key, value: value == 'id1')
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual('id2', lru.get('b'))
+
+
+class FakeResp(dict):
+    status = 200
+
+
+class TestResponseCache(testtools.TestCase):
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.now = time.time()
+        self.useFixture(fixtures.MonkeyPatch('time.time', lambda: self.now))
+
+    def test_parse_cache_control(self):
+        self.assertEqual({'max-age': '60', 'no-cache': None},
+                         cache.parse_cache_control('max-age="60", no-cache'))
+        self.assertEqual({}, cache.parse_cache_control(None))
+
+    def test_max_age(self):
+        responses = cache.ResponseCache(ttl=600)
+        responses.set(('/v2.0/ports.json',),
+                      FakeResp({'cache-control': 'max-age=10'}), 'body')
+        self.assertTrue(responses.get(('/v2.0/ports.json',)).fresh())
+        self.now += 11
+        self.assertFalse(responses.get(('/v2.0/ports.json',)).fresh())
+
+    def test_expires(self):
+        responses = cache.ResponseCache()
+        responses.set(('/v2.0/ports.json',),
+                      FakeResp({'date': 'Mon, 07 Oct 2013 10:00:00 GMT',
+                                'expires': 'Mon, 07 Oct 2013 10:00:30 GMT'}),
+                      'body')
+        self.now += 29
+        self.assertTrue(responses.get(('/v2.0/ports.json',)).fresh())
+        self.now += 2
+        self.assertFalse(responses.get(('/v2.0/ports.json',)).fresh())
+
+    def test_not_cached_without_freshness_or_validators(self):
+        responses = cache.ResponseCache()
+        responses.set(('/v2.0/ports.json',), FakeResp(), 'body')
+        self.assertEqual(0, len(responses))
+        responses.set(('/v2.0/ports.json',),
+                      FakeResp({'last-modified': 'yesterday'}), 'body')
+        self.assertEqual({'If-Modified-Since': 'yesterday'},
+                         responses.get(('/v2.0/ports.json',)).validators())
+
+    def test_invalidate(self):
+        responses = cache.ResponseCache(ttl=60)
+        for path in ('/v2.0/ports.json', '/v2.0/ports/1.json',
+                     '/v2.0/networks.json?name=a'):
+            responses.set((path,), FakeResp(), 'body')
+        # The write may have changed the ports of the network too
+        responses.invalidate('/v2.0/ports/2.json')
+        self.assertEqual(0, len(responses))
+
+
+class TestCodec(testtools.TestCase):
+    def test_fastest_backend_selected(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'NEUTRONCLIENT_JSON_BACKEND'))
+        self.assertEqual(codec.available_backends()[0].name,
+                         codec._select_backend().name)
+
+    def test_backend_from_environment(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'NEUTRONCLIENT_JSON_BACKEND', 'json'))
+        self.assertEqual('json', codec._select_backend().name)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, codec.load_backend, 'nojson')
+
+    def test_dumps_default(self):
+        now = datetime.datetime(2013, 1, 1)
+        self.assertEqual('["2013-01-01 00:00:00"]',
+                         codec.dumps([now], default=unicode))
+        self.assertRaises(TypeError, codec.dumps, [now])
+
+    def test_loads(self):
+        self.assertEqual({'a': [1, u'\u7f51']},
+                         codec.loads('{"a": [1, "\\u7f51"]}'))
+
+    def _iterparse(self, document, chunk_size, extra=None):
+        chunks = [document[i:i + chunk_size]
+                  for i in range(0, len(document), chunk_size)]
+        return list(codec.iterparse(chunks, 'ports', extra))
+
+    def test_iterparse(self):
+        ports = [{'id': 'id%d' % i, 'mtu': 1000 + i} for i in range(20)]
+        links = [{'rel': 'next', 'href': 'http://host/ports?marker=id19'}]
+        document = codec.dumps({'ports': ports, 'ports_links': links})
+        # Values split across chunks at every possible position
+        for chunk_size in (1, 2, 7, len(document)):
+            extra = {}
+            self.assertEqual(ports,
+                             self._iterparse(document, chunk_size, extra))
+            self.assertEqual({'ports_links': links}, extra)
+
+    def test_iterparse_empty(self):
+        self.assertEqual([], self._iterparse('{"ports": [ ]}', 3))
+        self.assertEqual([], self._iterparse('{}', 3))
+
+    def test_iterparse_invalid(self):
+        for document in ('', '[]', '{"ports": [{"id": 1}',
+                         '{"ports": [1 2]}', '{"ports": []} {}'):
+            self.assertRaises(ValueError, self._iterparse, document, 3)